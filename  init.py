@@ -1,7 +1,23 @@
-from .database import CreatineDatabase
-from .analysis import CreatineAnalysis
-from .visualization import CreatineVisualization
-from .dashboard import CreatineDashboard
+import importlib
 
 __version__ = '0.1.0'
-__all__ = ['CreatineDatabase', 'CreatineAnalysis', 'CreatineVisualization', 'CreatineDashboard']
\ No newline at end of file
+__all__ = ['CreatineDatabase', 'CreatineAnalysis', 'CreatineVisualization', 'CreatineDashboard']
+
+# Submodule defining each export, imported on first attribute access so that
+# importing the package does not load the plotting and dashboard libraries
+_EXPORTS = {
+    'CreatineDatabase': '.database',
+    'CreatineAnalysis': '.analysis',
+    'CreatineVisualization': '.visualization',
+    'CreatineDashboard': '.dashboard'
+}
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
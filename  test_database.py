@@ -2,6 +2,7 @@ import pytest
 import pandas as pd
 from datetime import datetime, timedelta
 import os
+import sqlite3
 from src.database import CreatineDatabase
 
 @pytest.fixture
@@ -151,6 +152,224 @@ def test_run_analysis_query(test_db):
     assert isinstance(result, pd.DataFrame)
     assert len(result) > 0
 
+def test_running_statistics(test_db):
+    """Test that ingest-time running statistics match a full recomputation."""
+    participant_ids = []
+    for group, status in [('creatine', 'trained'), ('placebo', 'trained'), ('creatine', 'untrained')]:
+        participant_ids.append(test_db.add_participant({
+            'age': 30,
+            'gender': 'female',
+            'weight_kg': 62.0,
+            'height_cm': 168.0,
+            'training_experience_years': 1.0,
+            'training_status': status,
+            'group_assignment': group,
+            'dosing_protocol': 'maintenance',
+            'population_category': 'young trained'
+        }))
+    
+    start = datetime(2024, 3, 4).date()
+    test_db.add_measurement({
+        'participant_id': participant_ids[0],
+        'measurement_date': start,
+        'strength_1rm_kg': 90.0,
+        'lean_mass_kg': 50.0,
+        'muscle_thickness_mm': 30.0,
+        'creatine_kinase_level': 140.0,
+        'performance_score': 7.0,
+        'fatigue_level': 4
+    })
+    test_db.add_measurements([
+        {
+            'participant_id': pid,
+            'measurement_date': start + timedelta(days=3 + i * 7),
+            'strength_1rm_kg': 90.0 + i * 4 + j,
+            'lean_mass_kg': 50.0 + i * 0.4,
+            'muscle_thickness_mm': None,
+            'creatine_kinase_level': 140.0 + i * 5,
+            'performance_score': 7.0 + i * 0.1,
+            'fatigue_level': 4
+        }
+        for j, pid in enumerate(participant_ids) for i in range(4)
+    ])
+    
+    stats = test_db.get_running_statistics('strength_1rm_kg', group_by=['group_assignment'])
+    expected = test_db.get_progress_data().groupby('group_assignment')['strength_1rm_kg'].agg(
+        ['count', 'mean', 'std']
+    )
+    stats = stats.set_index('group_assignment')
+    assert list(stats['count']) == list(expected['count'])
+    assert stats['mean'].round(6).tolist() == expected['mean'].round(6).tolist()
+    assert stats['std'].round(6).tolist() == expected['std'].round(6).tolist()
+    
+    # Metrics without values contribute no cells
+    assert test_db.get_running_statistics('muscle_thickness_mm')['count'].sum() == 1
+    
+    # A full rebuild reproduces the incrementally maintained cells
+    cells = test_db.get_running_statistics()
+    test_db.rebuild_running_statistics()
+    pd.testing.assert_frame_equal(test_db.get_running_statistics(), cells)
+
+def test_study_time_filled_at_ingest(test_db):
+    """Test study day and week relative to each participant's baseline, including backfills."""
+    pid = test_db.add_participant({
+        'age': 30,
+        'gender': 'female',
+        'weight_kg': 62.0,
+        'height_cm': 168.0,
+        'training_experience_years': 1.0,
+        'training_status': 'trained',
+        'group_assignment': 'creatine',
+        'dosing_protocol': 'maintenance',
+        'population_category': 'young trained'
+    })
+    start = datetime(2024, 3, 4).date()
+    measurement = {
+        'participant_id': pid,
+        'strength_1rm_kg': 90.0,
+        'lean_mass_kg': 50.0,
+        'muscle_thickness_mm': 30.0,
+        'creatine_kinase_level': 140.0,
+        'performance_score': 7.0,
+        'fatigue_level': 4
+    }
+    test_db.add_measurements([
+        {**measurement, 'measurement_date': start + timedelta(days=days)} for days in (0, 6, 15)
+    ])
+    progress = test_db.get_progress_data()
+    assert progress['study_day'].tolist() == [0, 6, 15]
+    assert progress['study_week'].tolist() == [0, 0, 2]
+    
+    # A backfilled earlier visit becomes the new baseline
+    test_db.add_measurement({**measurement, 'measurement_date': start - timedelta(days=2)})
+    progress = test_db.get_progress_data()
+    assert progress['study_day'].tolist() == [0, 2, 8, 17]
+    assert progress['study_week'].tolist() == [0, 0, 1, 2]
+    weeks = test_db.get_running_statistics('strength_1rm_kg', group_by=['study_week'])
+    assert weeks.set_index('study_week')['count'].to_dict() == {0: 2, 1: 1, 2: 1}
+
+# Tables of the first schema release, before any upgrade
+BASELINE_SCHEMA = """
+CREATE TABLE participants (
+    participant_id INTEGER PRIMARY KEY,
+    age INTEGER NOT NULL,
+    gender TEXT NOT NULL,
+    weight_kg FLOAT NOT NULL,
+    height_cm FLOAT NOT NULL,
+    training_experience_years FLOAT,
+    training_status TEXT CHECK(training_status IN ('trained', 'untrained')),
+    group_assignment TEXT CHECK(group_assignment IN ('creatine', 'placebo')),
+    dosing_protocol TEXT CHECK(dosing_protocol IN ('loading', 'maintenance')),
+    population_category TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE dosing_protocols (
+    protocol_id INTEGER PRIMARY KEY,
+    protocol_name TEXT NOT NULL,
+    daily_dose_g FLOAT NOT NULL,
+    duration_days INTEGER NOT NULL,
+    description TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE training_programs (
+    program_id INTEGER PRIMARY KEY,
+    program_name TEXT NOT NULL,
+    frequency_per_week INTEGER,
+    intensity_percentage FLOAT,
+    exercise_type TEXT,
+    description TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE participant_training (
+    participant_id INTEGER,
+    program_id INTEGER,
+    start_date DATE,
+    end_date DATE,
+    compliance_percentage FLOAT
+);
+CREATE TABLE measurements (
+    measurement_id INTEGER PRIMARY KEY,
+    participant_id INTEGER,
+    measurement_date DATE,
+    strength_1rm_kg FLOAT,
+    lean_mass_kg FLOAT,
+    muscle_thickness_mm FLOAT,
+    creatine_kinase_level FLOAT,
+    performance_score FLOAT,
+    fatigue_level INTEGER CHECK(fatigue_level BETWEEN 1 AND 10),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO dosing_protocols (protocol_name, daily_dose_g, duration_days, description) VALUES
+('Loading Phase', 20, 7, 'Initial loading phase'),
+('Maintenance Phase', 5, 49, 'Maintenance phase'),
+('Direct Maintenance', 3, 56, 'Direct maintenance without loading');
+INSERT INTO participants (age, gender, weight_kg, height_cm, training_status, group_assignment,
+                          dosing_protocol, population_category) VALUES
+(24, 'male', 80.0, 180.0, 'trained', 'creatine', 'loading', 'young trained'),
+(26, 'female', 60.0, 165.0, 'trained', 'placebo', 'loading', 'young trained');
+INSERT INTO measurements (participant_id, measurement_date, strength_1rm_kg, lean_mass_kg,
+                          muscle_thickness_mm, creatine_kinase_level, performance_score, fatigue_level) VALUES
+(1, '2024-01-01', 100.0, 65.0, 35.0, 150.0, 8.0, 3),
+(1, '2024-01-15', 104.0, 65.5, 35.2, 155.0, 8.2, 4),
+(2, '2024-01-08', 60.0, 45.0, 28.0, 140.0, 7.0, 3);
+"""
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    """A database written by the first schema release, opened with the current code."""
+    db_path = str(tmp_path / "baseline.db")
+    conn = sqlite3.connect(db_path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.close()
+    db = CreatineDatabase(db_path)
+    yield db
+    db.close()
+
+def test_upgrade_existing_database(baseline_db):
+    """Test that opening a first-release database adds and backfills the new columns, once."""
+    progress = baseline_db.get_progress_data()
+    assert progress['study_day'].tolist() == [0, 14, 0]
+    assert progress['study_week'].tolist() == [0, 2, 0]
+    assert len(baseline_db.get_progress_data(exclude_outliers=True)) == 3
+    assert len(baseline_db.get_cube_cells()) == 3
+    assert baseline_db.get_dosing_phases()['dosing_protocol'].tolist().count('loading') == 2
+    assert baseline_db.upgrade_database() == []
+
+def test_upgraded_database_accepts_participants(baseline_db):
+    """Test that participants can be added to an upgraded database, bumping its content version."""
+    version = baseline_db.get_content_version()
+    pid = baseline_db.add_participant({
+        'age': 31,
+        'gender': 'male',
+        'weight_kg': 82.0,
+        'height_cm': 181.0,
+        'training_experience_years': 3.0,
+        'training_status': 'trained',
+        'group_assignment': 'creatine',
+        'dosing_protocol': 'maintenance',
+        'population_category': 'young trained'
+    })
+    assert pid == 3
+    assert baseline_db.get_content_version() != version
+
+def test_upgraded_database_ingests_measurements(baseline_db):
+    """Test that running statistics are backfilled on upgrade and maintained by later ingest."""
+    assert baseline_db.get_running_statistics('strength_1rm_kg')['count'].sum() == 3
+    baseline_db.add_measurement({
+        'participant_id': 2,
+        'measurement_date': datetime(2024, 1, 22).date(),
+        'strength_1rm_kg': 63.0,
+        'lean_mass_kg': 45.4,
+        'muscle_thickness_mm': 28.3,
+        'creatine_kinase_level': 142.0,
+        'performance_score': 7.2,
+        'fatigue_level': 4
+    })
+    cells = baseline_db.get_running_statistics()
+    assert cells.loc[cells['metric'] == 'strength_1rm_kg', 'count'].sum() == 4
+    baseline_db.rebuild_running_statistics()
+    pd.testing.assert_frame_equal(baseline_db.get_running_statistics(), cells)
+
 def test_backup_database(test_db):
     """Test database backup functionality."""
     # Add some test data
@@ -3,9 +3,15 @@ import numpy as np
 from typing import Dict, List, Tuple, Optional
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import r2_score
+from scipy import sparse, stats
 import logging
-from datetime import datetime, timedelta
-from .database import CreatineDatabase
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, date
+from .database import CreatineDatabase, PARTICIPANT_CACHE_QUERY, TRAINING_ASSIGNMENTS_QUERY
+from .cube import StudyCube, CUBE_QUERIES
+from .profiling import profiled
+from .result_cache import ResultCache, cached_result
 
 # Configure logging
 logging.basicConfig(
@@ -14,45 +20,344 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Progress data and named query results read in one transaction
+Snapshot = Dict[str, pd.DataFrame]
+
+# Report sections, in report order, mapped to the method that computes them
+REPORT_SECTIONS = {
+    'effect_sizes': 'calculate_effect_sizes',
+    'progression_rates': 'analyze_progression_rates',
+    'training_impact': 'analyze_training_impact',
+    'age_effects': 'analyze_age_effects',
+    'dosing_protocols': 'analyze_dosing_protocols',
+    'fatigue_recovery': 'analyze_fatigue_and_recovery'
+}
+
+# Named queries from queries.sql that the report sections read
+REPORT_QUERIES = [
+    'Population Category Analysis',
+    'Training Program Analysis',
+    'Age Group Analysis',
+    'Dosing Protocol Analysis',
+    'Fatigue Level Analysis'
+]
+
+# Metrics whose per-participant progression rates are estimated
+RATE_METRICS = ['strength_1rm_kg', 'lean_mass_kg', 'performance_score']
+
+# Groupings used for report sections computed in push-down mode
+EFFECT_SIZE_GROUPING = ['group_assignment']
+RATE_SUMMARY_GROUPING = ['group_assignment', 'training_status']
+
+# Metrics tracked between visits for recovery analysis, with their output name
+RECOVERY_METRICS = {
+    'fatigue_level': 'fatigue_recovery',
+    'performance_score': 'performance_recovery',
+    'creatine_kinase_level': 'ck_change'
+}
+
+# Compliance bands over participant_training.compliance_percentage: bin
+# edges (lower edge inclusive) and labels
+COMPLIANCE_BINS = [0, 50, 80, np.inf]
+COMPLIANCE_BANDS = ['Low (<50%)', 'Moderate (50-80%)', 'High (80%+)']
+
+# Metrics fitted against cumulative creatine dose, with the name of their gain
+DOSE_RESPONSE_METRICS = {
+    'strength_1rm_kg': 'strength_gain_percentage',
+    'lean_mass_kg': 'mass_gain_percentage'
+}
+
+# Candidate half-saturation doses (g of cumulative creatine) for dose-response fits
+ED50_GRID = np.geomspace(5, 5000, 97)
+ED50_CHUNK = 16
+
+# Age bands of the 'Age Group Analysis' query, used as mixed-model fixed effects
+AGE_BANDS = ['Young (18-29)', 'Middle (30-50)', 'Older (50+)']
+
+def make_serializable(obj):
+    """Convert a report into JSON-serializable lists, dicts and scalars."""
+    if isinstance(obj, pd.DataFrame):
+        return obj.to_dict('records')
+    elif isinstance(obj, pd.Series):
+        return obj.to_dict()
+    elif isinstance(obj, dict):
+        return {str(k): make_serializable(v) for k, v in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [make_serializable(i) for i in obj]
+    elif isinstance(obj, (np.int64, np.float64)):
+        return obj.item()
+    elif isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    elif pd.isna(obj):
+        return None
+    return obj if isinstance(obj, (str, int, float, bool, type(None))) else str(obj)
+
 class CreatineAnalysis:
-    def __init__(self, db: CreatineDatabase):
-        """Initialize analysis with database connection."""
+    def __init__(self, db: CreatineDatabase, use_participant_cache: bool = False,
+                 pushdown: bool = False, exclude_outliers: bool = False,
+                 use_cube: bool = False, result_cache: Optional[ResultCache] = None):
+        """
+        Initialize analysis with database connection.
+
+        With use_participant_cache=True, per-participant progression rates and
+        recovery metrics are read from the participant analysis cache, which
+        is refreshed only for participants whose measurements changed.
+
+        With pushdown=True, effect sizes and progression-rate summaries are
+        finished from group-level moments computed in SQL, so only aggregates
+        leave the database. Progression rates are then reported as group
+        summaries only.
+
+        With exclude_outliers=True, measurements flagged by outlier screening
+        are left out of the progress data and the push-down moments. Named
+        queries still read every row, and the participant cache, which
+        covers all measurements, cannot be combined with it.
+
+        With use_cube=True, the named queries that are per-cell averages
+        (see CUBE_QUERIES) are answered from the in-memory measurement cube
+        instead of scanning the measurements.
+
+        With a result_cache, the results of the public analysis methods are
+        stored on disk keyed by the method, its arguments, these settings and
+        the database's content version, so other processes sharing the cache
+        reuse them until the data changes.
+
+        Calls are recorded as spans by the database's profiler when it is enabled.
+        """
+        if use_participant_cache and exclude_outliers:
+            raise ValueError("exclude_outliers cannot be combined with use_participant_cache")
         self.db = db
+        self.profiler = db.profiler
+        self.use_participant_cache = use_participant_cache
+        self.pushdown = pushdown
+        self.exclude_outliers = exclude_outliers
+        self.cube = StudyCube(db) if use_cube else None
+        self.result_cache = result_cache
+        # Latest mixed-model estimates per metric, used to warm-start refits
+        self._mixed_model_estimates = {}
         logger.info("Analysis module initialized")
 
-    def calculate_effect_sizes(self) -> Dict[str, pd.DataFrame]:
-        """Calculate effect sizes for different metrics and groups."""
+    def cache_context(self) -> Dict:
+        """Settings that change analysis results, part of every result cache key."""
+        return {
+            'use_participant_cache': self.use_participant_cache,
+            'pushdown': self.pushdown,
+            'exclude_outliers': self.exclude_outliers,
+            'use_cube': self.cube is not None
+        }
+
+    def _get_progress_data(self, snapshot: Optional[Snapshot] = None) -> pd.DataFrame:
+        """Return progress data from the snapshot if given, else from the database."""
+        if snapshot is not None:
+            return snapshot['progress_data']
+        return self.db.get_progress_data(exclude_outliers=self.exclude_outliers)
+
+    def _run_query(self, query_name: str, snapshot: Optional[Snapshot] = None) -> pd.DataFrame:
+        """
+        Return a named query result from the cube when it can answer it,
+        else from the snapshot if given, else from the database.
+        """
+        if self.cube is not None and query_name in CUBE_QUERIES:
+            return self.cube.run_query(query_name)
+        if snapshot is not None:
+            return snapshot[query_name]
+        return self.db.run_analysis_query(query_name)
+
+    def _get_participant_cache(self, snapshot: Optional[Snapshot] = None) -> pd.DataFrame:
+        """Return cached per-participant results, refreshing the cache when not reading a snapshot."""
+        if snapshot is not None:
+            return snapshot['participant_cache']
+        self.refresh_participant_cache()
+        return self.db.get_participant_cache()
+
+    def _get_moments(self, kind: str, group_by: List[str],
+                     snapshot: Optional[Snapshot] = None) -> pd.DataFrame:
+        """Return 'group_moments' or 'rate_moments' from the snapshot if given, else from SQL."""
+        if snapshot is not None:
+            return snapshot[kind]
+        if kind == 'group_moments':
+            return self.db.get_group_moments(group_by, RATE_METRICS, self.exclude_outliers)
+        return self.db.get_rate_moments(group_by, RATE_METRICS, self.exclude_outliers)
+
+    def _finish_group_moments(self, moments: pd.DataFrame, metrics: List[str]) -> pd.DataFrame:
+        """Add per-metric mean and population variance columns to SQL group moments."""
+        stats = moments.copy()
+        for metric in metrics:
+            count = stats[f'{metric}_count'].where(stats[f'{metric}_count'] > 0)
+            centered_mean = stats[f'{metric}_sum'] / count
+            stats[f'{metric}_mean'] = stats[f'{metric}_shift'] + centered_mean
+            stats[f'{metric}_var'] = (stats[f'{metric}_sumsq'] / count - centered_mean ** 2).clip(lower=0)
+        return stats
+
+    def _cohens_d(self, mean_a: float, var_a: float, mean_b: float, var_b: float) -> float:
+        """Cohen's d with the pooled standard deviation of two population variances."""
+        pooled_std = np.sqrt((var_a + var_b) / 2)
+        return (mean_a - mean_b) / pooled_std
+
+    @profiled()
+    @cached_result
+    def calculate_group_moments(self, group_by: List[str],
+                                metrics: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Per-group count, mean and population variance of each metric, grouped
+        by any participant attributes and computed from SQL moments.
+        """
+        try:
+            metrics = metrics or RATE_METRICS
+            moments = self.db.get_group_moments(group_by, metrics, self.exclude_outliers)
+            stats = self._finish_group_moments(moments, metrics)
+            columns = group_by + [f'{metric}_{stat}' for metric in metrics
+                                  for stat in ('count', 'mean', 'var')]
+            logger.info("Group moments calculated successfully")
+            return stats[columns]
+        except Exception as e:
+            logger.error(f"Error calculating group moments: {e}")
+            raise
+
+    @profiled()
+    @cached_result
+    def calculate_stratified_effect_sizes(self, strata: List[str],
+                                          metrics: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Creatine vs placebo Cohen's d per stratum of participant attributes,
+        finished from SQL moments. One row per stratum and metric.
+        """
+        try:
+            metrics = metrics or RATE_METRICS
+            stats = self.calculate_group_moments(strata + ['group_assignment'], metrics)
+            creatine = stats[stats['group_assignment'] == 'creatine'].drop(columns='group_assignment')
+            placebo = stats[stats['group_assignment'] == 'placebo'].drop(columns='group_assignment')
+            if strata:
+                arms = creatine.merge(placebo, on=strata, suffixes=('_creatine', '_placebo'))
+            else:
+                arms = creatine.add_suffix('_creatine').reset_index(drop=True).join(
+                    placebo.add_suffix('_placebo').reset_index(drop=True), how='inner'
+                )
+            
+            effects = []
+            for metric in metrics:
+                effect_size = self._cohens_d(
+                    arms[f'{metric}_mean_creatine'], arms[f'{metric}_var_creatine'],
+                    arms[f'{metric}_mean_placebo'], arms[f'{metric}_var_placebo']
+                )
+                metric_effects = arms[strata].copy()
+                metric_effects['metric'] = metric
+                metric_effects['n_creatine'] = arms[f'{metric}_count_creatine']
+                metric_effects['n_placebo'] = arms[f'{metric}_count_placebo']
+                metric_effects['effect_size'] = effect_size
+                metric_effects['interpretation'] = effect_size.map(self._interpret_effect_size)
+                effects.append(metric_effects)
+            
+            logger.info("Stratified effect sizes calculated successfully")
+            return pd.concat(effects, ignore_index=True)
+        except Exception as e:
+            logger.error(f"Error calculating stratified effect sizes: {e}")
+            raise
+
+    @profiled()
+    def refresh_participant_cache(self) -> int:
+        """
+        Recompute cached results for participants whose measurement watermark
+        (highest measurement ID and measurement count) moved since the last
+        refresh. Returns the number of participants recomputed.
+        """
+        try:
+            watermarks = self.db.get_measurement_watermarks()
+            cached = self.db.get_participant_cache()[
+                ['participant_id', 'max_measurement_id', 'measurement_count']
+            ]
+            merged = watermarks.merge(cached, on='participant_id', how='outer',
+                                      suffixes=('', '_cached'), indicator=True)
+            
+            changed = (
+                (merged['_merge'] == 'left_only') |
+                (merged['max_measurement_id'] != merged['max_measurement_id_cached']) |
+                (merged['measurement_count'] != merged['measurement_count_cached'])
+            ) & (merged['_merge'] != 'right_only')
+            stale_ids = merged.loc[changed, 'participant_id'].astype(int).tolist()
+            removed_ids = merged.loc[merged['_merge'] == 'right_only', 'participant_id'].astype(int).tolist()
+            
+            results = watermarks[watermarks['participant_id'].isin(stale_ids)]
+            if stale_ids:
+                progress_data = self.db.get_progress_data(participant_ids=stale_ids)
+                rates = self._compute_participant_rates(progress_data).drop(
+                    columns=['group_assignment', 'training_status']
+                )
+                recovery = self._compute_recovery_patterns(progress_data).drop(
+                    columns=['group_assignment']
+                )
+                results = results.merge(rates, on='participant_id', how='left')
+                if not recovery.empty:
+                    results = results.merge(recovery, on='participant_id', how='left')
+            
+            if stale_ids or removed_ids:
+                self.db.save_participant_cache(results, stale_ids=stale_ids + removed_ids)
+            
+            logger.info(f"Participant cache refreshed: {len(stale_ids)} recomputed, "
+                        f"{len(removed_ids)} removed")
+            return len(stale_ids)
+        except Exception as e:
+            logger.error(f"Error refreshing participant cache: {e}")
+            raise
+
+    @profiled()
+    @cached_result
+    def calculate_effect_sizes(self, snapshot: Optional[Snapshot] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Calculate effect sizes for different metrics and groups. n_creatine
+        and n_placebo count the measurements behind each Cohen's d.
+        """
         try:
             # Get population category analysis
-            population_effects = self.db.run_analysis_query("Population Category Analysis")
+            population_effects = self._run_query("Population Category Analysis", snapshot)
             
             # Calculate Cohen's d effect sizes
-            progress_data = self.db.get_progress_data()
             effect_sizes = {}
-            
-            for metric in ['strength_1rm_kg', 'lean_mass_kg', 'performance_score']:
-                effects = []
-                for group in progress_data['group_assignment'].unique():
-                    creatine = progress_data[
-                        (progress_data['group_assignment'] == 'creatine') & 
-                        (progress_data[metric].notnull())
-                    ][metric]
-                    placebo = progress_data[
-                        (progress_data['group_assignment'] == 'placebo') & 
-                        (progress_data[metric].notnull())
-                    ][metric]
-                    
-                    # Calculate Cohen's d
-                    pooled_std = np.sqrt((np.var(creatine) + np.var(placebo)) / 2)
-                    effect_size = (np.mean(creatine) - np.mean(placebo)) / pooled_std
-                    
-                    effects.append({
+            if self.pushdown:
+                moments = self._get_moments('group_moments', EFFECT_SIZE_GROUPING, snapshot)
+                stats = self._finish_group_moments(moments, RATE_METRICS).set_index('group_assignment')
+                arms = stats.reindex(['creatine', 'placebo'])
+                
+                for metric in RATE_METRICS:
+                    effect_size = self._cohens_d(
+                        arms.loc['creatine', f'{metric}_mean'], arms.loc['creatine', f'{metric}_var'],
+                        arms.loc['placebo', f'{metric}_mean'], arms.loc['placebo', f'{metric}_var']
+                    )
+                    effect_sizes[metric] = pd.DataFrame([{
                         'metric': metric,
+                        'n_creatine': arms.loc['creatine', f'{metric}_count'],
+                        'n_placebo': arms.loc['placebo', f'{metric}_count'],
                         'effect_size': effect_size,
                         'interpretation': self._interpret_effect_size(effect_size)
-                    })
+                    } for group in stats.index])
+            else:
+                progress_data = self._get_progress_data(snapshot)
                 
-                effect_sizes[metric] = pd.DataFrame(effects)
+                for metric in RATE_METRICS:
+                    effects = []
+                    for group in progress_data['group_assignment'].unique():
+                        creatine = progress_data[
+                            (progress_data['group_assignment'] == 'creatine') &
+                            (progress_data[metric].notnull())
+                        ][metric]
+                        placebo = progress_data[
+                            (progress_data['group_assignment'] == 'placebo') &
+                            (progress_data[metric].notnull())
+                        ][metric]
+
+                        # Calculate Cohen's d
+                        effect_size = self._cohens_d(np.mean(creatine), np.var(creatine),
+                                                     np.mean(placebo), np.var(placebo))
+
+                        effects.append({
+                            'metric': metric,
+                            'n_creatine': len(creatine),
+                            'n_placebo': len(placebo),
+                            'effect_size': effect_size,
+                            'interpretation': self._interpret_effect_size(effect_size)
+                        })
+
+                    effect_sizes[metric] = pd.DataFrame(effects)
             
             results = {
                 'population_effects': population_effects,
@@ -65,7 +370,8 @@ class CreatineAnalysis:
             logger.error(f"Error calculating effect sizes: {e}")
             raise
 
-    def _interpret_effect_size(self, d: float) -> str:
+    @staticmethod
+    def _interpret_effect_size(d: float) -> str:
         """Interpret Cohen's d effect size."""
         if abs(d) < 0.2:
             return "Negligible"
@@ -76,60 +382,91 @@ class CreatineAnalysis:
         else:
             return "Large"
 
-    def analyze_progression_rates(self) -> Dict[str, pd.DataFrame]:
-        """Analyze progression rates for different groups and metrics."""
-        try:
-            progress_data = self.db.get_progress_data()
+    @profiled()
+    def _compute_participant_rates(self, progress_data: pd.DataFrame) -> pd.DataFrame:
+        """Fit a linear progression rate and R² per participant and metric."""
+        results = []
+        for pid in progress_data['participant_id'].unique():
+            participant_data = progress_data[progress_data['participant_id'] == pid]
         
-            # Calculate rates using linear regression
-            results = []
-            for pid in progress_data['participant_id'].unique():
-                participant_data = progress_data[progress_data['participant_id'] == pid]
-            
-                # Convert dates to numeric values
-                dates = pd.to_datetime(participant_data['measurement_date'])
-                days = (dates - dates.min()).dt.days.values.reshape(-1, 1)
-            
-                # Calculate rates for each metric
-                metrics = ['strength_1rm_kg', 'lean_mass_kg', 'performance_score']
-                rates = {}
-            
-                for metric in metrics:
-                    if participant_data[metric].notnull().all():
-                        reg = LinearRegression().fit(days, participant_data[metric])
-                        rates[f'{metric}_rate'] = reg.coef_[0]
-                        rates[f'{metric}_r2'] = r2_score(participant_data[metric], reg.predict(days))
-            
-                # Add participant info
-                rates['participant_id'] = pid
-                rates['group_assignment'] = participant_data['group_assignment'].iloc[0]
-                rates['training_status'] = participant_data['training_status'].iloc[0]
-            
-                results.append(rates)
+            # Convert dates to numeric values
+            dates = pd.to_datetime(participant_data['measurement_date'])
+            days = (dates - dates.min()).dt.days.values.reshape(-1, 1)
         
-            rates_df = pd.DataFrame(results)
+            # Calculate rates for each metric
+            rates = {}
         
-            # Calculate summary statistics with flattened column names
-            group_stats = []
-            for (group, status) in rates_df.groupby(['group_assignment', 'training_status']).groups:
-                group_data = rates_df[(rates_df['group_assignment'] == group) & 
-                                    (rates_df['training_status'] == status)]
-                stats = {
-                    'group_assignment': group,
-                    'training_status': status
-                }
-            
-                for col in ['strength_1rm_kg_rate', 'lean_mass_kg_rate', 'performance_score_rate']:
-                    stats[f'{col}_mean'] = group_data[col].mean()
-                    stats[f'{col}_std'] = group_data[col].std()
-            
-                group_stats.append(stats)
+            for metric in RATE_METRICS:
+                if participant_data[metric].notnull().all():
+                    reg = LinearRegression().fit(days, participant_data[metric])
+                    rates[f'{metric}_rate'] = reg.coef_[0]
+                    rates[f'{metric}_r2'] = r2_score(participant_data[metric], reg.predict(days))
+        
+            # Add participant info
+            rates['participant_id'] = pid
+            rates['group_assignment'] = participant_data['group_assignment'].iloc[0]
+            rates['training_status'] = participant_data['training_status'].iloc[0]
+        
+            results.append(rates)
+    
+        return pd.DataFrame(results)
+
+    def _summarize_rates(self, rates_df: pd.DataFrame) -> pd.DataFrame:
+        """Summarize participant rates per group and training status."""
+        # Calculate summary statistics with flattened column names
+        group_stats = []
+        for (group, status) in rates_df.groupby(['group_assignment', 'training_status']).groups:
+            group_data = rates_df[(rates_df['group_assignment'] == group) & 
+                                (rates_df['training_status'] == status)]
+            stats = {
+                'group_assignment': group,
+                'training_status': status
+            }
+        
+            for col in [f'{metric}_rate' for metric in RATE_METRICS]:
+                stats[f'{col}_mean'] = group_data[col].mean()
+                stats[f'{col}_std'] = group_data[col].std()
+        
+            group_stats.append(stats)
+        
+        return pd.DataFrame(group_stats)
+
+    def _summarize_rate_moments(self, moments: pd.DataFrame) -> pd.DataFrame:
+        """Mean and sample std of participant rates per group from SQL rate moments."""
+        count = moments['participant_count'].where(moments['participant_count'] > 0)
+        centered_mean = moments['rate_sum'] / count
+        summary = moments[RATE_SUMMARY_GROUPING + ['metric']].copy()
+        summary['mean'] = moments['rate_shift'] + centered_mean
+        summary['std'] = np.sqrt(
+            ((moments['rate_sumsq'] - count * centered_mean ** 2) / (count - 1)).clip(lower=0)
+        )
+        
+        summary = summary.pivot(index=RATE_SUMMARY_GROUPING, columns='metric', values=['mean', 'std'])
+        summary.columns = [f'{metric}_rate_{stat}' for stat, metric in summary.columns]
+        columns = [f'{metric}_rate_{stat}' for metric in RATE_METRICS for stat in ('mean', 'std')]
+        return summary.reindex(columns=columns).reset_index()
+
+    @profiled()
+    @cached_result
+    def analyze_progression_rates(self, snapshot: Optional[Snapshot] = None) -> Dict[str, pd.DataFrame]:
+        """Analyze progression rates for different groups and metrics."""
+        try:
+            if self.pushdown:
+                moments = self._get_moments('rate_moments', RATE_SUMMARY_GROUPING, snapshot)
+                logger.info("Progression rates summarized from SQL moments")
+                return {'summary_statistics': self._summarize_rate_moments(moments)}
             
-            summary_stats = pd.DataFrame(group_stats)
+            if self.use_participant_cache:
+                rate_columns = [f'{metric}_{suffix}' for metric in RATE_METRICS for suffix in ('rate', 'r2')]
+                rates_df = self._get_participant_cache(snapshot)[
+                    rate_columns + ['participant_id', 'group_assignment', 'training_status']
+                ].reset_index(drop=True)
+            else:
+                rates_df = self._compute_participant_rates(self._get_progress_data(snapshot))
         
             analysis_results = {
                 'individual_rates': rates_df,
-                'summary_statistics': summary_stats
+                'summary_statistics': self._summarize_rates(rates_df)
             }
         
             logger.info("Progression rates analyzed successfully")
@@ -138,14 +475,214 @@ class CreatineAnalysis:
             logger.error(f"Error analyzing progression rates: {e}")
             raise
 
-    def analyze_training_impact(self) -> Dict[str, pd.DataFrame]:
-        """Analyze the impact of different training protocols."""
+    def _mixed_model_design(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Fixed-effect design for the progression model: time in study weeks,
+        creatine and creatine × time against placebo, age band against the
+        youngest band and untrained against trained. Terms without variation
+        in the data, or that are collinear with earlier terms, are dropped.
+        """
+        time_weeks = data['study_day'].to_numpy(dtype=float) / 7.0
+        creatine = (data['group_assignment'] == 'creatine').to_numpy(dtype=float)
+        age_band = np.select([data['age'] < 30, data['age'] <= 50], AGE_BANDS[:2], AGE_BANDS[2])
+        design = {
+            'intercept': np.ones(len(data)),
+            'time': time_weeks,
+            'creatine': creatine,
+            'creatine:time': creatine * time_weeks
+        }
+        for band in AGE_BANDS[1:]:
+            design[f'age_band[{band}]'] = (age_band == band).astype(float)
+        design['untrained'] = (data['training_status'] == 'untrained').to_numpy(dtype=float)
+        
+        design = pd.DataFrame(design, index=data.index)
+        gram = design.T @ design
+        kept = []
+        for column in design.columns:
+            candidate = kept + [column]
+            if np.linalg.matrix_rank(gram.loc[candidate, candidate].to_numpy()) == len(candidate):
+                kept = candidate
+        return design[kept]
+
+    def _fit_mixed_model(self, X: np.ndarray, y: np.ndarray, participants: np.ndarray,
+                         time_weeks: np.ndarray, start: Optional[Dict] = None,
+                         max_iter: int = 500, tol: float = 1e-10) -> Dict:
+        """
+        Maximum-likelihood fit of y = Xβ + b0_i + b1_i·t + ε with
+        (b0_i, b1_i) ~ N(0, G) and ε ~ N(0, σ²) by ECM: a GLS step for β
+        and an EM step for G and σ² per iteration.
+
+        The random-effects design Z is a sparse N × 2m matrix. After one pass
+        to form Z'Z, Z'X, Z'y and the global X'X, X'y, y'y, every iteration
+        works on batched 2 × 2 per-participant blocks through the Woodbury
+        identity, so its cost grows with participants, not observations.
+        """
+        codes, _ = pd.factorize(participants)
+        m, p = codes.max() + 1, X.shape[1]
+        rows = np.repeat(np.arange(len(y)), 2)
+        cols = np.column_stack([2 * codes, 2 * codes + 1]).ravel()
+        values = np.column_stack([np.ones(len(y)), time_weeks]).ravel()
+        Z = sparse.csr_matrix((values, (rows, cols)), shape=(len(y), 2 * m))
+        
+        ZtZ_sparse = (Z.T @ Z).tocsr()
+        diagonal, off_diagonal = ZtZ_sparse.diagonal(), ZtZ_sparse.diagonal(1)[0::2]
+        ZtZ = np.stack([diagonal[0::2], off_diagonal, off_diagonal, diagonal[1::2]], axis=1).reshape(m, 2, 2)
+        ZtX = np.asarray(Z.T @ X).reshape(m, 2, p)
+        Zty = np.asarray(Z.T @ y).reshape(m, 2)
+        XtX, Xty, yty = X.T @ X, X.T @ y, y @ y
+        n = len(y)
+        # Keeps σ² positive when trajectories are fitted exactly
+        sigma2_floor = 1e-10 * max(np.var(y), 1.0)
+        
+        if start is not None:
+            beta, G, sigma2 = start['beta'].copy(), start['G'].copy(), start['sigma2']
+        else:
+            beta = np.linalg.lstsq(X, y, rcond=None)[0]
+            residual_var = max(np.var(y - X @ beta), sigma2_floor)
+            sigma2 = residual_var / 2
+            G = np.diag([residual_var / 2, residual_var / (2 * (np.var(time_weeks) + 1))])
+        
+        identity = np.eye(2)
+        log_likelihood, converged = -np.inf, False
+        for iteration in range(1, max_iter + 1):
+            # Posterior covariance of each participant's effects, C_i = G(Z'Z G/σ² + I)⁻¹
+            M = ZtZ @ G / sigma2 + identity
+            C = G @ np.linalg.inv(M)
+            
+            # GLS update of β with V⁻¹ = I/σ² - Z C Z'/σ⁴ applied block by block
+            XtVX = XtX / sigma2 - np.einsum('mip,mij,mjq->pq', ZtX, C, ZtX) / sigma2 ** 2
+            XtVy = Xty / sigma2 - np.einsum('mip,mij,mj->p', ZtX, C, Zty) / sigma2 ** 2
+            beta = np.linalg.solve(XtVX, XtVy)
+            
+            Ztr = Zty - ZtX @ beta
+            rtr = yty - 2 * beta @ Xty + beta @ XtX @ beta
+            rVr = rtr / sigma2 - np.einsum('mi,mij,mj->', Ztr, C, Ztr) / sigma2 ** 2
+            previous, log_likelihood = log_likelihood, -0.5 * (
+                n * np.log(2 * np.pi * sigma2) + np.linalg.slogdet(M)[1].sum() + rVr
+            )
+            if abs(log_likelihood - previous) < tol * (1 + abs(log_likelihood)):
+                converged = True
+                break
+            
+            # EM update of the variance components from the posterior moments
+            b = np.einsum('mij,mj->mi', C, Ztr) / sigma2
+            residual_ss = (rtr - 2 * np.einsum('mi,mi->', b, Ztr)
+                           + np.einsum('mi,mij,mj->', b, ZtZ, b))
+            sigma2 = max((residual_ss + np.einsum('mij,mji->', C, ZtZ)) / n, sigma2_floor)
+            G = (np.einsum('mi,mj->ij', b, b) + C.sum(axis=0)) / m
+        
+        return {
+            'beta': beta,
+            'covariance': np.linalg.inv(XtVX),
+            'G': G,
+            'sigma2': sigma2,
+            'log_likelihood': log_likelihood,
+            'iterations': iteration,
+            'converged': converged,
+            'participants': m,
+            'observations': n
+        }
+
+    @profiled()
+    def fit_mixed_progression_model(self, metrics: Optional[List[str]] = None,
+                                    max_iter: int = 500, warm_start: bool = True,
+                                    snapshot: Optional[Snapshot] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Repeated-measures progression model per metric, with a random
+        intercept and slope per participant and fixed effects for
+        group × time, age band and training status (see _mixed_model_design).
+        Time is in study weeks, so 'creatine:time' is the difference in
+        weekly progression between creatine and placebo.
+
+        With warm_start=True each metric's fit starts from this instance's
+        previous estimates for it, which makes refits after new data cheap.
+        """
+        try:
+            metrics = metrics or RATE_METRICS
+            progress_data = self._get_progress_data(snapshot)
+            
+            fixed_effects, variance_components, fit_statistics = [], [], []
+            for metric in metrics:
+                data = progress_data.dropna(
+                    subset=[metric, 'study_day', 'age', 'group_assignment', 'training_status']
+                )
+                if data['participant_id'].nunique() < 2:
+                    continue
+                design = self._mixed_model_design(data)
+                terms = list(design.columns)
+                
+                previous = self._mixed_model_estimates.get(metric) if warm_start else None
+                start = previous if previous is not None and previous['terms'] == terms else None
+                fit = self._fit_mixed_model(
+                    design.to_numpy(), data[metric].to_numpy(dtype=float),
+                    data['participant_id'].to_numpy(), data['study_day'].to_numpy(dtype=float) / 7.0,
+                    start=start, max_iter=max_iter
+                )
+                self._mixed_model_estimates[metric] = {
+                    'terms': terms, 'beta': fit['beta'], 'G': fit['G'], 'sigma2': fit['sigma2']
+                }
+                
+                std_error = np.sqrt(np.diag(fit['covariance']))
+                z_value = fit['beta'] / std_error
+                z_critical = stats.norm.ppf(0.975)
+                fixed_effects.append(pd.DataFrame({
+                    'metric': metric,
+                    'term': terms,
+                    'estimate': fit['beta'],
+                    'std_error': std_error,
+                    'z_value': z_value,
+                    'p_value': 2 * stats.norm.sf(np.abs(z_value)),
+                    'ci_lower': fit['beta'] - z_critical * std_error,
+                    'ci_upper': fit['beta'] + z_critical * std_error
+                }))
+                variance_components.append({
+                    'metric': metric,
+                    'intercept_var': fit['G'][0, 0],
+                    'slope_var': fit['G'][1, 1],
+                    'intercept_slope_cov': fit['G'][0, 1],
+                    'residual_var': fit['sigma2']
+                })
+                fit_statistics.append({
+                    'metric': metric,
+                    'participants': fit['participants'],
+                    'observations': fit['observations'],
+                    'log_likelihood': fit['log_likelihood'],
+                    'iterations': fit['iterations'],
+                    'converged': fit['converged'],
+                    'warm_started': start is not None
+                })
+            
+            fixed_effects = (pd.concat(fixed_effects, ignore_index=True) if fixed_effects
+                             else pd.DataFrame(columns=['metric', 'term', 'estimate', 'std_error']))
+            results = {
+                'group_time_interaction': fixed_effects[
+                    fixed_effects['term'] == 'creatine:time'
+                ].reset_index(drop=True),
+                'fixed_effects': fixed_effects,
+                'variance_components': pd.DataFrame(variance_components),
+                'fit_statistics': pd.DataFrame(fit_statistics)
+            }
+            
+            logger.info(f"Mixed progression models fitted for {len(fit_statistics)} metrics")
+            return results
+        except Exception as e:
+            logger.error(f"Error fitting mixed progression model: {e}")
+            raise
+
+    @profiled()
+    @cached_result
+    def analyze_training_impact(self, snapshot: Optional[Snapshot] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Analyze the impact of different training protocols. The compliance
+        analysis holds the gains per group and recorded compliance band (see
+        analyze_training_compliance).
+        """
         try:
             # Get training program analysis
-            program_analysis = self.db.run_analysis_query("Training Program Analysis")
+            program_analysis = self._run_query("Training Program Analysis", snapshot)
             
             # Get training compliance impact
-            compliance_analysis = self.db.run_analysis_query("Training Compliance Impact")
+            compliance_analysis = self.analyze_training_compliance(snapshot=snapshot)['compliance_bands']
             
             # Combine analyses
             results = {
@@ -159,56 +696,350 @@ class CreatineAnalysis:
             logger.error(f"Error analyzing training impact: {e}")
             raise
 
-    def analyze_age_effects(self) -> pd.DataFrame:
+    def _get_training_assignments(self, snapshot: Optional[Snapshot] = None) -> pd.DataFrame:
+        """Return training assignments from the snapshot if given, else from the database."""
+        if snapshot is not None:
+            return snapshot['training_assignments']
+        return self.db.get_training_assignments()
+
+    @profiled()
+    def _join_active_training(self, progress_data: pd.DataFrame,
+                              assignments: pd.DataFrame) -> pd.DataFrame:
+        """
+        Interval-join every measurement to the training assignment active on
+        its date: the participant's latest assignment starting on or before
+        the measurement date, provided it has not ended by then (a missing
+        end date is open-ended). Overlapping assignments therefore resolve
+        to the most recently started one. Implemented as one sorted as-of
+        merge, so the cost grows with (measurements + assignments) log,
+        however many assignments a participant has. Measurements outside
+        any assignment get NaN assignment columns.
+        """
+        columns = ['assignment_id', 'program_id', 'program_name', 'compliance_percentage']
+        # Both keys share one resolution, which to_datetime infers per column
+        measurements = progress_data.assign(
+            _date=pd.to_datetime(progress_data['measurement_date']).astype('datetime64[ns]'),
+            _row=np.arange(len(progress_data)),
+            participant_id=progress_data['participant_id'].astype('int64')
+        ).sort_values('_date', kind='mergesort')
+        periods = assignments.dropna(subset=['start_date']).assign(
+            _date=lambda df: pd.to_datetime(df['start_date']).astype('datetime64[ns]'),
+            _end=lambda df: pd.to_datetime(df['end_date']).astype('datetime64[ns]'),
+            participant_id=lambda df: df['participant_id'].astype('int64')
+        ).sort_values('_date', kind='mergesort')
+
+        joined = pd.merge_asof(
+            measurements, periods[['participant_id', '_date', '_end'] + columns],
+            on='_date', by='participant_id', direction='backward'
+        )
+        ended = joined['_end'].notnull() & (joined['_date'] > joined['_end'])
+        joined.loc[ended, columns] = np.nan
+        return joined.sort_values('_row').drop(columns=['_date', '_end', '_row']).reset_index(drop=True)
+
+    @profiled()
+    @cached_result
+    def analyze_training_compliance(self, snapshot: Optional[Snapshot] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Strength and lean mass gains by recorded training compliance. Each
+        measurement is interval-joined to its active program assignment in
+        participant_training; gains run from the first to the last
+        measurement within an assignment (assignments with fewer than two
+        measurements are skipped). Returns per-assignment gains and their
+        means per group and compliance band (see COMPLIANCE_BANDS).
+        """
+        try:
+            joined = self._join_active_training(
+                self._get_progress_data(snapshot), self._get_training_assignments(snapshot)
+            )
+            joined = joined[joined['assignment_id'].notnull()].sort_values(
+                ['assignment_id', 'measurement_date'], kind='mergesort'
+            )
+            
+            periods = joined.groupby('assignment_id', sort=False)
+            gains = periods[['participant_id', 'group_assignment', 'training_status',
+                             'program_name', 'compliance_percentage']].first()
+            gains['measurement_count'] = periods.size()
+            for metric, name in (('strength_1rm_kg', 'strength'), ('lean_mass_kg', 'mass')):
+                first, last = periods[metric].first(), periods[metric].last()
+                gains[f'{name}_gain_percentage'] = (last - first) / first * 100
+            gains = gains[gains['measurement_count'] > 1].assign(
+                compliance_band=lambda df: pd.cut(df['compliance_percentage'], COMPLIANCE_BINS,
+                                                  labels=COMPLIANCE_BANDS, right=False)
+            )
+            
+            bands = gains.groupby(['group_assignment', 'compliance_band'], observed=True).agg(
+                participant_count=('participant_id', 'nunique'),
+                assignment_count=('participant_id', 'size'),
+                avg_compliance=('compliance_percentage', 'mean'),
+                strength_gain_percentage=('strength_gain_percentage', 'mean'),
+                mass_gain_percentage=('mass_gain_percentage', 'mean')
+            ).reset_index()
+            
+            logger.info(f"Training compliance analyzed for {len(gains)} program assignments")
+            return {
+                'assignment_gains': gains.reset_index(),
+                'compliance_bands': bands
+            }
+        except Exception as e:
+            logger.error(f"Error analyzing training compliance: {e}")
+            raise
+
+    @profiled()
+    @cached_result
+    def analyze_age_effects(self, snapshot: Optional[Snapshot] = None) -> pd.DataFrame:
         """Analyze the effect of age on supplementation outcomes."""
         try:
-            age_analysis = self.db.run_analysis_query("Age Group Analysis")
+            age_analysis = self._run_query("Age Group Analysis", snapshot)
             logger.info("Age effects analysis completed")
             return age_analysis
         except Exception as e:
             logger.error(f"Error analyzing age effects: {e}")
             raise
 
-    def analyze_dosing_protocols(self) -> pd.DataFrame:
+    @profiled()
+    @cached_result
+    def analyze_dosing_protocols(self, snapshot: Optional[Snapshot] = None) -> pd.DataFrame:
         """Analyze effectiveness of different dosing protocols."""
         try:
-            dosing_analysis = self.db.run_analysis_query("Dosing Protocol Analysis")
+            dosing_analysis = self._run_query("Dosing Protocol Analysis", snapshot)
             logger.info("Dosing protocol analysis completed")
             return dosing_analysis
         except Exception as e:
             logger.error(f"Error analyzing dosing protocols: {e}")
             raise
 
-    def analyze_fatigue_and_recovery(self) -> Dict[str, pd.DataFrame]:
+    def _cumulative_doses(self, data: pd.DataFrame, phases: pd.DataFrame) -> np.ndarray:
+        """
+        Creatine (g) taken before each row's study_day, following the phases
+        of its dosing_protocol from day 0. Placebo rows get none.
+        """
+        days = data['study_day'].to_numpy(dtype=float)
+        dosed = (data['group_assignment'] == 'creatine').to_numpy()
+        protocols = data['dosing_protocol'].to_numpy()
+        doses = np.zeros(len(data))
+        for phase in phases.itertuples(index=False):
+            taken = phase.daily_dose_g * np.clip(days - phase.start_day, 0, phase.duration_days)
+            doses += np.where(dosed & (protocols == phase.dosing_protocol), taken, 0)
+        return doses
+
+    def _fit_dose_response(self, weeks: np.ndarray, doses: np.ndarray, gains: np.ndarray,
+                           participants: np.ndarray, weights: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Least-squares fits of gain = e0 + week_slope * week + emax * dose / (ed50 + dose)
+        for every row of participant weights at once (the observed sample and
+        bootstrap resamples, as counts per participant code). At a fixed ED50
+        the model is linear, so the per-participant sums of its normal
+        equations are built once for every value of ED50_GRID, weighted for
+        all resamples in one matrix product and solved as a batch of 3x3
+        systems. Each resample keeps the ED50 with the smallest residual sum
+        of squares; resamples without dosed observations are NaN.
+        """
+        n_participants = weights.shape[1]
+        membership = sparse.csr_matrix(
+            (np.ones(len(gains)), (participants, np.arange(len(gains)))),
+            shape=(n_participants, len(gains))
+        )
+        base = membership @ np.column_stack([
+            np.ones(len(gains)), weeks, weeks * weeks, gains, weeks * gains, gains * gains
+        ])
+        # Saturation terms per grid value, in chunks of the grid to bound memory
+        grid_sums = []
+        for grid in np.array_split(ED50_GRID, -(-len(ED50_GRID) // ED50_CHUNK)):
+            saturation = doses[:, None] / (grid[None, :] + doses[:, None])
+            grid_sums.append([membership @ saturation,
+                              membership @ (saturation * weeks[:, None]),
+                              membership @ (saturation * saturation),
+                              membership @ (saturation * gains[:, None])])
+        per_participant = np.hstack([base] + [np.hstack([chunk[term] for chunk in grid_sums])
+                                              for term in range(4)])
+
+        totals = weights @ per_participant
+        n, sw, sww, sy, swy, syy = (totals[:, [column]] for column in range(6))
+        sh, swh, shh, shy = np.split(totals[:, 6:], 4, axis=1)
+        ones = np.ones_like(sh)
+        xtx = np.stack([
+            np.stack([n * ones, sw * ones, sh], axis=-1),
+            np.stack([sw * ones, sww * ones, swh], axis=-1),
+            np.stack([sh, swh, shh], axis=-1)
+        ], axis=-2)
+        xty = np.stack([sy * ones, swy * ones, shy], axis=-1)
+        coefficients = np.einsum('bgij,bgj->bgi', np.linalg.pinv(xtx), xty)
+        residual_ss = syy - np.einsum('bgi,bgi->bg', coefficients, xty)
+
+        best = np.argmin(residual_ss, axis=1)
+        rows = np.arange(len(weights))
+        chosen = coefficients[rows, best]
+        valid = sh[:, -1] > 0
+        total_ss = (syy - sy * sy / n)[:, 0]
+        return {
+            'e0': np.where(valid, chosen[:, 0], np.nan),
+            'week_slope': np.where(valid, chosen[:, 1], np.nan),
+            'emax': np.where(valid, chosen[:, 2], np.nan),
+            'ed50_g': np.where(valid, ED50_GRID[best], np.nan),
+            'at_bound': valid & ((best == 0) | (best == len(ED50_GRID) - 1)),
+            'r_squared': np.where(valid, 1 - residual_ss[rows, best] / total_ss, np.nan)
+        }
+
+    @profiled()
+    @cached_result
+    def analyze_dose_response(self, strata: Optional[List[str]] = None, n_bootstrap: int = 1000,
+                              seed: int = 0) -> Dict[str, pd.DataFrame]:
+        """
+        Response of strength and lean mass gains to cumulative creatine dose.
+        Each participant's cumulative dose at every visit follows the phases
+        of their dosing protocol (dosing_schedule and dosing_protocols);
+        placebo participants take none. Per stratum of participant attributes
+        (default training status) and metric, the percentage gain from the
+        first visit is fitted with a saturating Emax curve on top of a linear
+        training trend shared with placebo:
+            gain = e0 + week_slope * week + emax * dose / (ed50_g + dose)
+        Percentile 95% intervals come from n_bootstrap resamples of
+        participants, fitted in one batch per stratum and metric.
+        ed50_g is estimated on ED50_GRID, and ed50_at_bound marks estimates
+        at either end of it.
+        """
+        try:
+            strata = ['training_status'] if strata is None else list(strata)
+            participants = self.db.get_participant_data()
+            invalid = [column for column in strata
+                       if column not in participants.columns or column == 'participant_id']
+            if invalid:
+                raise ValueError(f"Invalid strata: {', '.join(invalid)}")
+
+            progress_data = self._get_progress_data()
+            attributes = ['dosing_protocol'] + [column for column in strata
+                                                if column not in progress_data.columns
+                                                and column != 'dosing_protocol']
+            data = progress_data.merge(participants[['participant_id'] + attributes],
+                                       on='participant_id', how='left')
+            data = data.dropna(subset=['study_day']).sort_values(
+                ['participant_id', 'study_day'], kind='mergesort'
+            ).reset_index(drop=True)
+            data['cumulative_dose_g'] = self._cumulative_doses(data, self.db.get_dosing_phases())
+            data['week'] = data['study_day'] / 7.0
+            for metric, gain in DOSE_RESPONSE_METRICS.items():
+                baseline = data.groupby('participant_id')[metric].transform('first')
+                data[gain] = (data[metric] / baseline - 1) * 100
+
+            rng = np.random.default_rng(seed)
+            fits = []
+            strata_groups = data.groupby(strata, sort=True, dropna=False) if strata else [((), data)]
+            for key, stratum in strata_groups:
+                for metric, gain in DOSE_RESPONSE_METRICS.items():
+                    rows = stratum[stratum[gain].notnull() & (stratum['study_day'] > 0)]
+                    codes, uniques = pd.factorize(rows['participant_id'])
+                    if len(uniques) < 2:
+                        continue
+                    weights = np.vstack([
+                        np.ones(len(uniques)),
+                        rng.multinomial(len(uniques), np.full(len(uniques), 1 / len(uniques)),
+                                        size=n_bootstrap)
+                    ]).astype(float)
+                    fit = self._fit_dose_response(
+                        rows['week'].to_numpy(dtype=float), rows['cumulative_dose_g'].to_numpy(),
+                        rows[gain].to_numpy(dtype=float), codes, weights
+                    )
+
+                    record = dict(zip(strata, key))
+                    record.update({
+                        'metric': metric,
+                        'response': gain,
+                        'participants': len(uniques),
+                        'creatine_participants': rows.loc[rows['group_assignment'] == 'creatine',
+                                                          'participant_id'].nunique(),
+                        'observations': len(rows)
+                    })
+                    for name in ('e0', 'week_slope', 'emax', 'ed50_g', 'r_squared'):
+                        record[name] = fit[name][0]
+                    for name in ('emax', 'ed50_g'):
+                        resampled = fit[name][1:]
+                        resampled = resampled[~np.isnan(resampled)]
+                        lower, upper = (np.percentile(resampled, [2.5, 97.5]) if len(resampled)
+                                        else (np.nan, np.nan))
+                        record[f'{name}_ci_lower'], record[f'{name}_ci_upper'] = lower, upper
+                    record['ed50_at_bound'] = bool(fit['at_bound'][0])
+                    fits.append(record)
+
+            cumulative_doses = data.groupby('participant_id', sort=True).agg(
+                group_assignment=('group_assignment', 'first'),
+                dosing_protocol=('dosing_protocol', 'first'),
+                last_study_day=('study_day', 'max'),
+                cumulative_dose_g=('cumulative_dose_g', 'max')
+            ).reset_index()
+
+            results = {
+                'dose_response': pd.DataFrame(fits),
+                'cumulative_doses': cumulative_doses
+            }
+            logger.info(f"Dose-response curves fitted for {len(fits)} strata and metrics")
+            return results
+        except Exception as e:
+            logger.error(f"Error analyzing dose response: {e}")
+            raise
+
+    @profiled()
+    def _compute_recovery_patterns(self, progress_data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Visit-to-visit recovery metrics per participant, from one sorted
+        grouped-diff pass: mean change in fatigue, performance and CK level,
+        both per visit and normalized per day between visits.
+        """
+        data = progress_data.sort_values(['participant_id', 'measurement_date'], kind='mergesort')
+        pids = data['participant_id']
+        
+        deltas = data[list(RECOVERY_METRICS)].groupby(pids).diff()
+        day_gaps = pd.to_datetime(data['measurement_date']).groupby(pids).diff().dt.days
+        per_day = deltas.div(day_gaps.where(day_gaps > 0), axis=0)
+        
+        changes = pd.concat([
+            deltas.rename(columns={metric: f'avg_{name}' for metric, name in RECOVERY_METRICS.items()}),
+            per_day.rename(columns={metric: f'{name}_per_day' for metric, name in RECOVERY_METRICS.items()})
+        ], axis=1)
+        recovery = changes.groupby(pids).mean()
+        
+        participants = data.groupby('participant_id').agg(
+            group_assignment=('group_assignment', 'first'),
+            visit_count=('group_assignment', 'size')
+        )
+        recovery = participants.join(recovery)
+        recovery = recovery[recovery['visit_count'] > 1].drop(columns='visit_count')
+        return recovery.reset_index()[['participant_id'] + list(recovery.columns)]
+
+    def _summarize_recovery(self, recovery_df: pd.DataFrame) -> pd.DataFrame:
+        """Distribution of each recovery metric per group, one row per group and metric."""
+        metrics = [column for column in recovery_df.columns
+                   if column not in ('participant_id', 'group_assignment')]
+        if recovery_df.empty:
+            return pd.DataFrame(columns=['group_assignment', 'metric'])
+        distributions = recovery_df.groupby('group_assignment')[metrics].describe().stack(level=0)
+        distributions.index.names = ['group_assignment', 'metric']
+        return distributions.reset_index()
+
+    @profiled()
+    @cached_result
+    def analyze_fatigue_and_recovery(self, snapshot: Optional[Snapshot] = None) -> Dict[str, pd.DataFrame]:
         """Analyze fatigue levels and recovery patterns."""
         try:
             # Get fatigue level analysis
-            fatigue_analysis = self.db.run_analysis_query("Fatigue Level Analysis")
+            fatigue_analysis = self._run_query("Fatigue Level Analysis", snapshot)
             
             # Calculate recovery patterns
-            progress_data = self.db.get_progress_data()
-            recovery_patterns = []
-            
-            for pid in progress_data['participant_id'].unique():
-                participant_data = progress_data[progress_data['participant_id'] == pid].sort_values('measurement_date')
-                
-                if len(participant_data) > 1:
-                    # Calculate recovery metrics
-                    fatigue_recovery = participant_data['fatigue_level'].diff().mean()
-                    performance_recovery = participant_data['performance_score'].diff().mean()
-                    
-                    recovery_patterns.append({
-                        'participant_id': pid,
-                        'group_assignment': participant_data['group_assignment'].iloc[0],
-                        'avg_fatigue_recovery': fatigue_recovery,
-                        'avg_performance_recovery': performance_recovery
-                    })
-            
-            recovery_df = pd.DataFrame(recovery_patterns)
+            if self.use_participant_cache:
+                cache = self._get_participant_cache(snapshot)
+                recovery_columns = [f'{prefix}{name}{suffix}'
+                                    for prefix, suffix in (('avg_', ''), ('', '_per_day'))
+                                    for name in RECOVERY_METRICS.values()]
+                recovery_df = cache.loc[
+                    cache['measurement_count'] > 1,
+                    ['participant_id', 'group_assignment'] + recovery_columns
+                ].reset_index(drop=True)
+            else:
+                recovery_df = self._compute_recovery_patterns(self._get_progress_data(snapshot))
             
             results = {
                 'fatigue_analysis': fatigue_analysis,
-                'recovery_patterns': recovery_df
+                'recovery_patterns': recovery_df,
+                'recovery_distributions': self._summarize_recovery(recovery_df)
             }
             
             logger.info("Fatigue and recovery analysis completed")
@@ -217,19 +1048,140 @@ class CreatineAnalysis:
             logger.error(f"Error analyzing fatigue and recovery: {e}")
             raise
 
-    def generate_summary_report(self) -> Dict:
-        """Generate a comprehensive summary report of all analyses."""
+    @profiled()
+    @cached_result
+    def calculate_rolling_metrics(self, window_weeks: int = 4, metrics: Optional[List[str]] = None,
+                                  snapshot: Optional[Snapshot] = None) -> pd.DataFrame:
+        """
+        Rolling trends per participant on the study-week time axis. For every
+        measurement and metric, over the window of the preceding window_weeks
+        weeks of study time (current visit included):
+          {metric}_rolling_mean  - mean of the visits in the window
+          {metric}_rolling_slope - least-squares change per week over those visits
+          {metric}_delta         - change from the last visit at least
+                                   window_weeks weeks earlier
+        All participants are rolled in one time-based window pass.
+        """
         try:
-            report = {
-                'effect_sizes': self.calculate_effect_sizes(),
-                'progression_rates': self.analyze_progression_rates(),
-                'training_impact': self.analyze_training_impact(),
-                'age_effects': self.analyze_age_effects(),
-                'dosing_protocols': self.analyze_dosing_protocols(),
-                'fatigue_recovery': self.analyze_fatigue_and_recovery()
-            }
-            
-            logger.info("Summary report generated successfully")
+            metrics = metrics or RATE_METRICS
+            data = self._get_progress_data(snapshot).sort_values(
+                ['participant_id', 'study_day'], kind='mergesort'
+            ).reset_index(drop=True)
+            window_days = 7 * window_weeks
+            weeks = data['study_day'] / 7.0
+
+            # Rolling sums of n, y, t, t*y and t² give the window mean and OLS slope
+            columns = {}
+            for metric in metrics:
+                observed = data[metric].notnull()
+                t = weeks.where(observed)
+                columns[f'{metric}:n'] = observed.astype(float)
+                columns[f'{metric}:y'] = data[metric]
+                columns[f'{metric}:t'] = t
+                columns[f'{metric}:ty'] = t * data[metric]
+                columns[f'{metric}:tt'] = t * t
+            terms = pd.DataFrame(columns)
+
+            # Lay participants end to end on one time axis, separated by more
+            # than a window, so a single rolling pass never mixes participants
+            stride = int(data['study_day'].max()) + window_days + 1 if len(data) else 0
+            offsets = pd.factorize(data['participant_id'])[0] * stride
+            terms['elapsed'] = pd.to_timedelta(offsets + data['study_day'], unit='D')
+            sums = terms.rolling(f'{window_days}D', on='elapsed').sum()
+
+            # Value at the last visit at least one window earlier
+            lagged = pd.merge_asof(
+                data[['participant_id']].assign(lag_day=data['study_day'] - window_days,
+                                                row=data.index).sort_values('lag_day'),
+                data[['participant_id', 'study_day'] + metrics]
+                    .rename(columns={'study_day': 'lag_day'}).sort_values('lag_day'),
+                on='lag_day', by='participant_id', direction='backward'
+            ).set_index('row').sort_index()
+
+            result = data[['participant_id', 'group_assignment', 'training_status',
+                           'measurement_date', 'study_day', 'study_week']].copy()
+            for metric in metrics:
+                count = sums[f'{metric}:n'].where(sums[f'{metric}:n'] > 0)
+                mean_t, mean_y = sums[f'{metric}:t'] / count, sums[f'{metric}:y'] / count
+                variance_t = sums[f'{metric}:tt'] / count - mean_t ** 2
+                valid = (count > 1) & (variance_t > 1e-12)
+                result[f'{metric}_rolling_mean'] = mean_y
+                result[f'{metric}_rolling_slope'] = (
+                    (sums[f'{metric}:ty'] / count - mean_t * mean_y) / variance_t
+                ).where(valid)
+                result[f'{metric}_delta'] = data[metric] - lagged[metric]
+
+            logger.info(f"Rolling {window_weeks}-week metrics calculated for {len(result)} measurements")
+            return result
+        except Exception as e:
+            logger.error(f"Error calculating rolling metrics: {e}")
+            raise
+
+    @profiled()
+    @cached_result
+    def generate_summary_report(self, concurrent: bool = False,
+                                max_workers: Optional[int] = None) -> Dict:
+        """
+        Generate a comprehensive summary report of all analyses.
+
+        With concurrent=True the progress data and named queries are loaded
+        once as a consistent snapshot and the sections run on a thread pool.
+        The report then also carries per-section wall times in seconds under
+        'section_timings'.
+        """
+        try:
+            if not concurrent:
+                report = {
+                    section: getattr(self, method)()
+                    for section, method in REPORT_SECTIONS.items()
+                }
+                logger.info("Summary report generated successfully")
+                return report
+
+            start = time.perf_counter()
+            if self.use_participant_cache:
+                self.refresh_participant_cache()
+            extra_queries = {'training_assignments': TRAINING_ASSIGNMENTS_QUERY}
+            if self.use_participant_cache:
+                extra_queries['participant_cache'] = PARTICIPANT_CACHE_QUERY
+            if self.pushdown:
+                extra_queries['group_moments'] = self.db.build_group_moments_query(
+                    EFFECT_SIZE_GROUPING, RATE_METRICS, self.exclude_outliers
+                )
+                extra_queries['rate_moments'] = self.db.build_rate_moments_query(
+                    RATE_SUMMARY_GROUPING, RATE_METRICS, self.exclude_outliers
+                )
+            # The training compliance join always reads the raw progress rows
+            query_names = [name for name in REPORT_QUERIES
+                           if self.cube is None or name not in CUBE_QUERIES]
+            snapshot = self.db.get_snapshot(
+                query_names, extra_queries=extra_queries,
+                exclude_outliers=self.exclude_outliers
+            )
+            timings = {'snapshot': time.perf_counter() - start}
+
+            report_span = self.profiler.current_span()
+
+            def run_section(method: str):
+                section_start = time.perf_counter()
+                with self.profiler.attach(report_span):
+                    result = getattr(self, method)(snapshot=snapshot)
+                return result, time.perf_counter() - section_start
+
+            workers = max_workers or len(REPORT_SECTIONS)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    section: executor.submit(run_section, method)
+                    for section, method in REPORT_SECTIONS.items()
+                }
+                report = {}
+                for section, future in futures.items():
+                    report[section], timings[section] = future.result()
+
+            timings['total'] = time.perf_counter() - start
+            report['section_timings'] = timings
+
+            logger.info(f"Summary report generated concurrently in {timings['total']:.3f}s")
             return report
         except Exception as e:
             logger.error(f"Error generating summary report: {e}")
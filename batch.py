@@ -0,0 +1,200 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Optional
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from scipy import stats
+import glob
+import json
+import logging
+from .database import CreatineDatabase
+from .analysis import CreatineAnalysis, make_serializable
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def _analyze_site(site: str, db_path: str, report_path: str, concurrent: bool,
+                  exclude_outliers: bool = False) -> Dict:
+    """
+    Generate the summary report for one site database in a worker process,
+    write it to report_path and return the site's effect sizes, each with
+    the number of participants per arm measured on its metric.
+    """
+    db = CreatineDatabase(db_path)
+    try:
+        report = CreatineAnalysis(db, exclude_outliers=exclude_outliers).generate_summary_report(
+            concurrent=concurrent
+        )
+        with open(report_path, 'w') as f:
+            json.dump(make_serializable(report), f, indent=4)
+
+        progress_data = db.get_progress_data(exclude_outliers=exclude_outliers)
+        effect_sizes = []
+        for metric, effects in report['effect_sizes']['effect_sizes'].items():
+            if effects.empty:
+                continue
+            # Participants, not measurements, are the independent units
+            participants = (progress_data[progress_data[metric].notnull()]
+                            .groupby('group_assignment')['participant_id'].nunique())
+            effect_sizes.append({
+                **effects.iloc[0].to_dict(),
+                'participants_creatine': int(participants.get('creatine', 0)),
+                'participants_placebo': int(participants.get('placebo', 0))
+            })
+        return {'site': site, 'effect_sizes': effect_sizes}
+    finally:
+        db.close()
+
+class BatchAnalysis:
+    def __init__(self, db_paths: List[str], max_workers: Optional[int] = None,
+                 concurrent: bool = False, exclude_outliers: bool = False):
+        """
+        Initialize a batch run over one database per study site. db_paths
+        may contain glob patterns; each site is named after its file stem.
+        With exclude_outliers=True each site leaves out the measurements
+        flagged by its own outlier screening.
+        """
+        self.db_paths = self.resolve_database_paths(db_paths)
+        self.max_workers = max_workers
+        self.concurrent = concurrent
+        self.exclude_outliers = exclude_outliers
+        logger.info(f"Batch analysis initialized for {len(self.db_paths)} sites")
+
+    @staticmethod
+    def resolve_database_paths(patterns: List[str]) -> List[str]:
+        """Expand glob patterns, keeping unmatched literal paths so they report as missing."""
+        paths = []
+        for pattern in patterns:
+            matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+            paths.extend(path for path in matches if path not in paths)
+        return paths
+
+    def _site_names(self) -> List[str]:
+        """Unique site names from the database file stems."""
+        names = []
+        for path in self.db_paths:
+            name = Path(path).stem
+            if name in names:
+                name = f"{name}_{len(names)}"
+            names.append(name)
+        return names
+
+    def run(self, output_dir: str = 'results/batch') -> Dict:
+        """
+        Run the summary report for every site on a process pool, writing one
+        JSON report per site and a pooled meta-analysis of the effect sizes.
+        A failing site is recorded with its error and does not stop the rest.
+        """
+        try:
+            output_path = Path(output_dir)
+            output_path.mkdir(parents=True, exist_ok=True)
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+            sites = {}
+            futures = {}
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                for site, db_path in zip(self._site_names(), self.db_paths):
+                    report_path = output_path / f'{site}_report_{timestamp}.json'
+                    sites[site] = {'db_path': db_path, 'report_path': str(report_path)}
+                    if not Path(db_path).is_file():
+                        sites[site].update(status='failed', error=f"Database not found: {db_path}")
+                        continue
+                    futures[site] = executor.submit(
+                        _analyze_site, site, db_path, str(report_path), self.concurrent,
+                        self.exclude_outliers
+                    )
+
+                site_effects = []
+                for site, future in futures.items():
+                    try:
+                        result = future.result()
+                        sites[site]['status'] = 'completed'
+                        site_effects.extend({'site': site, **row} for row in result['effect_sizes'])
+                    except Exception as e:
+                        logger.error(f"Analysis failed for site {site}: {e}")
+                        sites[site].update(status='failed', error=str(e))
+
+            for site in sites.values():
+                if site['status'] == 'failed':
+                    site.pop('report_path')
+
+            site_effects = pd.DataFrame(site_effects)
+            results = {
+                'sites': sites,
+                'site_effect_sizes': site_effects,
+                'meta_analysis': self.meta_analyze(site_effects)
+            }
+
+            meta_path = output_path / f'meta_analysis_{timestamp}.json'
+            with open(meta_path, 'w') as f:
+                json.dump(make_serializable(results), f, indent=4)
+
+            completed = sum(site['status'] == 'completed' for site in sites.values())
+            logger.info(f"Batch analysis completed for {completed}/{len(sites)} sites, "
+                        f"meta-analysis saved to {meta_path}")
+            return results
+        except Exception as e:
+            logger.error(f"Error running batch analysis: {e}")
+            raise
+
+    def meta_analyze(self, site_effects: pd.DataFrame, alpha: float = 0.05) -> pd.DataFrame:
+        """
+        Pool per-site Cohen's d by inverse-variance weighting, reporting both
+        the fixed-effect estimate and the DerSimonian-Laird random-effects
+        estimate with its confidence interval, tau² and I². The variance of
+        each d uses the site's participant counts per arm
+        (participants_creatine, participants_placebo), since repeated visits
+        of one participant are not independent observations.
+        """
+        columns = ['metric', 'sites', 'fixed_effect_size', 'pooled_effect_size',
+                   'ci_lower', 'ci_upper', 'q_statistic', 'tau2', 'i2', 'interpretation']
+        if site_effects.empty:
+            return pd.DataFrame(columns=columns)
+
+        valid = site_effects.dropna(subset=['effect_size'])
+        valid = valid[(valid['participants_creatine'] > 0) & (valid['participants_placebo'] > 0)]
+        n1, n2, d = valid['participants_creatine'], valid['participants_placebo'], valid['effect_size']
+        valid = valid.assign(variance=(n1 + n2) / (n1 * n2) + d ** 2 / (2 * (n1 + n2)))
+
+        z = stats.norm.ppf(1 - alpha / 2)
+        pooled = []
+        for metric, group in valid.groupby('metric', sort=False):
+            weights = 1 / group['variance']
+            fixed = (weights * group['effect_size']).sum() / weights.sum()
+            q = (weights * (group['effect_size'] - fixed) ** 2).sum()
+            df = len(group) - 1
+            c = weights.sum() - (weights ** 2).sum() / weights.sum()
+            tau2 = max((q - df) / c, 0.0) if df > 0 else 0.0
+
+            random_weights = 1 / (group['variance'] + tau2)
+            estimate = (random_weights * group['effect_size']).sum() / random_weights.sum()
+            se = np.sqrt(1 / random_weights.sum())
+            pooled.append({
+                'metric': metric,
+                'sites': len(group),
+                'fixed_effect_size': fixed,
+                'pooled_effect_size': estimate,
+                'ci_lower': estimate - z * se,
+                'ci_upper': estimate + z * se,
+                'q_statistic': q,
+                'tau2': tau2,
+                'i2': max((q - df) / q, 0.0) if q > 0 else 0.0,
+                'interpretation': CreatineAnalysis._interpret_effect_size(estimate)
+            })
+
+        return pd.DataFrame(pooled, columns=columns)
+
+if __name__ == "__main__":
+    import sys
+
+    # Example usage: python -m src.batch 'sites/*.db'
+    batch = BatchAnalysis(sys.argv[1:] or ['*.db'])
+    results = batch.run()
+    print("\nPooled Effect Sizes")
+    print("===================")
+    print(results['meta_analysis'])
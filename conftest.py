@@ -0,0 +1,102 @@
+import pytest
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from src.database import CreatineDatabase
+
+STUDY_START = datetime(2024, 1, 1).date()
+
+# Participant columns and their values unless a test overrides them
+PARTICIPANT = {
+    'age': 25,
+    'gender': 'male',
+    'weight_kg': 78.0,
+    'height_cm': 178.0,
+    'training_experience_years': 2.0,
+    'training_status': 'trained',
+    'group_assignment': 'creatine',
+    'dosing_protocol': 'loading',
+    'population_category': 'young trained'
+}
+
+def steady_visit(participant: Dict, week: int, rng: np.random.Generator) -> Dict:
+    """
+    Noise-free weekly visit: strength rises by the participant's strength_step
+    (4 kg on creatine, 2.5 kg on placebo) from baseline, lean mass by mass_step.
+    """
+    creatine = participant['group_assignment'] == 'creatine'
+    return {
+        'strength_1rm_kg': participant.get('baseline', 100.0) +
+                           week * participant.get('strength_step', 4.0 if creatine else 2.5),
+        'lean_mass_kg': 65.0 + week * participant.get('mass_step', 0.3),
+        'muscle_thickness_mm': 35.0 + week * 0.2,
+        'creatine_kinase_level': 150.0 + week * 10,
+        'performance_score': 8.5 + week * 0.2,
+        'fatigue_level': 5 - week % 3
+    }
+
+def build_study_db(db_path: str, participants: List[Dict], weeks: int = 4,
+                   visit: Optional[Callable] = None, seed: int = 0,
+                   noise: Optional[Dict[str, float]] = None,
+                   errors: Optional[Dict[Tuple[int, int], Dict]] = None,
+                   by_week: bool = False,
+                   single_visits: Tuple[Tuple[int, int], ...] = ()) -> CreatineDatabase:
+    """
+    Create a study database with weekly visits from STUDY_START.
+
+    participants: overrides of PARTICIPANT, one dict each; other keys are only
+        passed on to visit.
+    visit(participant, week, rng): measurement columns replacing those of
+        steady_visit.
+    noise: standard deviation of normal noise added per column, drawn with seed.
+    errors: (participant index, week) -> entry errors replacing columns after
+        noise; a callable receives the correct value.
+    by_week: ingest one batch per week instead of one per participant.
+    single_visits: (participant index, week) visits ingested one row at a time
+        afterwards, e.g. repeating an already recorded date.
+    """
+    db = CreatineDatabase(db_path)
+    db.init_database()
+    rng = np.random.default_rng(seed)
+    people = []
+    for spec in participants:
+        participant = {**PARTICIPANT, **spec}
+        participant['participant_id'] = db.add_participant({key: participant[key] for key in PARTICIPANT})
+        people.append(participant)
+
+    def measurement(index, week):
+        participant = people[index]
+        values = steady_visit(participant, week, rng)
+        if visit is not None:
+            values.update(visit(participant, week, rng))
+        for column, sd in (noise or {}).items():
+            values[column] += rng.normal(0, sd)
+        for column, error in (errors or {}).get((index, week), {}).items():
+            values[column] = error(values[column]) if callable(error) else error
+        return {'participant_id': participant['participant_id'],
+                'measurement_date': STUDY_START + timedelta(weeks=week), **values}
+
+    if by_week:
+        for week in range(weeks):
+            db.add_measurements([measurement(index, week) for index in range(len(people))])
+    else:
+        for index in range(len(people)):
+            db.add_measurements([measurement(index, week) for week in range(weeks)])
+    for index, week in single_visits:
+        db.add_measurement(measurement(index, week))
+    return db
+
+@pytest.fixture
+def make_study_db(tmp_path):
+    """Build study databases under tmp_path with build_study_db, closed after the test."""
+    databases = []
+
+    def make(participants: List[Dict], **kwargs) -> CreatineDatabase:
+        (tmp_path / 'databases').mkdir(exist_ok=True)
+        databases.append(build_study_db(str(tmp_path / 'databases' / f'study_{len(databases)}.db'),
+                                        participants, **kwargs))
+        return databases[-1]
+
+    yield make
+    for db in databases:
+        db.close()
@@ -0,0 +1,193 @@
+import itertools
+import sqlite3
+import threading
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Optional, Union
+import logging
+from .database import CreatineDatabase, CUBE_DIMENSIONS, STATISTICS_METRICS
+from .profiling import profiled
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Named queries from queries.sql that are plain per-cell averages, answered
+# from the cube: their dimensions and output columns mapped to cube statistics
+CUBE_QUERIES = {
+    'Weekly Progress Tracking': {
+        'dimensions': ['group_assignment', 'training_status', 'measurement_date'],
+        'columns': {
+            'avg_strength': 'strength_1rm_kg_mean',
+            'avg_lean_mass': 'lean_mass_kg_mean',
+            'avg_performance': 'performance_score_mean',
+            'participant_count': 'participant_count'
+        }
+    },
+    'Fatigue Level Analysis': {
+        'dimensions': ['group_assignment', 'measurement_date'],
+        'columns': {
+            'avg_fatigue': 'fatigue_level_mean',
+            'avg_ck_level': 'creatine_kinase_level_mean',
+            'participant_count': 'participant_count'
+        }
+    }
+}
+
+class StudyCube:
+    def __init__(self, db: CreatineDatabase):
+        """
+        In-memory roll-ups of the measurement_cube table. Each requested
+        combination of dimensions (a cuboid) is aggregated from the base
+        cells once and kept, as are the slices and query results taken
+        from it, so repeated calls cost a dictionary lookup independent of
+        the number of measurements. Everything is dropped and the cells
+        reloaded only when the database has changed since they were read
+        (SQLite's data_version). Returned frames are shared between
+        callers and must not be modified in place.
+
+        Every measurement is included, whether or not screening flagged it.
+        """
+        self.db = db
+        self.profiler = db.profiler
+        self._conn = sqlite3.connect(db.db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._version = None
+        self._cells = None
+        self._cuboids = {}
+        logger.info("Study cube initialized")
+
+    def _refresh(self):
+        """Reload the base cells if another connection committed since the last read (lock held)."""
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._version or self._cells is None:
+            self._cells = self.db.get_cube_cells()
+            self._cuboids = {}
+            self._version = version
+
+    def _validate_dimensions(self, dimensions: List[str]) -> tuple:
+        """Dimensions in canonical cube order, rejecting unknown names."""
+        invalid = [dimension for dimension in dimensions if dimension not in CUBE_DIMENSIONS]
+        if invalid:
+            raise ValueError(f"Invalid cube dimensions: {', '.join(invalid)}")
+        return tuple(dimension for dimension in CUBE_DIMENSIONS if dimension in dimensions)
+
+    def _roll_up(self, cells: pd.DataFrame, dimensions: tuple) -> pd.DataFrame:
+        """Aggregate base cells to the given dimensions and derive means and sample stds."""
+        totals = [column for column in cells.columns if column not in CUBE_DIMENSIONS]
+        if dimensions:
+            cuboid = cells.groupby(list(dimensions), sort=True)[totals].sum().reset_index()
+        else:
+            cuboid = cells[totals].sum().to_frame().T
+
+        for metric in STATISTICS_METRICS:
+            count = cuboid[f'{metric}_count'].where(cuboid[f'{metric}_count'] > 0)
+            mean = cuboid[f'{metric}_sum'] / count
+            cuboid[f'{metric}_mean'] = mean
+            cuboid[f'{metric}_std'] = np.sqrt(
+                ((cuboid[f'{metric}_sumsq'] - count * mean ** 2) / (count - 1)).clip(lower=0)
+            ).where(count > 1)
+        # Distinct participants only add up across cells of the same date
+        if 'measurement_date' not in dimensions:
+            cuboid['participant_count'] = np.nan
+        return cuboid
+
+    def _memoized(self, key, compute):
+        """Result of compute() for key, computed once per cube version."""
+        with self._lock:
+            self._refresh()
+            if key not in self._cuboids:
+                self._cuboids[key] = compute(self._cells)
+            return self._cuboids[key]
+
+    def _cuboid(self, cells: pd.DataFrame, key: tuple) -> pd.DataFrame:
+        """Memoized roll-up of cells over the dimensions in key (lock held)."""
+        if key not in self._cuboids:
+            self._cuboids[key] = self._roll_up(cells, key)
+        return self._cuboids[key]
+
+    def cuboid(self, dimensions: List[str]) -> pd.DataFrame:
+        """The full roll-up over the given dimensions."""
+        key = self._validate_dimensions(dimensions)
+        return self._memoized(key, lambda cells: self._roll_up(cells, key))
+
+    def materialize(self) -> int:
+        """Precompute every combination of dimensions. Returns the number of cuboids."""
+        dimensions = list(CUBE_DIMENSIONS)
+        combinations = [combination for size in range(len(dimensions) + 1)
+                        for combination in itertools.combinations(dimensions, size)]
+        for combination in combinations:
+            self.cuboid(list(combination))
+        logger.info(f"Materialized {len(combinations)} cuboids")
+        return len(combinations)
+
+    def summarize(self, dimensions: List[str], metrics: Optional[List[str]] = None,
+                  filters: Optional[Dict[str, Union[str, List[str]]]] = None) -> pd.DataFrame:
+        """
+        Count, mean and sample std of each metric per combination of the
+        given dimensions, plus participant_count when measurement_date is
+        one of them. filters restrict dimensions (grouped or not) to a value
+        or list of values; filtering on an ungrouped dimension rolls up the
+        matching cells only.
+        """
+        metrics = tuple(metrics or STATISTICS_METRICS)
+        invalid = [metric for metric in metrics if metric not in STATISTICS_METRICS]
+        if invalid:
+            raise ValueError(f"Invalid metrics: {', '.join(invalid)}")
+        filters = {dimension: (values,) if isinstance(values, str) else tuple(values)
+                   for dimension, values in (filters or {}).items()}
+        grouped = self._validate_dimensions(dimensions)
+        self._validate_dimensions(list(filters))
+
+        key = ('slice', grouped, metrics, tuple(sorted(filters.items())))
+        return self._memoized(key, lambda cells: self._slice(cells, grouped, metrics, filters))
+
+    def _slice(self, cells: pd.DataFrame, grouped: tuple, metrics: tuple,
+               filters: Dict[str, tuple]) -> pd.DataFrame:
+        """Compute a summarize() result (lock held)."""
+        # Filters on dimensions outside the grouping are applied before rolling up
+        cuboid = self._cuboid(cells, self._validate_dimensions(list(grouped) + list(filters)))
+        mask = np.ones(len(cuboid), dtype=bool)
+        for dimension, values in filters.items():
+            mask &= cuboid[dimension].isin(values).to_numpy()
+        selected = cuboid[mask]
+        if set(filters) - set(grouped):
+            selected = self._roll_up(selected[[column for column in selected.columns
+                                               if column in CUBE_DIMENSIONS or
+                                               column.endswith(('_count', '_sum', '_sumsq'))]], grouped)
+
+        columns = list(grouped) + [f'{metric}_{stat}' for metric in metrics for stat in ('count', 'mean', 'std')]
+        if 'measurement_date' in grouped:
+            columns.append('participant_count')
+        return selected[columns].reset_index(drop=True)
+
+    @profiled('cube: {query_name}')
+    def run_query(self, query_name: str) -> pd.DataFrame:
+        """
+        Answer a named query from the cube if it is one of CUBE_QUERIES,
+        otherwise run it against the database.
+        """
+        try:
+            if query_name not in CUBE_QUERIES:
+                return self.db.run_analysis_query(query_name)
+            spec = CUBE_QUERIES[query_name]
+
+            def answer(cells):
+                cuboid = self._cuboid(cells, self._validate_dimensions(spec['dimensions']))
+                result = cuboid[spec['dimensions']].copy()
+                for column, statistic in spec['columns'].items():
+                    result[column] = cuboid[statistic].round(2)
+                result['participant_count'] = result['participant_count'].astype(int)
+                return result.sort_values('measurement_date', kind='mergesort').reset_index(drop=True)
+
+            return self._memoized(('query', query_name), answer)
+        except Exception as e:
+            logger.error(f"Error answering query from cube: {e}")
+            raise
+
+    def close(self):
+        """Close the cube's version-check connection."""
+        self._conn.close()
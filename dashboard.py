@@ -1,22 +1,35 @@
 import dash
-from dash import dcc, html
-from dash.dependencies import Input, Output
+from dash import ctx, dcc, html
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 import logging
 from .database import CreatineDatabase
+from .cube import StudyCube
+from .dashboard_data import DashboardData
 import dash_bootstrap_components as dbc
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# How often the browser asks whether the study data changed, in milliseconds
+REFRESH_INTERVAL_MS = 30000
+
 class CreatineDashboard:
-    def __init__(self, db: CreatineDatabase):
-        """Initialize dashboard with database connection."""
+    def __init__(self, db: CreatineDatabase, exclude_outliers: bool = False):
+        """
+        Initialize dashboard with database connection. Callbacks read the
+        progress data from a shared in-memory DashboardData, refreshed only
+        when the database changes, without flagged outliers if
+        exclude_outliers.
+        """
         self.db = db
+        self.cube = StudyCube(db)
+        self.data = DashboardData(db, exclude_outliers=exclude_outliers)
         self.app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
         self.setup_layout()
         self.setup_callbacks()
@@ -78,63 +91,183 @@ class CreatineDashboard:
                     html.H4("Summary Statistics", className="text-center"),
                     html.Div(id='summary-stats')
                 ], width=12)
-            ])
+            ]),
+
+            # Selected group and version of the data the panels are drawn from
+            dcc.Store(id='selection-store'),
+            dcc.Interval(id='refresh-interval', interval=REFRESH_INTERVAL_MS)
         ], fluid=True)
 
     def setup_callbacks(self):
-        """Set up dashboard callbacks."""
+        """
+        Set up dashboard callbacks: one per panel, each depending only on the
+        metric and the shared selection store. The store is rewritten when
+        the group changes or a refresh finds new data, so a refresh that
+        finds nothing new redraws nothing. The progression chart is also
+        redrawn at finer detail for each zoom or pan.
+        """
+        @self.app.callback(
+            Output('selection-store', 'data'),
+            [Input('group-selector', 'value'),
+             Input('refresh-interval', 'n_intervals')],
+            [State('selection-store', 'data')]
+        )
+        def update_selection(group_filter, n_intervals, current):
+            return self.selection(group_filter, current)
+
         @self.app.callback(
-            [Output('progression-chart', 'figure'),
-             Output('age-comparison-chart', 'figure'),
-             Output('training-impact-chart', 'figure'),
-             Output('summary-stats', 'children')],
+            Output('progression-chart', 'figure'),
             [Input('metric-selector', 'value'),
-             Input('group-selector', 'value')]
+             Input('selection-store', 'data'),
+             Input('progression-chart', 'relayoutData')]
         )
-        def update_charts(metric, group_filter):
+        def update_progression_chart(metric, selection, relayout):
+            if not selection:
+                raise PreventUpdate
+            viewport = None
+            # A stale zoom does not carry over to a new metric or group
+            if ctx.triggered_id == 'progression-chart':
+                viewport = self.viewport(relayout)
+                if viewport is None:
+                    raise PreventUpdate
+            try:
+                return self.progression_chart(metric, selection['group'], viewport)
+            except Exception as e:
+                logger.error(f"Error updating progression chart: {e}")
+                raise
+
+        panels = [
+            ('age-comparison-chart', 'figure', self.age_comparison_chart),
+            ('training-impact-chart', 'figure', self.training_impact_chart),
+            ('summary-stats', 'children', self.summary_table)
+        ]
+        for component_id, prop, build in panels:
+            self.app.callback(
+                Output(component_id, prop),
+                [Input('metric-selector', 'value'),
+                 Input('selection-store', 'data')]
+            )(self._panel_callback(build))
+
+    def _panel_callback(self, build):
+        """Callback drawing one panel for a metric and selection, once a selection is stored."""
+        def update_panel(metric, selection):
+            if not selection:
+                raise PreventUpdate
             try:
-                # Get data
-                progress_data = self.db.get_progress_data()
-                if group_filter != 'all':
-                    progress_data = progress_data[progress_data['group_assignment'] == group_filter]
-
-                # Progression Chart
-                prog_fig = px.line(progress_data, 
-                                 x='measurement_date', 
-                                 y=metric,
-                                 color='group_assignment',
-                                 line_group='participant_id',
-                                 title='Progression Over Time')
-
-                # Age Comparison Chart
-                age_data = progress_data.copy()
-                age_data['age_group'] = pd.cut(age_data['age'], 
-                                             bins=[0, 30, 50, 100],
-                                             labels=['Young', 'Middle', 'Older'])
-                age_fig = px.box(age_data,
-                               x='age_group',
-                               y=metric,
-                               color='group_assignment',
-                               title='Results by Age Group')
-
-                # Training Impact Chart
-                training_fig = px.box(progress_data,
-                                    x='training_status',
-                                    y=metric,
-                                    color='group_assignment',
-                                    title='Results by Training Status')
-
-                # Summary Statistics
-                stats = progress_data.groupby('group_assignment')[metric].agg(['mean', 'std', 'count']).round(2)
-                stats_table = dbc.Table.from_dataframe(stats, 
-                                                     striped=True, 
-                                                     bordered=True,
-                                                     hover=True)
-
-                return prog_fig, age_fig, training_fig, stats_table
+                return build(metric, selection['group'])
             except Exception as e:
-                logger.error(f"Error updating dashboard: {e}")
+                logger.error(f"Error updating dashboard panel: {e}")
                 raise
+        update_panel.__name__ = f"update_{build.__name__}"
+        return update_panel
+
+    def selection(self, group_filter: str, current: dict = None) -> dict:
+        """
+        The group and data version to draw. Raises PreventUpdate if they
+        equal the current selection, so no panel is redrawn.
+        """
+        selection = {'group': group_filter, 'version': self.data.version()}
+        if selection == current:
+            raise PreventUpdate
+        return selection
+
+    @staticmethod
+    def viewport(relayout: dict) -> dict:
+        """
+        Axis ranges of a plotly relayout event as {'x': [start, end], 'y':
+        [low, high]}, None for autoranged axes, or None for events that do
+        not change the view (e.g. autosize).
+        """
+        viewport = {}
+        for axis in ('x', 'y'):
+            if (relayout or {}).get(f'{axis}axis.autorange'):
+                viewport[axis] = None
+            elif f'{axis}axis.range[0]' in (relayout or {}):
+                viewport[axis] = [relayout[f'{axis}axis.range[0]'], relayout[f'{axis}axis.range[1]']]
+            elif f'{axis}axis.range' in (relayout or {}):
+                viewport[axis] = list(relayout[f'{axis}axis.range'])
+        return viewport or None
+
+    def progression_chart(self, metric: str, group_filter: str, viewport: dict = None) -> go.Figure:
+        """
+        Every participant's progression of a metric as one WebGL line per
+        group, within a viewport from viewport(). Crowded views draw a stable
+        subset of participants over the min/max envelope of all of them.
+        """
+        viewport = viewport or {}
+        result = self.data.trajectories(group_filter, metric, viewport.get('x'), viewport.get('y'))
+        palette = px.colors.qualitative.Plotly
+        colors = {group: palette[index % len(palette)] for index, group in enumerate(self.data.groups())}
+
+        fig = go.Figure()
+        envelope = result['envelope']
+        if envelope is not None:
+            for group, band in envelope.groupby('group_assignment', sort=True):
+                fig.add_trace(go.Scattergl(x=band['x'], y=band['y_min'], mode='lines', line=dict(width=0),
+                                           showlegend=False, hoverinfo='skip'))
+                fig.add_trace(go.Scattergl(x=band['x'], y=band['y_max'], mode='lines', line=dict(width=0),
+                                           fill='tonexty', fillcolor=colors.get(group), opacity=0.2,
+                                           name=f'{group} (range)', hoverinfo='skip'))
+        for group, (x, y) in result['lines'].items():
+            fig.add_trace(go.Scattergl(x=x, y=y, mode='lines', name=group,
+                                       line=dict(color=colors.get(group), width=1),
+                                       opacity=0.5 if envelope is not None else 1.0))
+
+        title = 'Progression Over Time'
+        if envelope is not None:
+            title += (f" ({result['participants_drawn']} of {result['participants']} participants, "
+                      f"zoom in for more)")
+        # Zoom is kept across redraws of the same metric and group
+        fig.update_layout(title=title, uirevision=f'{metric}:{group_filter}',
+                          xaxis_title='measurement_date', yaxis_title=metric,
+                          legend_title_text='group_assignment')
+        if viewport.get('x'):
+            fig.update_xaxes(range=viewport['x'])
+        if viewport.get('y'):
+            fig.update_yaxes(range=viewport['y'])
+        return fig
+
+    def age_comparison_chart(self, metric: str, group_filter: str) -> go.Figure:
+        """Distribution of a metric per age band."""
+        return px.box(self.data.progress(group_filter),
+                      x='age_group',
+                      y=metric,
+                      color='group_assignment',
+                      title='Results by Age Group')
+
+    def training_impact_chart(self, metric: str, group_filter: str) -> go.Figure:
+        """Distribution of a metric per training status."""
+        return px.box(self.data.progress(group_filter),
+                      x='training_status',
+                      y=metric,
+                      color='group_assignment',
+                      title='Results by Training Status')
+
+    def summary_stats(self, metric: str, group_filter: str) -> pd.DataFrame:
+        """
+        Mean, std, count, min and max of a metric per group. The moments are
+        sliced from the measurement cube and the extremes read from the
+        running statistics. Both cover every measurement, so with outliers
+        excluded the table is computed from the dashboard's progress data.
+        """
+        if self.data.exclude_outliers:
+            return self.data.progress(group_filter).groupby('group_assignment')[metric].agg(
+                ['mean', 'std', 'count', 'min', 'max']
+            ).round(2)
+        filters = {'group_assignment': group_filter} if group_filter != 'all' else None
+        stats = self.cube.summarize(['group_assignment'], [metric], filters)
+        stats = stats.set_index('group_assignment')[
+            [f'{metric}_mean', f'{metric}_std', f'{metric}_count']
+        ].set_axis(['mean', 'std', 'count'], axis=1)
+        extremes = self.db.get_running_statistics(metric, group_by=['group_assignment'])
+        return stats.join(extremes.set_index('group_assignment')[['min', 'max']]).round(2)
+
+    def summary_table(self, metric: str, group_filter: str):
+        """Summary statistics of a metric per group (see summary_stats) as a table."""
+        return dbc.Table.from_dataframe(self.summary_stats(metric, group_filter),
+                                        striped=True,
+                                        bordered=True,
+                                        hover=True)
 
     def create_comparison_chart(self, data: pd.DataFrame, metric: str) -> go.Figure:
         """Create a comparison chart for the selected metric."""
@@ -0,0 +1,223 @@
+import sqlite3
+import threading
+import time
+import uuid
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence
+import logging
+from .database import CreatineDatabase
+from .profiling import profiled
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Age bands of the dashboard's age comparison
+AGE_BINS = [0, 30, 50, 100]
+AGE_LABELS = ['Young', 'Middle', 'Older']
+
+# Most trajectory points sent to the progression chart for one viewport, and
+# the number of date buckets of the min/max envelope drawn when it is exceeded
+PROGRESSION_MAX_POINTS = 20000
+ENVELOPE_BUCKETS = 200
+
+class DashboardData:
+    def __init__(self, db: CreatineDatabase, exclude_outliers: bool = False):
+        """
+        In-memory progress data shared by the dashboard callbacks. The data
+        is read once, given its age band, and split into one view per
+        group_assignment plus 'all', so serving a filter costs a dictionary
+        lookup instead of a query. It is re-read only when the database has
+        changed since (SQLite's data_version). Returned frames are shared
+        between callers and must not be modified in place. With
+        exclude_outliers=True measurements flagged by outlier screening are
+        left out.
+        """
+        self.db = db
+        self.exclude_outliers = exclude_outliers
+        self.profiler = db.profiler
+        self._conn = sqlite3.connect(db.db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._version = None
+        self._views = None
+        self._arrays = None
+        # Distinguishes this instance's data versions from those of earlier runs
+        self._token = uuid.uuid4().hex[:8]
+        self.hits = 0
+        self.misses = 0
+        self.refresh_seconds = 0.0
+        logger.info("Dashboard data layer initialized")
+
+    def _refresh(self):
+        """Reload and split the progress data if the database changed since the last read (lock held)."""
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._version and self._views is not None:
+            self.hits += 1
+            return
+        self.misses += 1
+        start = time.perf_counter()
+        data = self.db.get_progress_data(exclude_outliers=self.exclude_outliers)
+        data['age_group'] = pd.cut(data['age'], bins=AGE_BINS, labels=AGE_LABELS)
+        data['measurement_time'] = pd.to_datetime(data['measurement_date'])
+        views = {'all': data}
+        views.update({group: frame.reset_index(drop=True)
+                      for group, frame in data.groupby('group_assignment', sort=True)})
+        self._views = views
+        self._arrays = {group: self._trajectory_arrays(view) for group, view in views.items()}
+        self._version = version
+        self.refresh_seconds = time.perf_counter() - start
+        logger.info(f"Loaded {len(data)} progress records for the dashboard "
+                    f"in {self.refresh_seconds:.3f}s")
+
+    @profiled('dashboard data')
+    def progress(self, group: str = 'all') -> pd.DataFrame:
+        """
+        Progress data of one group_assignment, or of everyone for 'all',
+        with an age_group column. Unknown groups give an empty frame.
+        """
+        try:
+            with self._lock:
+                self._refresh()
+                views = self._views
+            if group in views:
+                return views[group]
+            return views['all'].iloc[0:0]
+        except Exception as e:
+            logger.error(f"Error serving dashboard data: {e}")
+            raise
+
+    def groups(self) -> List[str]:
+        """The group assignments present in the data, sorted."""
+        with self._lock:
+            self._refresh()
+            return [group for group in self._views if group != 'all']
+
+    @staticmethod
+    def _trajectory_arrays(view: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Arrays of a view used to downsample trajectories: dates, the index
+        of each row's participant run, group codes and names, and a stable
+        pseudo-random rank in [0, 1) per row's participant.
+        """
+        pids = view['participant_id'].to_numpy()
+        codes, names = pd.factorize(view['group_assignment'], sort=True)
+        # Knuth multiplicative hash of the ID: a stable, uniform subset
+        rank = (pids.astype(np.uint64) * np.uint64(2654435761)) % np.uint64(2 ** 32) / 2 ** 32
+        return {
+            'x': view['measurement_time'].to_numpy(),
+            'run': np.cumsum(np.r_[True, pids[1:] != pids[:-1]]) - 1 if len(pids) else pids,
+            'codes': codes,
+            'names': np.asarray(names, dtype=object),
+            'rank': rank
+        }
+
+    def trajectories(self, group: str, metric: str, x_range: Optional[Sequence] = None,
+                     y_range: Optional[Sequence[float]] = None,
+                     max_points: int = PROGRESSION_MAX_POINTS) -> Dict:
+        """
+        Participant trajectories of a metric within a viewport, as one line
+        per group with NaN-separated participants. A participant is in view
+        if one of its points or segments lies in both ranges, and keeps the
+        segments crossing the x range so lines run to the edge. When more than
+        max_points are in view, a fixed pseudo-random subset of participants
+        is drawn (the same at every zoom level, so zooming in only adds
+        trajectories) together with the min and max of every participant in
+        view per date bucket.
+
+        Returns 'lines' mapping each group to its (x, y) arrays, 'envelope'
+        (group_assignment, x, y_min, y_max per bucket, or None when nothing
+        was left out) and the counts of participants in view and drawn.
+        """
+        try:
+            with self._lock:
+                self._refresh()
+                view = self._views.get(group)
+                arrays = self._arrays.get(group)
+            if view is None or not len(view):
+                return {'lines': {}, 'envelope': None, 'participants': 0,
+                        'participants_drawn': 0, 'points': 0}
+            y = view[metric].to_numpy(dtype=float)
+            x, run, codes, rank = arrays['x'], arrays['run'], arrays['codes'], arrays['rank']
+            observed = ~np.isnan(y)
+            if not observed.all():
+                x, y, run, codes, rank = x[observed], y[observed], run[observed], codes[observed], rank[observed]
+
+            # Each participant's points are one run of consecutive rows in date order
+            same_participant = run[1:] == run[:-1]
+            lo = np.datetime64(pd.Timestamp(x_range[0]), 'ns') if x_range else x.min()
+            hi = np.datetime64(pd.Timestamp(x_range[1]), 'ns') if x_range else x.max()
+            in_x = (x >= lo) & (x <= hi) if x_range else np.ones(len(x), dtype=bool)
+            crossing = same_participant & (x[:-1] <= hi) & (x[1:] >= lo)
+            keep = in_x | np.r_[crossing, False] | np.r_[False, crossing]
+            in_view = in_x & ((y >= y_range[0]) & (y <= y_range[1]) if y_range else True)
+            if y_range:
+                crossing &= (np.minimum(y[:-1], y[1:]) <= y_range[1]) & (np.maximum(y[:-1], y[1:]) >= y_range[0])
+            visible = np.zeros(run[-1] + 1 if len(run) else 0, dtype=bool)
+            visible[run[in_view]] = True
+            visible[run[:-1][crossing]] = True
+            keep &= visible[run]
+
+            envelope = None
+            drawn = keep
+            kept = int(keep.sum())
+            if kept > max_points:
+                drawn = keep & (rank < max_points / kept)
+                in_envelope = keep & in_x
+                envelope = self._envelope(x[in_envelope], y[in_envelope], codes[in_envelope],
+                                          arrays['names'], lo, hi)
+
+            lines = {}
+            for code in np.flatnonzero(np.bincount(codes[drawn], minlength=len(arrays['names']))):
+                selected = drawn & (codes == code)
+                line_x, line_y, line_run = x[selected], y[selected], run[selected]
+                breaks = np.flatnonzero(line_run[1:] != line_run[:-1]) + 1
+                lines[arrays['names'][code]] = (np.insert(line_x, breaks, line_x[breaks - 1]),
+                                                np.insert(line_y, breaks, np.nan))
+            drawn_runs = np.zeros(len(visible), dtype=bool)
+            drawn_runs[run[drawn]] = True
+            return {'lines': lines, 'envelope': envelope, 'participants': int(visible.sum()),
+                    'participants_drawn': int(drawn_runs.sum()), 'points': int(drawn.sum())}
+        except Exception as e:
+            logger.error(f"Error downsampling trajectories: {e}")
+            raise
+
+    @staticmethod
+    def _envelope(x: np.ndarray, y: np.ndarray, codes: np.ndarray, names: np.ndarray,
+                  lo, hi) -> pd.DataFrame:
+        """Min and max of y per group (codes into names) and date bucket between lo and hi."""
+        span = max((hi - lo).astype('timedelta64[ns]').astype(np.int64), 1)
+        offset = (x - lo).astype('timedelta64[ns]').astype(np.int64)
+        buckets = np.clip(offset * ENVELOPE_BUCKETS // span, 0, ENVELOPE_BUCKETS - 1)
+        # One integer key per group and bucket, in group then date order
+        extremes = pd.Series(y).groupby(codes * ENVELOPE_BUCKETS + buckets, sort=True).agg(['min', 'max'])
+        keys = extremes.index.to_numpy()
+        return pd.DataFrame({
+            'group_assignment': names[keys // ENVELOPE_BUCKETS],
+            'x': lo + pd.to_timedelta((keys % ENVELOPE_BUCKETS + 0.5) * span / ENVELOPE_BUCKETS, unit='ns'),
+            'y_min': extremes['min'].to_numpy(),
+            'y_max': extremes['max'].to_numpy()
+        })
+
+    def version(self) -> str:
+        """
+        Token identifying the loaded data, after reloading it if the database
+        changed. It changes exactly when the views do.
+        """
+        with self._lock:
+            self._refresh()
+            return f"{self._token}:{self.misses}"
+
+    def metrics(self) -> Dict:
+        """Hit and miss counts, the cached row count and the last refresh time in seconds."""
+        with self._lock:
+            rows = len(self._views['all']) if self._views is not None else 0
+            return {'hits': self.hits, 'misses': self.misses, 'rows': rows,
+                    'refresh_seconds': self.refresh_seconds}
+
+    def close(self):
+        """Close the data layer's version-check connection."""
+        self._conn.close()
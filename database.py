@@ -1,4 +1,5 @@
 import os
+import re
 import sqlite3
 from pathlib import Path
 from typing import Dict, List, Optional, Union
@@ -6,6 +7,7 @@ import pandas as pd
 from sqlalchemy import create_engine, text
 import logging
 from datetime import datetime
+from .profiling import Profiler, profiled
 
 # Configure logging
 logging.basicConfig(
@@ -14,13 +16,290 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Participant progress: every measurement joined with its participant's attributes
+PROGRESS_DATA_QUERY = """
+    SELECT 
+        p.participant_id,
+        p.age,
+        p.training_status,
+        p.group_assignment,
+        m.measurement_date,
+        m.study_day,
+        m.study_week,
+        m.strength_1rm_kg,
+        m.lean_mass_kg,
+        m.performance_score,
+        m.muscle_thickness_mm,
+        m.creatine_kinase_level,
+        m.fatigue_level
+    FROM participants p
+    JOIN measurements m ON p.participant_id = m.participant_id
+    {where}
+    ORDER BY p.participant_id, m.measurement_date
+    """
+
+# Measurement insert shared by the single and bulk ingest paths
+MEASUREMENT_INSERT_QUERY = """
+    INSERT INTO measurements (
+        participant_id, measurement_date, strength_1rm_kg,
+        lean_mass_kg, muscle_thickness_mm, creatine_kinase_level,
+        performance_score, fatigue_level
+    ) VALUES (
+        :participant_id, :measurement_date, :strength_1rm_kg,
+        :lean_mass_kg, :muscle_thickness_mm, :creatine_kinase_level,
+        :performance_score, :fatigue_level
+    )
+    """
+
+MEASUREMENT_REQUIRED_FIELDS = ['participant_id', 'measurement_date', 'strength_1rm_kg',
+                               'lean_mass_kg']
+
+# Metrics tracked in the running_statistics table
+STATISTICS_METRICS = ['strength_1rm_kg', 'lean_mass_kg', 'muscle_thickness_mm',
+                      'creatine_kinase_level', 'performance_score', 'fatigue_level']
+
+# Measurement columns added since the first schema release, with the column
+# definitions that upgrade_database adds to older databases
+MEASUREMENT_UPGRADE_COLUMNS = {
+    'study_day': 'INTEGER',
+    'study_week': 'INTEGER',
+    'outlier_flags': 'INTEGER NOT NULL DEFAULT 0'
+}
+
+# Tables added since the first schema release that upgrade_database creates from
+# schema.sql (with its seed rows), mapped to the method backfilling them or None.
+# An empty participant analysis cache is valid: every participant is recomputed.
+UPGRADE_TABLES = {
+    'participant_analysis_cache': None,
+    'running_statistics': '_rebuild_running_statistics',
+    'dosing_schedule': None,
+    'measurement_cube': '_rebuild_cube',
+    'content_version': None
+}
+
+# Recompute study_day and study_week from the baseline (first measurement date)
+# of every participant with measurements in {scope}
+STUDY_TIME_UPDATE = """
+    UPDATE measurements
+    SET 
+        study_day = CAST(julianday(measurement_date) - julianday(b.baseline_date) AS INTEGER),
+        study_week = CAST((julianday(measurement_date) - julianday(b.baseline_date)) / 7 AS INTEGER)
+    FROM (
+        SELECT participant_id, MIN(measurement_date) AS baseline_date
+        FROM measurements
+        WHERE participant_id IN (SELECT participant_id FROM measurements WHERE {scope})
+        GROUP BY participant_id
+    ) b
+    WHERE measurements.participant_id = b.participant_id
+    """
+
+# Aggregate the measurements in {scope} per group, training status, metric and
+# study week and merge them into running_statistics with the parallel Welford
+# update (Chan et al.), so single rows, batches and full rebuilds share one
+# statement. {observations} unpivots the scoped rows into one row per metric value.
+RUNNING_STATISTICS_MERGE = """
+    WITH scoped AS (
+        SELECT 
+            COALESCE(p.group_assignment, 'unassigned') AS group_assignment,
+            COALESCE(p.training_status, 'unknown') AS training_status,
+            m.*
+        FROM measurements m
+        JOIN participants p ON p.participant_id = m.participant_id
+        WHERE {scope}
+    ),
+    observations AS (
+        {observations}
+    ),
+    cells AS (
+        SELECT 
+            group_assignment, training_status, metric, study_week,
+            COUNT(*) AS n, AVG(value) AS mean_value,
+            MIN(value) AS min_value, MAX(value) AS max_value
+        FROM observations
+        GROUP BY group_assignment, training_status, metric, study_week
+    )
+    INSERT INTO running_statistics (
+        group_assignment, training_status, metric, study_week,
+        count, mean, m2, min_value, max_value
+    )
+    SELECT 
+        c.group_assignment, c.training_status, c.metric, c.study_week,
+        c.n, c.mean_value,
+        SUM((o.value - c.mean_value) * (o.value - c.mean_value)),
+        c.min_value, c.max_value
+    FROM cells c
+    JOIN observations o ON o.group_assignment = c.group_assignment
+        AND o.training_status = c.training_status
+        AND o.metric = c.metric
+        AND o.study_week = c.study_week
+    WHERE true
+    GROUP BY c.group_assignment, c.training_status, c.metric, c.study_week
+    ON CONFLICT (group_assignment, training_status, metric, study_week) DO UPDATE SET
+        count = count + excluded.count,
+        mean = mean + (excluded.mean - mean) * excluded.count / (count + excluded.count),
+        m2 = m2 + excluded.m2
+            + (excluded.mean - mean) * (excluded.mean - mean) * count * excluded.count
+            / (1.0 * (count + excluded.count)),
+        min_value = MIN(min_value, excluded.min_value),
+        max_value = MAX(max_value, excluded.max_value)
+    """
+
+# Participants in the batch whose first measurement date moved earlier, which
+# shifts the study weeks of their existing measurements
+BASELINE_SHIFT_QUERY = """
+    SELECT COUNT(*) FROM (
+        SELECT 
+            MIN(CASE WHEN measurement_id < :first_id THEN measurement_date END) AS previous_baseline,
+            MIN(measurement_date) AS baseline
+        FROM measurements
+        WHERE participant_id IN (
+            SELECT participant_id FROM measurements
+            WHERE measurement_id BETWEEN :first_id AND :last_id
+        )
+        GROUP BY participant_id
+    )
+    WHERE previous_baseline > baseline
+    """
+
+# Measurement values and study time per row for outlier screening (unordered,
+# the screening sorts in memory faster than SQLite does)
+SCREENING_DATA_QUERY = """
+    SELECT 
+        m.measurement_id,
+        m.participant_id,
+        COALESCE(p.group_assignment, 'unassigned') AS group_assignment,
+        m.study_day,
+        m.study_week,
+        {metrics}
+    FROM measurements m
+    JOIN participants p ON p.participant_id = m.participant_id
+    """
+
+# Training program assignments with their program, one row per assignment
+# (participant_training has no key of its own, so its rowid identifies them)
+TRAINING_ASSIGNMENTS_QUERY = """
+    SELECT 
+        t.rowid AS assignment_id,
+        t.participant_id,
+        t.program_id,
+        tp.program_name,
+        t.start_date,
+        t.end_date,
+        t.compliance_percentage
+    FROM participant_training t
+    LEFT JOIN training_programs tp ON tp.program_id = t.program_id
+    ORDER BY t.participant_id, t.start_date
+    """
+
+TRAINING_ASSIGNMENT_FIELDS = ['participant_id', 'program_id', 'start_date', 'end_date',
+                              'compliance_percentage']
+
+# Dosing phases of each participant dosing protocol, in order, with the study
+# day each phase starts on (the phases run back to back from day 0)
+DOSING_PHASES_QUERY = """
+    SELECT 
+        s.dosing_protocol,
+        s.phase_order,
+        dp.protocol_name,
+        dp.daily_dose_g,
+        dp.duration_days,
+        SUM(dp.duration_days) OVER (
+            PARTITION BY s.dosing_protocol ORDER BY s.phase_order
+        ) - dp.duration_days AS start_day
+    FROM dosing_schedule s
+    JOIN dosing_protocols dp ON dp.protocol_id = s.protocol_id
+    ORDER BY s.dosing_protocol, s.phase_order
+    """
+
+# Filter on the screening bitmask keeping the rows no check flagged
+CLEAN_MEASUREMENTS_FILTER = "m.outlier_flags = 0"
+
+# Participant attributes available for push-down grouping, as SQL expressions
+PARTICIPANT_ATTRIBUTES = {
+    'group_assignment': 'p.group_assignment',
+    'training_status': 'p.training_status',
+    'dosing_protocol': 'p.dosing_protocol',
+    'population_category': 'p.population_category',
+    'gender': 'p.gender',
+    'age_group': """CASE 
+        WHEN p.age < 30 THEN 'Young (18-29)'
+        WHEN p.age BETWEEN 30 AND 50 THEN 'Middle (30-50)'
+        ELSE 'Older (50+)'
+    END"""
+}
+
+# Dimensions of the measurement cube, as SQL expressions over participants p
+# and measurements m (missing attributes get a placeholder so cells stay keyed)
+CUBE_DIMENSIONS = {
+    'group_assignment': "COALESCE(p.group_assignment, 'unassigned')",
+    'training_status': "COALESCE(p.training_status, 'unknown')",
+    'population_category': "COALESCE(p.population_category, 'unknown')",
+    'dosing_protocol': "COALESCE(p.dosing_protocol, 'unknown')",
+    'age_group': PARTICIPANT_ATTRIBUTES['age_group'],
+    'measurement_date': 'm.measurement_date'
+}
+
+# Participant columns the cube's dimensions are derived from
+CUBE_PARTICIPANT_COLUMNS = {'group_assignment', 'training_status', 'population_category',
+                            'dosing_protocol', 'age'}
+
+# Aggregate the measurements in {scope} into cube cells and add them to
+# measurement_cube. A participant counts towards participant_count only for
+# a date they had no measurement on before :first_id, so repeated visits on
+# one date are not double counted across batches.
+CUBE_MERGE = """
+    INSERT INTO measurement_cube (
+        {dimensions}, participant_count, {metric_columns}
+    )
+    SELECT * FROM (
+        SELECT 
+            {dimension_values},
+            COUNT(DISTINCT CASE WHEN NOT EXISTS (
+                SELECT 1 FROM measurements e
+                WHERE e.participant_id = m.participant_id
+                AND e.measurement_date = m.measurement_date
+                AND e.measurement_id < :first_id
+            ) THEN m.participant_id END),
+            {metric_values}
+        FROM measurements m
+        JOIN participants p ON p.participant_id = m.participant_id
+        WHERE {scope}
+        GROUP BY {dimension_positions}
+    )
+    WHERE true
+    ON CONFLICT ({dimensions}) DO UPDATE SET
+        participant_count = participant_count + excluded.participant_count,
+        {metric_updates}
+    """
+
+# Every write to the study data bumps the content version in the same transaction
+CONTENT_VERSION_BUMP = "UPDATE content_version SET version = version + 1"
+
+# Cached per-participant results joined with the participants' current attributes
+PARTICIPANT_CACHE_QUERY = """
+    SELECT 
+        c.*,
+        p.group_assignment,
+        p.training_status
+    FROM participant_analysis_cache c
+    JOIN participants p ON p.participant_id = c.participant_id
+    ORDER BY c.participant_id
+    """
+
 class CreatineDatabase:
-    def __init__(self, db_path: str = "database/creatine_study.db"):
-        """Initialize database connection."""
+    def __init__(self, db_path: str = "database/creatine_study.db",
+                 profiler: Optional[Profiler] = None):
+        """
+        Initialize database connection. The profiler (disabled unless one is
+        passed in enabled) records query timings and is shared with the
+        analysis modules built on this database.
+        """
         self.db_path = db_path
+        self.profiler = profiler if profiler is not None else Profiler()
         self.ensure_db_directory()
         self.engine = create_engine(f'sqlite:///{db_path}')
         logger.info(f"Database initialized at {db_path}")
+        self.upgrade_database()
         
     def ensure_db_directory(self):
         """Ensure database directory exists."""
@@ -28,25 +307,76 @@ class CreatineDatabase:
         if db_dir:
             Path(db_dir).mkdir(parents=True, exist_ok=True)
 
+    def _schema_statements(self) -> List[str]:
+        """The statements of database/schema.sql."""
+        schema_path = Path("database/schema.sql")
+        with open(schema_path, 'r') as f:
+            schema_sql = f.read()
+        # Split the schema SQL into individual statements
+        return [statement for statement in schema_sql.split(';') if statement.strip()]
+
     def init_database(self):
         """Initialize database with schema."""
         try:
-            schema_path = Path("database/schema.sql")
-            with open(schema_path, 'r') as f:
-                schema_sql = f.read()
-                
+            statements = self._schema_statements()
             with self.engine.connect() as conn:
-                # Split the schema SQL into individual statements
-                statements = schema_sql.split(';')
                 for statement in statements:
-                    if statement.strip():
-                        conn.execute(text(statement))
+                    conn.execute(text(statement))
                 conn.commit()
             logger.info("Database schema initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing database: {e}")
             raise
 
+    def upgrade_database(self) -> List[str]:
+        """
+        Bring a database created with an earlier schema up to date in place:
+        add the missing MEASUREMENT_UPGRADE_COLUMNS and UPGRADE_TABLES (from
+        schema.sql, with their seed rows) and every schema index, then
+        backfill study time and the new tables from the measurements. Runs
+        on connect and does nothing on a current or uninitialized database.
+        Returns the upgrade steps applied.
+        """
+        try:
+            with self.engine.connect() as conn:
+                existing = {row[0] for row in conn.execute(text(
+                    "SELECT name FROM sqlite_master WHERE type = 'table'"
+                ))}
+                if 'measurements' not in existing:
+                    return []
+                columns = {row[1] for row in conn.execute(text("PRAGMA table_info(measurements)"))}
+                new_columns = [column for column in MEASUREMENT_UPGRADE_COLUMNS if column not in columns]
+                new_tables = [table for table in UPGRADE_TABLES if table not in existing]
+                if not new_columns and not new_tables:
+                    return []
+
+                for column in new_columns:
+                    conn.execute(text(
+                        f"ALTER TABLE measurements ADD COLUMN {column} {MEASUREMENT_UPGRADE_COLUMNS[column]}"
+                    ))
+                statements = self._schema_statements()
+                for table in new_tables:
+                    for statement in statements:
+                        if re.search(rf"^(CREATE TABLE|INSERT INTO) {table}\b", statement, re.MULTILINE):
+                            conn.execute(text(statement))
+                for statement in statements:
+                    if re.search(r"^CREATE INDEX ", statement, re.MULTILINE):
+                        conn.execute(text(statement.replace("CREATE INDEX ", "CREATE INDEX IF NOT EXISTS ")))
+
+                if new_columns:
+                    self._update_study_time(conn)
+                for table in new_tables:
+                    if UPGRADE_TABLES[table]:
+                        getattr(self, UPGRADE_TABLES[table])(conn)
+                conn.commit()
+
+            steps = [f"measurements.{column}" for column in new_columns] + new_tables
+            logger.info(f"Database upgraded: added {', '.join(steps)}")
+            return steps
+        except Exception as e:
+            logger.error(f"Error upgrading database: {e}")
+            raise
+
     def add_participant(self, participant_data: Dict) -> int:
         """Add a new participant to the database."""
         try:
@@ -61,6 +391,7 @@ class CreatineDatabase:
             """
             with self.engine.connect() as conn:
                 result = conn.execute(text(query), participant_data)
+                self._bump_content_version(conn)
                 conn.commit()
                 logger.info(f"Added new participant with ID: {result.lastrowid}")
                 return result.lastrowid
@@ -75,27 +406,18 @@ class CreatineDatabase:
         """
         try:
             # Validate required fields
-            required_fields = ['participant_id', 'measurement_date', 'strength_1rm_kg',
-                             'lean_mass_kg']
-            for field in required_fields:
+            for field in MEASUREMENT_REQUIRED_FIELDS:
                 if field not in measurement_data:
                     raise ValueError(f"Missing required field: {field}")
 
-            query = """
-            INSERT INTO measurements (
-                participant_id, measurement_date, strength_1rm_kg,
-                lean_mass_kg, muscle_thickness_mm, creatine_kinase_level,
-                performance_score, fatigue_level
-            ) VALUES (
-                :participant_id, :measurement_date, :strength_1rm_kg,
-                :lean_mass_kg, :muscle_thickness_mm, :creatine_kinase_level,
-                :performance_score, :fatigue_level
-            )
-            """
             with self.engine.connect() as conn:
-                result = conn.execute(text(query), measurement_data)
-                conn.commit()
+                result = conn.execute(text(MEASUREMENT_INSERT_QUERY), measurement_data)
                 new_id = result.lastrowid
+                self._update_study_time(conn, new_id, new_id)
+                self._update_running_statistics(conn, new_id, new_id)
+                self._update_cube(conn, new_id, new_id)
+                self._bump_content_version(conn)
+                conn.commit()
                 
             logger.info(f"Added new measurement for participant {measurement_data['participant_id']}")
             return new_id
@@ -103,6 +425,275 @@ class CreatineDatabase:
             logger.error(f"Error adding measurement: {e}")
             raise
 
+    @profiled()
+    def add_measurements(self, measurements: List[Dict]) -> List[int]:
+        """
+        Add a batch of measurements in a single transaction.
+        Returns the IDs of the newly created measurements.
+        """
+        try:
+            for measurement_data in measurements:
+                for field in MEASUREMENT_REQUIRED_FIELDS:
+                    if field not in measurement_data:
+                        raise ValueError(f"Missing required field: {field}")
+
+            with self.engine.connect() as conn:
+                new_ids = [
+                    conn.execute(text(MEASUREMENT_INSERT_QUERY), measurement_data).lastrowid
+                    for measurement_data in measurements
+                ]
+                if new_ids:
+                    self._update_study_time(conn, min(new_ids), max(new_ids))
+                    self._update_running_statistics(conn, min(new_ids), max(new_ids))
+                    self._update_cube(conn, min(new_ids), max(new_ids))
+                    self._bump_content_version(conn)
+                conn.commit()
+
+            logger.info(f"Added {len(new_ids)} measurements")
+            return new_ids
+        except Exception as e:
+            logger.error(f"Error adding measurements: {e}")
+            raise
+
+    @profiled()
+    def add_training_assignments(self, assignments: List[Dict]) -> int:
+        """
+        Assign participants to training programs in a single transaction.
+        Each assignment has participant_id, program_id, start_date, an
+        optional end_date (open-ended if missing) and compliance_percentage.
+        Returns the number of assignments added.
+        """
+        try:
+            for assignment in assignments:
+                for field in ('participant_id', 'program_id', 'start_date'):
+                    if assignment.get(field) is None:
+                        raise ValueError(f"Missing required field: {field}")
+            rows = [{field: assignment.get(field) for field in TRAINING_ASSIGNMENT_FIELDS}
+                    for assignment in assignments]
+
+            query = f"""
+            INSERT INTO participant_training ({', '.join(TRAINING_ASSIGNMENT_FIELDS)})
+            VALUES ({', '.join(':' + field for field in TRAINING_ASSIGNMENT_FIELDS)})
+            """
+            with self.engine.connect() as conn:
+                if rows:
+                    conn.execute(text(query), rows)
+                    self._bump_content_version(conn)
+                conn.commit()
+            logger.info(f"Added {len(rows)} training assignments")
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Error adding training assignments: {e}")
+            raise
+
+    @profiled()
+    def get_training_assignments(self) -> pd.DataFrame:
+        """Get all training program assignments with their program names."""
+        try:
+            df = pd.read_sql_query(TRAINING_ASSIGNMENTS_QUERY, self.engine)
+            logger.info(f"Retrieved {len(df)} training assignments")
+            return df
+        except Exception as e:
+            logger.error(f"Error retrieving training assignments: {e}")
+            raise
+
+    @profiled()
+    def get_dosing_phases(self) -> pd.DataFrame:
+        """Get the dosing phases of each participant dosing protocol with their start day."""
+        try:
+            df = pd.read_sql_query(DOSING_PHASES_QUERY, self.engine)
+            logger.info(f"Retrieved {len(df)} dosing phases")
+            return df
+        except Exception as e:
+            logger.error(f"Error retrieving dosing phases: {e}")
+            raise
+
+    def _bump_content_version(self, conn):
+        """Mark the study data as changed within the caller's transaction."""
+        conn.execute(text(CONTENT_VERSION_BUMP))
+
+    def get_content_version(self) -> str:
+        """
+        Identifier of the current study data, '<database_id>:<version>',
+        which changes with every committed write.
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                database_id, version = conn.execute(
+                    "SELECT database_id, version FROM content_version"
+                ).fetchone()
+            finally:
+                conn.close()
+            return f"{database_id}:{version}"
+        except Exception as e:
+            logger.error(f"Error retrieving content version: {e}")
+            raise
+
+    def _update_study_time(self, conn, first_id: Optional[int] = None,
+                           last_id: Optional[int] = None):
+        """
+        Fill study_day and study_week for every measurement of the participants
+        with measurement IDs first_id..last_id (all participants if no range is
+        given). All of a participant's rows are refreshed, so a backfilled
+        earlier measurement moves their baseline consistently.
+        """
+        if first_id is None:
+            conn.execute(text(STUDY_TIME_UPDATE.format(scope="1 = 1")))
+        else:
+            scope = "measurement_id BETWEEN :first_id AND :last_id"
+            conn.execute(text(STUDY_TIME_UPDATE.format(scope=scope)),
+                         {'first_id': first_id, 'last_id': last_id})
+
+    def _cube_merge_query(self, scope: str) -> str:
+        """CUBE_MERGE for the measurements in scope, over all STATISTICS_METRICS."""
+        columns = [f"{metric}_{stat}" for metric in STATISTICS_METRICS for stat in ('count', 'sum', 'sumsq')]
+        values = [expression for metric in STATISTICS_METRICS for expression in (
+            f"COUNT(m.{metric})", f"TOTAL(m.{metric})", f"TOTAL(m.{metric} * m.{metric})"
+        )]
+        return CUBE_MERGE.format(
+            dimensions=', '.join(CUBE_DIMENSIONS),
+            dimension_values=',\n            '.join(
+                f"{expression} AS {dimension}" for dimension, expression in CUBE_DIMENSIONS.items()
+            ),
+            dimension_positions=', '.join(str(position) for position in range(1, len(CUBE_DIMENSIONS) + 1)),
+            metric_columns=', '.join(columns),
+            metric_values=', '.join(values),
+            metric_updates=',\n        '.join(f"{column} = {column} + excluded.{column}" for column in columns),
+            scope=scope
+        )
+
+    def _update_cube(self, conn, first_id: int, last_id: int):
+        """
+        Add the measurements with IDs first_id..last_id to measurement_cube.
+        Must run in the transaction that inserted them.
+        """
+        conn.execute(text(self._cube_merge_query("m.measurement_id BETWEEN :first_id AND :last_id")),
+                     {'first_id': first_id, 'last_id': last_id})
+
+    def _rebuild_cube(self, conn):
+        """Recompute measurement_cube from all measurements."""
+        conn.execute(text("DELETE FROM measurement_cube"))
+        conn.execute(text(self._cube_merge_query("1 = 1")), {'first_id': 0})
+
+    def rebuild_cube(self):
+        """Rebuild the measurement cube, e.g. after editing measurements directly."""
+        try:
+            with self.engine.connect() as conn:
+                self._rebuild_cube(conn)
+                conn.commit()
+            logger.info("Measurement cube rebuilt")
+        except Exception as e:
+            logger.error(f"Error rebuilding measurement cube: {e}")
+            raise
+
+    @profiled()
+    def get_cube_cells(self) -> pd.DataFrame:
+        """Get all base cells of the measurement cube."""
+        try:
+            df = pd.read_sql_query("SELECT * FROM measurement_cube", self.engine)
+            logger.info(f"Retrieved {len(df)} measurement cube cells")
+            return df
+        except Exception as e:
+            logger.error(f"Error retrieving measurement cube: {e}")
+            raise
+
+    def _update_running_statistics(self, conn, first_id: int, last_id: int):
+        """
+        Merge the measurements with IDs first_id..last_id into running_statistics.
+        Must run in the transaction that inserted them, after their study time
+        is filled, which guarantees the ID range holds only the new rows.
+        Backfills that move a participant's baseline date earlier fall back to
+        a full rebuild.
+        """
+        ids = {'first_id': first_id, 'last_id': last_id}
+        if conn.execute(text(BASELINE_SHIFT_QUERY), ids).scalar():
+            logger.info("Measurement baseline moved, rebuilding running statistics")
+            self._rebuild_running_statistics(conn)
+            return
+        
+        conn.execute(text(self._running_statistics_merge_query(
+            "m.measurement_id BETWEEN :first_id AND :last_id"
+        )), ids)
+
+    def _rebuild_running_statistics(self, conn):
+        """Recompute running_statistics from all measurements."""
+        conn.execute(text("DELETE FROM running_statistics"))
+        conn.execute(text(self._running_statistics_merge_query("1 = 1")))
+
+    def _running_statistics_merge_query(self, scope: str) -> str:
+        """RUNNING_STATISTICS_MERGE for the measurements in scope, over all STATISTICS_METRICS."""
+        observations = '\n        UNION ALL\n        '.join(
+            f"SELECT group_assignment, training_status, '{metric}' AS metric, study_week, "
+            f"{metric} AS value FROM scoped WHERE {metric} IS NOT NULL"
+            for metric in STATISTICS_METRICS
+        )
+        return RUNNING_STATISTICS_MERGE.format(observations=observations, scope=scope)
+
+    def rebuild_running_statistics(self):
+        """
+        Rebuild the running statistics, e.g. after participants change group.
+        Study days and weeks are refreshed first.
+        """
+        try:
+            with self.engine.connect() as conn:
+                self._update_study_time(conn)
+                self._rebuild_running_statistics(conn)
+                conn.commit()
+            logger.info("Running statistics rebuilt")
+        except Exception as e:
+            logger.error(f"Error rebuilding running statistics: {e}")
+            raise
+
+    @profiled()
+    def get_running_statistics(self, metric: Optional[str] = None,
+                               group_by: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Get summary statistics from the running accumulators.
+        Cells are combined over the dimensions not listed in group_by (any of
+        group_assignment, training_status, metric, study_week), so the cost
+        depends on the number of cells, not on the number of measurements.
+        Unlike the measurement cube, the cells are keyed by study week
+        (counted from each participant's baseline) and track min and max.
+        """
+        try:
+            dimensions = ['group_assignment', 'training_status', 'metric', 'study_week']
+            group_by = group_by or dimensions
+            invalid = [column for column in group_by if column not in dimensions]
+            if invalid:
+                raise ValueError(f"Invalid grouping columns: {', '.join(invalid)}")
+
+            query = "SELECT * FROM running_statistics"
+            params = {}
+            if metric:
+                query += " WHERE metric = :metric"
+                params['metric'] = metric
+            cells = pd.read_sql_query(text(query), self.engine, params=params)
+
+            cells['weighted_sum'] = cells['count'] * cells['mean']
+            grouped = cells.groupby(group_by)
+            stats = grouped.agg(
+                count=('count', 'sum'),
+                weighted_sum=('weighted_sum', 'sum'),
+                m2=('m2', 'sum'),
+                min=('min_value', 'min'),
+                max=('max_value', 'max')
+            )
+            stats['mean'] = stats['weighted_sum'] / stats['count']
+            
+            # Between-cell part of the pooled M2
+            cell_means = cells.join(stats['mean'].rename('pooled_mean'), on=group_by)
+            between = (cell_means['count'] * (cell_means['mean'] - cell_means['pooled_mean']) ** 2)
+            stats['m2'] += between.groupby([cell_means[column] for column in group_by]).sum()
+            stats['std'] = (stats['m2'] / (stats['count'] - 1)).where(stats['count'] > 1) ** 0.5
+
+            stats = stats[['count', 'mean', 'std', 'min', 'max']].reset_index()
+            logger.info(f"Retrieved running statistics for {len(stats)} cells")
+            return stats
+        except Exception as e:
+            logger.error(f"Error retrieving running statistics: {e}")
+            raise
+
     def get_participant_data(self, participant_id: Optional[int] = None) -> pd.DataFrame:
         """Retrieve participant data."""
         try:
@@ -143,57 +734,226 @@ class CreatineDatabase:
             logger.error(f"Error retrieving measurements: {e}")
             raise
 
-    def get_progress_data(self) -> pd.DataFrame:
-        """Get participant progress data joined with measurements."""
+    def _progress_data_query(self, participant_ids: Optional[List[int]] = None,
+                             exclude_outliers: bool = False) -> str:
+        """Progress data SQL, optionally restricted to participants and unflagged rows."""
+        conditions = []
+        if participant_ids is not None:
+            id_list = ', '.join(str(int(pid)) for pid in participant_ids) or 'NULL'
+            conditions.append(f"p.participant_id IN ({id_list})")
+        if exclude_outliers:
+            conditions.append(CLEAN_MEASUREMENTS_FILTER)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return PROGRESS_DATA_QUERY.format(where=where)
+
+    @profiled()
+    def get_progress_data(self, participant_ids: Optional[List[int]] = None,
+                          exclude_outliers: bool = False) -> pd.DataFrame:
+        """
+        Get participant progress data joined with measurements.
+        Optionally restrict the result to the given participant IDs, and
+        with exclude_outliers=True drop measurements flagged by screening.
+        """
+        try:
+            query = self._progress_data_query(participant_ids, exclude_outliers)
+            df = pd.read_sql_query(query, self.engine)
+            logger.info(f"Retrieved progress data with {len(df)} records")
+            return df
+        except Exception as e:
+            logger.error(f"Error retrieving progress data: {e}")
+            raise
+
+    @profiled()
+    def get_progress_extent(self, metric: str, exclude_outliers: bool = False) -> Dict[str, float]:
+        """
+        Smallest and largest study day and value of a metric over its recorded
+        measurements, without those flagged by screening if exclude_outliers.
+        """
+        try:
+            self._validate_metrics([metric])
+            clean = f" AND {CLEAN_MEASUREMENTS_FILTER}" if exclude_outliers else ""
+            query = f"""
+            SELECT 
+                MIN(study_day) AS day_min,
+                MAX(study_day) AS day_max,
+                MIN({metric}) AS value_min,
+                MAX({metric}) AS value_max
+            FROM measurements m
+            WHERE {metric} IS NOT NULL{clean}
+            """
+            extent = pd.read_sql_query(query, self.engine).iloc[0].to_dict()
+            logger.info(f"Retrieved progress extent of {metric}")
+            return extent
+        except Exception as e:
+            logger.error(f"Error retrieving progress extent: {e}")
+            raise
+
+    @profiled()
+    def get_measurement_watermarks(self) -> pd.DataFrame:
+        """Get the highest measurement ID and measurement count per participant."""
         try:
             query = """
             SELECT 
-                p.participant_id,
-                p.age,
-                p.training_status,
-                p.group_assignment,
-                m.measurement_date,
-                m.strength_1rm_kg,
-                m.lean_mass_kg,
-                m.performance_score,
-                m.muscle_thickness_mm,
-                m.creatine_kinase_level,
-                m.fatigue_level
-            FROM participants p
-            JOIN measurements m ON p.participant_id = m.participant_id
-            ORDER BY p.participant_id, m.measurement_date
+                participant_id,
+                MAX(measurement_id) as max_measurement_id,
+                COUNT(*) as measurement_count
+            FROM measurements
+            GROUP BY participant_id
             """
             df = pd.read_sql_query(query, self.engine)
-            logger.info(f"Retrieved progress data with {len(df)} records")
+            logger.info(f"Retrieved measurement watermarks for {len(df)} participants")
             return df
         except Exception as e:
-            logger.error(f"Error retrieving progress data: {e}")
+            logger.error(f"Error retrieving measurement watermarks: {e}")
             raise
 
-    def run_analysis_query(self, query_name: str) -> pd.DataFrame:
-        """Run a predefined analysis query."""
+    @profiled()
+    def get_participant_cache(self) -> pd.DataFrame:
+        """Get cached per-participant analysis results with current group and training status."""
         try:
-            queries_path = Path("database/queries.sql")
-            with open(queries_path, 'r') as f:
-                queries = f.read()
-                
-            # Split queries into a dictionary
-            query_dict = {}
-            current_query = []
-            current_name = None
+            df = pd.read_sql_query(PARTICIPANT_CACHE_QUERY, self.engine)
+            logger.info(f"Retrieved cached analysis results for {len(df)} participants")
+            return df
+        except Exception as e:
+            logger.error(f"Error retrieving participant analysis cache: {e}")
+            raise
+
+    @profiled()
+    def save_participant_cache(self, results: pd.DataFrame,
+                               stale_ids: Optional[List[int]] = None) -> int:
+        """
+        Replace cached per-participant analysis results.
+        Rows for stale_ids are removed first, so participants that no longer
+        have measurements drop out of the cache.
+        """
+        try:
+            columns = [
+                'participant_id', 'max_measurement_id', 'measurement_count',
+                'strength_1rm_kg_rate', 'strength_1rm_kg_r2',
+                'lean_mass_kg_rate', 'lean_mass_kg_r2',
+                'performance_score_rate', 'performance_score_r2',
+                'avg_fatigue_recovery', 'avg_performance_recovery', 'avg_ck_change',
+                'fatigue_recovery_per_day', 'performance_recovery_per_day', 'ck_change_per_day'
+            ]
+            rows = results.reindex(columns=columns).astype(object)
+            rows = rows.where(rows.notnull(), None).to_dict('records')
+            query = f"""
+            INSERT OR REPLACE INTO participant_analysis_cache (
+                {', '.join(columns)}
+            ) VALUES (
+                {', '.join(':' + column for column in columns)}
+            )
+            """
+            with self.engine.connect() as conn:
+                if stale_ids:
+                    conn.execute(
+                        text("DELETE FROM participant_analysis_cache WHERE participant_id = :pid"),
+                        [{'pid': int(pid)} for pid in stale_ids]
+                    )
+                if rows:
+                    conn.execute(text(query), rows)
+                conn.commit()
+            logger.info(f"Cached analysis results for {len(rows)} participants")
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Error saving participant analysis cache: {e}")
+            raise
+
+    @profiled()
+    def get_screening_data(self, metrics: List[str]) -> pd.DataFrame:
+        """
+        Get every measurement's ID, participant, group, study time and the
+        given metrics. Read over a plain sqlite3 connection, which is faster
+        than the engine for full-table reads.
+        """
+        try:
+            self._validate_metrics(metrics)
+            columns = ',\n        '.join(f"m.{metric}" for metric in metrics)
+            conn = sqlite3.connect(self.db_path)
+            try:
+                df = pd.read_sql_query(SCREENING_DATA_QUERY.format(metrics=columns), conn)
+            finally:
+                conn.close()
+            logger.info(f"Retrieved screening data with {len(df)} records")
+            return df
+        except Exception as e:
+            logger.error(f"Error retrieving screening data: {e}")
+            raise
+
+    @profiled()
+    def save_outlier_flags(self, flags: pd.DataFrame) -> int:
+        """
+        Replace the outlier flags of all measurements with the nonzero
+        outlier_flags in flags (measurement_id, outlier_flags); every other
+        measurement is marked clean. Returns the number of flagged rows.
+        """
+        try:
+            flagged = flags.loc[flags['outlier_flags'] > 0, ['measurement_id', 'outlier_flags']]
+            rows = [{'measurement_id': int(measurement_id), 'outlier_flags': int(value)}
+                    for measurement_id, value in flagged.itertuples(index=False)]
+            with self.engine.connect() as conn:
+                conn.execute(text("UPDATE measurements SET outlier_flags = 0 WHERE outlier_flags > 0"))
+                if rows:
+                    conn.execute(
+                        text("UPDATE measurements SET outlier_flags = :outlier_flags "
+                             "WHERE measurement_id = :measurement_id"),
+                        rows
+                    )
+                self._bump_content_version(conn)
+                conn.commit()
+            logger.info(f"Saved outlier flags for {len(rows)} measurements")
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Error saving outlier flags: {e}")
+            raise
+
+    @profiled()
+    def get_outliers(self) -> pd.DataFrame:
+        """Get the measurements flagged by outlier screening with their flags."""
+        try:
+            query = """
+            SELECT m.*, p.group_assignment
+            FROM measurements m
+            JOIN participants p ON p.participant_id = m.participant_id
+            WHERE m.outlier_flags > 0
+            ORDER BY m.participant_id, m.measurement_date
+            """
+            df = pd.read_sql_query(query, self.engine)
+            logger.info(f"Retrieved {len(df)} flagged measurements")
+            return df
+        except Exception as e:
+            logger.error(f"Error retrieving flagged measurements: {e}")
+            raise
+
+    def _load_queries(self) -> Dict[str, str]:
+        """Parse the named queries in queries.sql into a dictionary."""
+        queries_path = Path("database/queries.sql")
+        with open(queries_path, 'r') as f:
+            queries = f.read()
             
-            for line in queries.split('\n'):
-                if line.startswith('-- '):
-                    if current_name and current_query:
-                        query_dict[current_name] = '\n'.join(current_query)
-                    current_name = line[3:].strip()
-                    current_query = []
-                else:
-                    current_query.append(line)
-                    
-            if current_name and current_query:
-                query_dict[current_name] = '\n'.join(current_query)
+        # Split queries into a dictionary
+        query_dict = {}
+        current_query = []
+        current_name = None
+        
+        for line in queries.split('\n'):
+            if line.startswith('-- '):
+                if current_name and current_query:
+                    query_dict[current_name] = '\n'.join(current_query)
+                current_name = line[3:].strip()
+                current_query = []
+            else:
+                current_query.append(line)
                 
+        if current_name and current_query:
+            query_dict[current_name] = '\n'.join(current_query)
+        return query_dict
+
+    @profiled('query: {query_name}')
+    def run_analysis_query(self, query_name: str) -> pd.DataFrame:
+        """Run a predefined analysis query."""
+        try:
+            query_dict = self._load_queries()
             if query_name not in query_dict:
                 raise ValueError(f"Query '{query_name}' not found")
                 
@@ -204,6 +964,193 @@ class CreatineDatabase:
             logger.error(f"Error running analysis query: {e}")
             raise
 
+    @profiled()
+    def get_snapshot(self, query_names: List[str],
+                     extra_queries: Optional[Dict[str, str]] = None,
+                     include_progress_data: bool = True,
+                     exclude_outliers: bool = False) -> Dict[str, pd.DataFrame]:
+        """
+        Read the progress data and the given named queries inside a single
+        read transaction, so every frame reflects the same database state.
+        The progress data (without flagged measurements if exclude_outliers)
+        is stored under the 'progress_data' key; each of extra_queries
+        (key -> SQL) is stored under its key.
+        """
+        try:
+            query_dict = self._load_queries()
+            missing = [name for name in query_names if name not in query_dict]
+            if missing:
+                raise ValueError(f"Queries not found: {', '.join(missing)}")
+
+            queries = {name: query_dict[name] for name in query_names}
+            queries.update(extra_queries or {})
+            if include_progress_data:
+                queries['progress_data'] = self._progress_data_query(exclude_outliers=exclude_outliers)
+
+            snapshot = {}
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
+            try:
+                conn.execute("BEGIN")
+                for key, query in queries.items():
+                    with self.profiler.span(f'query: {key}') as span:
+                        snapshot[key] = pd.read_sql_query(query, conn)
+                        span.rows = len(snapshot[key])
+                conn.execute("COMMIT")
+            finally:
+                conn.close()
+
+            logger.info(f"Loaded snapshot of {len(snapshot)} result sets")
+            return snapshot
+        except Exception as e:
+            logger.error(f"Error loading database snapshot: {e}")
+            raise
+
+    def _participant_attribute_columns(self, group_by: List[str]) -> str:
+        """SQL select list for grouping by participant attributes."""
+        invalid = [column for column in group_by if column not in PARTICIPANT_ATTRIBUTES]
+        if invalid:
+            raise ValueError(f"Invalid grouping columns: {', '.join(invalid)}")
+        return ''.join(f"{PARTICIPANT_ATTRIBUTES[column]} AS {column}, " for column in group_by)
+
+    def _validate_metrics(self, metrics: List[str]):
+        """Reject metric names that are not measurement columns."""
+        invalid = [metric for metric in metrics if metric not in STATISTICS_METRICS]
+        if invalid:
+            raise ValueError(f"Invalid metrics: {', '.join(invalid)}")
+
+    def build_group_moments_query(self, group_by: List[str], metrics: List[str],
+                                  exclude_outliers: bool = False) -> str:
+        """
+        SQL for per-group sufficient statistics of the given metrics:
+        {metric}_count, and {metric}_sum / {metric}_sumsq of the values minus
+        {metric}_shift, the overall metric mean (shifting keeps the
+        variance computed from the moments numerically stable). With
+        exclude_outliers=True, measurements flagged by screening are skipped.
+        """
+        self._validate_metrics(metrics)
+        attributes = self._participant_attribute_columns(group_by)
+        moments = ',\n'.join(
+            f"COUNT(m.{metric}) AS {metric}_count, "
+            f"s.{metric}_shift AS {metric}_shift, "
+            f"SUM(m.{metric} - s.{metric}_shift) AS {metric}_sum, "
+            f"SUM((m.{metric} - s.{metric}_shift) * (m.{metric} - s.{metric}_shift)) AS {metric}_sumsq"
+            for metric in metrics
+        )
+        shifts = ', '.join(f"COALESCE(AVG({metric}), 0) AS {metric}_shift" for metric in metrics)
+        where = f"WHERE {CLEAN_MEASUREMENTS_FILTER}" if exclude_outliers else ""
+        group_clause = f"GROUP BY {', '.join(group_by)}" if group_by else ""
+        return f"""
+            SELECT {attributes}{moments}
+            FROM participants p
+            JOIN measurements m ON p.participant_id = m.participant_id
+            CROSS JOIN (SELECT {shifts} FROM measurements m {where}) s
+            {where}
+            {group_clause}
+            """
+
+    def build_rate_moments_query(self, group_by: List[str], metrics: List[str],
+                                 exclude_outliers: bool = False) -> str:
+        """
+        SQL for per-group moments of per-participant progression rates.
+        Each participant's least-squares slope (per day since their first
+        measurement), R² and residual variance are computed in SQL from
+        centered sums; participants with missing values or a single
+        measurement date are skipped. visit_sum and follow_up_sum total the
+        participants' visit counts and days of follow-up. Returns one row
+        per group and metric. With exclude_outliers=True, slopes are fitted
+        without the measurements flagged by screening.
+        """
+        self._validate_metrics(metrics)
+        attributes = self._participant_attribute_columns(group_by)
+        group_clause = f"GROUP BY {', '.join(group_by)}" if group_by else ""
+        where = f"WHERE {CLEAN_MEASUREMENTS_FILTER}" if exclude_outliers else ""
+        ctes = []
+        selects = []
+        for metric in metrics:
+            ctes.append(f"""
+            {metric}_obs AS (
+                SELECT 
+                    m.participant_id,
+                    julianday(m.measurement_date) - julianday(b.baseline_date) AS t,
+                    m.{metric} AS y
+                FROM measurements m
+                JOIN (
+                    SELECT participant_id, MIN(measurement_date) AS baseline_date
+                    FROM measurements GROUP BY participant_id
+                ) b ON b.participant_id = m.participant_id
+                {where}
+            ),
+            {metric}_rates AS (
+                SELECT 
+                    participant_id,
+                    n,
+                    span,
+                    sxy / sxx AS slope,
+                    CASE WHEN syy = 0 THEN 1.0 ELSE sxy * sxy / (sxx * syy) END AS r2,
+                    CASE WHEN n > 2 THEN (syy - sxy * sxy / sxx) / (n - 2) END AS resid_var
+                FROM (
+                    SELECT 
+                        o.participant_id,
+                        COUNT(*) AS n,
+                        MAX(o.t) AS span,
+                        SUM((o.t - c.t_mean) * (o.y - c.y_mean)) AS sxy,
+                        SUM((o.t - c.t_mean) * (o.t - c.t_mean)) AS sxx,
+                        SUM((o.y - c.y_mean) * (o.y - c.y_mean)) AS syy
+                    FROM {metric}_obs o
+                    JOIN (
+                        SELECT participant_id, AVG(t) AS t_mean, AVG(y) AS y_mean
+                        FROM {metric}_obs
+                        GROUP BY participant_id
+                        HAVING COUNT(y) = COUNT(*)
+                    ) c ON c.participant_id = o.participant_id
+                    GROUP BY o.participant_id
+                )
+                WHERE sxx > 0
+            )""")
+            selects.append(f"""
+            SELECT 
+                {attributes}'{metric}' AS metric,
+                COUNT(r.slope) AS participant_count,
+                s.shift AS rate_shift,
+                SUM(r.slope - s.shift) AS rate_sum,
+                SUM((r.slope - s.shift) * (r.slope - s.shift)) AS rate_sumsq,
+                SUM(r.r2) AS r2_sum,
+                SUM(r.n) AS visit_sum,
+                SUM(r.span) AS follow_up_sum,
+                COUNT(r.resid_var) AS resid_var_count,
+                SUM(r.resid_var) AS resid_var_sum
+            FROM {metric}_rates r
+            JOIN participants p ON p.participant_id = r.participant_id
+            CROSS JOIN (SELECT COALESCE(AVG(slope), 0) AS shift FROM {metric}_rates) s
+            {group_clause}""")
+        return "WITH " + ",".join(ctes) + "\n" + "\n            UNION ALL".join(selects)
+
+    @profiled()
+    def get_group_moments(self, group_by: List[str], metrics: List[str],
+                          exclude_outliers: bool = False) -> pd.DataFrame:
+        """Compute per-group sufficient statistics of the given metrics in SQL."""
+        try:
+            query = self.build_group_moments_query(group_by, metrics, exclude_outliers)
+            df = pd.read_sql_query(query, self.engine)
+            logger.info(f"Retrieved group moments for {len(df)} groups")
+            return df
+        except Exception as e:
+            logger.error(f"Error retrieving group moments: {e}")
+            raise
+
+    @profiled()
+    def get_rate_moments(self, group_by: List[str], metrics: List[str],
+                         exclude_outliers: bool = False) -> pd.DataFrame:
+        """Compute per-group moments of per-participant progression rates in SQL."""
+        try:
+            query = self.build_rate_moments_query(group_by, metrics, exclude_outliers)
+            df = pd.read_sql_query(query, self.engine)
+            logger.info(f"Retrieved rate moments for {len(df)} groups")
+            return df
+        except Exception as e:
+            logger.error(f"Error retrieving rate moments: {e}")
+            raise
+
     def update_participant(self, participant_id: int, update_data: Dict) -> bool:
         """Update participant information."""
         try:
@@ -221,6 +1168,12 @@ class CreatineDatabase:
             
             with self.engine.connect() as conn:
                 result = conn.execute(text(query), update_data)
+                # Running statistics are keyed by group and training status
+                if {'group_assignment', 'training_status'} & set(update_data):
+                    self._rebuild_running_statistics(conn)
+                if CUBE_PARTICIPANT_COLUMNS & set(update_data):
+                    self._rebuild_cube(conn)
+                self._bump_content_version(conn)
                 conn.commit()
                 
             success = result.rowcount > 0
@@ -267,6 +1220,10 @@ if __name__ == "__main__":
     parser.add_argument('--init', action='store_true', help='Initialize the database')
     parser.add_argument('--backup', action='store_true', help='Create a database backup')
     parser.add_argument('--backup-path', type=str, help='Custom backup file path')
+    parser.add_argument('--rebuild-stats', action='store_true',
+                        help='Rebuild running statistics from all measurements')
+    parser.add_argument('--rebuild-cube', action='store_true',
+                        help='Rebuild the measurement cube from all measurements')
     
     args = parser.parse_args()
     
@@ -280,4 +1237,14 @@ if __name__ == "__main__":
     if args.backup:
         print("Creating database backup...")
         backup_path = db.backup_database(args.backup_path)
-        print(f"Backup created successfully at: {backup_path}")
\ No newline at end of file
+        print(f"Backup created successfully at: {backup_path}")
+
+    if args.rebuild_stats:
+        print("Rebuilding running statistics...")
+        db.rebuild_running_statistics()
+        print("Running statistics rebuilt successfully!")
+
+    if args.rebuild_cube:
+        print("Rebuilding measurement cube...")
+        db.rebuild_cube()
+        print("Measurement cube rebuilt successfully!")
\ No newline at end of file
@@ -1,17 +1,16 @@
 import argparse
+import functools
 import logging
 from pathlib import Path
 from datetime import datetime, timedelta
 import json
+from typing import Optional
 
-import numpy as np
-from datetime import date
-
-import pandas as pd
 from src.database import CreatineDatabase
-from src.analysis import CreatineAnalysis
-from src.visualization import CreatineVisualization
-from src.dashboard import CreatineDashboard
+
+# The analysis, plotting and dashboard subsystems (scipy, sklearn,
+# matplotlib, seaborn, dash, plotly) are imported and built on first use,
+# so commands such as --backup and --init-db only load the database layer
 
 # Configure logging
 logging.basicConfig(
@@ -21,12 +20,39 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class CreatineStudy:
-    def __init__(self):
-        """Initialize the creatine study components."""
+    def __init__(self, use_cache: bool = True):
+        """
+        Initialize the creatine study components. With use_cache, analysis
+        results are shared through the on-disk result cache in results/cache.
+        """
         self.db = CreatineDatabase()
-        self.analysis = CreatineAnalysis(self.db)
-        self.visualization = CreatineVisualization(self.db)
-        self.dashboard = CreatineDashboard(self.db)
+        self.use_cache = use_cache
+        self.exclude_outliers = False
+
+    @functools.cached_property
+    def result_cache(self):
+        """The on-disk result cache, or None without use_cache."""
+        from src.result_cache import ResultCache
+        return ResultCache() if self.use_cache else None
+
+    @functools.cached_property
+    def analysis(self):
+        """The study analysis, built on first use."""
+        from src.analysis import CreatineAnalysis
+        return CreatineAnalysis(self.db, exclude_outliers=self.exclude_outliers,
+                                result_cache=self.result_cache)
+
+    @functools.cached_property
+    def visualization(self):
+        """The plotting subsystem, built on first use."""
+        from src.visualization import CreatineVisualization
+        return CreatineVisualization(self.db, exclude_outliers=self.exclude_outliers)
+
+    @functools.cached_property
+    def dashboard(self):
+        """The Dash app, built on first use."""
+        from src.dashboard import CreatineDashboard
+        return CreatineDashboard(self.db, exclude_outliers=self.exclude_outliers)
         
     def initialize_database(self):
         """Initialize the database with schema."""
@@ -38,8 +64,13 @@ class CreatineStudy:
             logger.error(f"Failed to initialize database: {e}")
             raise
 
-    def run_analysis(self, output_dir: str = 'results'):
-        """Run comprehensive analysis and save results."""
+    def run_analysis(self, output_dir: str = 'results', profile: bool = False):
+        """
+        Run comprehensive analysis and save results. With profile=True the
+        report is recomputed without the result cache, and the timing and
+        memory spans of the run are added to the saved report under
+        'profile' and logged as a flame-style summary.
+        """
         try:
             logger.info("Running analysis...")
         
@@ -48,29 +79,28 @@ class CreatineStudy:
             output_path.mkdir(parents=True, exist_ok=True)
         
             # Generate report
-            raw_report = self.analysis.generate_summary_report()
+            profiler = self.db.profiler
+            result_cache = self.analysis.result_cache
+            if profile:
+                # A cache hit would profile nothing but the lookup
+                self.analysis.result_cache = None
+                profiler.reset()
+                profiler.enable()
+            try:
+                raw_report = self.analysis.generate_summary_report()
+            finally:
+                if profile:
+                    profiler.disable()
+                    self.analysis.result_cache = result_cache
+            if profile:
+                raw_report['profile'] = profiler.to_dict()
+                logger.info(f"Analysis profile:\n{profiler.format_summary()}")
         
             # Save results
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
-            def make_serializable(obj):
-                if isinstance(obj, pd.DataFrame):
-                    return obj.to_dict('records')
-                elif isinstance(obj, pd.Series):
-                    return obj.to_dict()
-                elif isinstance(obj, dict):
-                    return {str(k): make_serializable(v) for k, v in obj.items()}
-                elif isinstance(obj, (list, tuple)):
-                    return [make_serializable(i) for i in obj]
-                elif isinstance(obj, (np.int64, np.float64)):
-                    return obj.item()
-                elif isinstance(obj, (datetime, date)):
-                    return obj.isoformat()
-                elif pd.isna(obj):
-                    return None
-                return obj if isinstance(obj, (str, int, float, bool, type(None))) else str(obj)
-
             # Convert report to serializable format
+            from src.analysis import make_serializable
             serializable_report = make_serializable(raw_report)
         
             # Save report
@@ -84,16 +114,79 @@ class CreatineStudy:
             logger.error(f"Failed to run analysis: {e}")
             raise
 
-    def generate_visualizations(self, output_dir: str = 'plots'):
-        """Generate all visualizations."""
+    def run_batch_analysis(self, db_paths: list, output_dir: str = 'results/batch',
+                           max_workers: Optional[int] = None):
+        """Run the analysis for several site databases and pool their effect sizes."""
+        try:
+            logger.info("Running batch analysis...")
+            from src.batch import BatchAnalysis
+            results = BatchAnalysis(db_paths, max_workers=max_workers,
+                                    exclude_outliers=self.exclude_outliers).run(output_dir)
+            failed = [site for site, info in results['sites'].items() if info['status'] == 'failed']
+            if failed:
+                logger.warning(f"Batch analysis failed for sites: {', '.join(failed)}")
+            return results
+        except Exception as e:
+            logger.error(f"Failed to run batch analysis: {e}")
+            raise
+
+    def screen_outliers(self):
+        """
+        Flag outlying measurements in the database. The flags are stored, but
+        leaving them out is a per-run choice: this study's analyses, batch
+        runs, plots and dashboard exclude the flagged measurements from here
+        on, while other runs include them unless they screen as well.
+        """
+        try:
+            logger.info("Screening measurements for outliers...")
+            from src.screening import OutlierScreening
+            results = OutlierScreening(self.db).run()
+            self.exclude_outliers = True
+            if 'analysis' in self.__dict__:
+                self.analysis.exclude_outliers = True
+            if 'visualization' in self.__dict__:
+                self.visualization.exclude_outliers = True
+            if 'dashboard' in self.__dict__:
+                self.dashboard.data.exclude_outliers = True
+            flagged = int((results['screened']['outlier_flags'] > 0).sum())
+            logger.info(f"Outlier screening flagged {flagged} measurements")
+            return results
+        except Exception as e:
+            logger.error(f"Failed to screen outliers: {e}")
+            raise
+
+    def generate_visualizations(self, output_dir: str = 'plots', force: bool = False,
+                                profile: str = 'standard', format: Optional[str] = None):
+        """
+        Generate all visualizations with a render profile ('draft',
+        'standard', 'publication' or 'web') and optional output format,
+        re-rendering only plots whose input data or style changed since the
+        last run unless force is set.
+        """
         try:
             logger.info("Generating visualizations...")
-            self.visualization.generate_summary_plots(output_dir)
-            logger.info(f"Visualizations saved to {output_dir}")
+            result = self.visualization.generate_summary_plots(output_dir, force=force,
+                                                               profile=profile, format=format)
+            # Per-plot timings are logged by generate_summary_plots
+            logger.info(f"Visualizations saved to {output_dir}: {len(result['rendered'])} rendered, "
+                        f"{len(result['skipped'])} unchanged skipped")
+            return result
         except Exception as e:
             logger.error(f"Failed to generate visualizations: {e}")
             raise
 
+    def generate_participant_panels(self, output_path: str, metric: str = 'strength_1rm_kg'):
+        """Render every participant's trajectory as small multiples to a PDF or PNG tiles."""
+        try:
+            logger.info("Generating participant panels...")
+            result = self.visualization.plot_participant_panels(output_path, metric=metric)
+            logger.info(f"Participant panels saved to {output_path}: {result['participants']} "
+                        f"participants on {result['pages']} pages ({result['seconds']:.2f}s)")
+            return result
+        except Exception as e:
+            logger.error(f"Failed to generate participant panels: {e}")
+            raise
+
     def run_dashboard(self, debug: bool = False, port: int = 8050):
         """Run the interactive dashboard."""
         try:
@@ -186,6 +279,7 @@ class CreatineStudy:
             # Add measurements for each participant
             start_date = datetime.now().date()
         
+            measurements = []
             for pid, participant in zip(participant_ids, participants):
                 for week in range(6):  # 6 weeks of data
                     measurement_date = start_date + timedelta(weeks=week)
@@ -208,7 +302,7 @@ class CreatineStudy:
                         strength_increment = 2 * week
                         mass_increment = 0.2 * week
                 
-                    self.db.add_measurement({
+                    measurements.append({
                         'participant_id': pid,
                         'measurement_date': measurement_date,
                         'strength_1rm_kg': 100.0 + strength_increment,
@@ -219,6 +313,20 @@ class CreatineStudy:
                         'fatigue_level': 3
                     })
             
+            self.db.add_measurements(measurements)
+            
+            # Enrol everyone in resistance training with varying compliance
+            self.db.add_training_assignments([
+                {
+                    'participant_id': pid,
+                    'program_id': 1,
+                    'start_date': start_date,
+                    'end_date': start_date + timedelta(weeks=5),
+                    'compliance_percentage': compliance
+                }
+                for pid, compliance in zip(participant_ids, [92.0, 85.0, 64.0, 45.0])
+            ])
+            
             logger.info("Sample data added successfully")
         except Exception as e:
             logger.error(f"Error adding sample data: {e}")
@@ -227,26 +335,53 @@ class CreatineStudy:
 def main():
     parser = argparse.ArgumentParser(description='Creatine Supplementation Study Analysis')
     parser.add_argument('--init-db', action='store_true', help='Initialize the database')
+    parser.add_argument('--screen-outliers', action='store_true',
+                        help='Flag outlying measurements and exclude them from this run\'s '
+                             'analysis, batch, plots and dashboard')
     parser.add_argument('--analyze', action='store_true', help='Run analysis')
+    parser.add_argument('--profile', action='store_true',
+                        help='Record timing and memory spans during analysis')
     parser.add_argument('--visualize', action='store_true', help='Generate visualizations')
+    parser.add_argument('--force', action='store_true',
+                        help='Re-render all plots even if their inputs are unchanged')
+    parser.add_argument('--render-profile', default='standard',
+                        help='Render profile for --visualize: draft, standard, publication or web')
+    parser.add_argument('--format', help='Output format for --visualize overriding the profile\'s, e.g. svg')
+    parser.add_argument('--panels', metavar='PATH',
+                        help='Render per-participant panels to a .pdf file or a directory of PNG pages')
     parser.add_argument('--dashboard', action='store_true', help='Run interactive dashboard')
     parser.add_argument('--backup', action='store_true', help='Create database backup')
     parser.add_argument('--port', type=int, default=8050, help='Dashboard port number')
+    parser.add_argument('--batch', nargs='+', metavar='DB',
+                        help='Run analysis for site database paths or glob patterns')
+    parser.add_argument('--workers', type=int, help='Worker processes for batch analysis')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Recompute analyses instead of reusing cached results')
     
     args = parser.parse_args()
     
-    study = CreatineStudy()
+    study = CreatineStudy(use_cache=not args.no_cache)
     
     try:
         if args.init_db:
             study.initialize_database()
             study.add_sample_data()  # Add this line
             
+        if args.screen_outliers:
+            study.screen_outliers()
+            
         if args.analyze:
-            study.run_analysis()
+            study.run_analysis(profile=args.profile)
+            
+        if args.batch:
+            study.run_batch_analysis(args.batch, max_workers=args.workers)
             
         if args.visualize:
-            study.generate_visualizations()
+            study.generate_visualizations(force=args.force, profile=args.render_profile,
+                                         format=args.format)
+            
+        if args.panels:
+            study.generate_participant_panels(args.panels)
             
         if args.dashboard:
             study.run_dashboard(port=args.port)
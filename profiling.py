@@ -0,0 +1,285 @@
+import functools
+import inspect
+import itertools
+import threading
+import time
+import tracemalloc
+import logging
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import pandas as pd
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Per-span peaks need tracemalloc.reset_peak (Python 3.9+); without it spans
+# record no peak memory
+PEAK_RESET_SUPPORTED = hasattr(tracemalloc, 'reset_peak')
+
+def count_rows(result) -> Optional[int]:
+    """Total rows in a DataFrame or a (nested) dict of DataFrames, else None."""
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return len(result)
+    if isinstance(result, dict):
+        counts = [count for count in map(count_rows, result.values()) if count is not None]
+        return sum(counts) if counts else None
+    return None
+
+class _NullSpan:
+    """Shared no-op span returned while profiling is disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    @property
+    def rows(self):
+        return None
+
+    @rows.setter
+    def rows(self, value):
+        pass
+
+NULL_SPAN = _NullSpan()
+
+class Span:
+    """One timed region: wall and CPU time, peak traced memory and row count."""
+    def __init__(self, profiler: 'Profiler', name: str, parent: Optional['Span'] = None):
+        self.profiler = profiler
+        self.name = name
+        self.parent = parent
+        self.span_id = next(profiler._ids)
+        self.rows = None
+
+    def __enter__(self):
+        stack = self.profiler._stack()
+        if self.parent is None and stack:
+            self.parent = stack[-1]
+        stack.append(self)
+
+        self.thread = threading.current_thread().name
+        self.memory_start = self.peak_seen = None
+        if PEAK_RESET_SUPPORTED and tracemalloc.is_tracing():
+            # Fold the peak so far into the parent before resetting it for this span
+            current, peak = tracemalloc.get_traced_memory()
+            if self.parent is not None and self.parent.peak_seen is not None:
+                self.parent.peak_seen = max(self.parent.peak_seen, peak)
+            tracemalloc.reset_peak()
+            self.memory_start = self.peak_seen = current
+
+        self.start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.wall_time = time.perf_counter() - self.start
+        self.cpu_time = time.thread_time() - self.cpu_start
+        self.peak_memory = None
+        if self.memory_start is not None and tracemalloc.is_tracing():
+            peak = max(self.peak_seen, tracemalloc.get_traced_memory()[1])
+            self.peak_memory = peak - self.memory_start
+            if self.parent is not None and self.parent.peak_seen is not None:
+                self.parent.peak_seen = max(self.parent.peak_seen, peak)
+
+        self.profiler._stack().pop()
+        self.profiler._record(self)
+        return False
+
+    @property
+    def path(self) -> List[str]:
+        """Names from the root span down to this one."""
+        names = []
+        span = self
+        while span is not None:
+            names.append(span.name)
+            span = span.parent
+        return names[::-1]
+
+    def to_dict(self) -> Dict:
+        return {
+            'span_id': self.span_id,
+            'parent_id': self.parent.span_id if self.parent is not None else None,
+            'name': self.name,
+            'depth': len(self.path) - 1,
+            'thread': self.thread,
+            'start': self.start - self.profiler.origin,
+            'wall_time': self.wall_time,
+            'cpu_time': self.cpu_time,
+            'peak_memory_bytes': self.peak_memory,
+            'rows': self.rows
+        }
+
+class Profiler:
+    def __init__(self, enabled: bool = False, trace_memory: bool = True):
+        """
+        Span recorder for analysis and database calls. Disabled by default,
+        in which case span() returns a shared no-op span and @profiled
+        methods run without any bookkeeping.
+
+        With trace_memory=True, enabling the profiler starts tracemalloc.
+        Peak memory is process-wide, so spans running concurrently on other
+        threads contribute to each other's peaks. On Python 3.8 spans carry
+        no peak memory (see PEAK_RESET_SUPPORTED).
+        """
+        self.trace_memory = trace_memory
+        self.enabled = False
+        self._started_tracing = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.reset()
+        if enabled:
+            self.enable()
+
+    def enable(self):
+        """Start recording spans."""
+        if self.trace_memory and PEAK_RESET_SUPPORTED and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self.enabled = True
+
+    def disable(self):
+        """Stop recording spans, keeping those already recorded."""
+        self.enabled = False
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def reset(self):
+        """Discard recorded spans."""
+        with self._lock:
+            self.spans = []
+            self._ids = itertools.count(1)
+            self.origin = time.perf_counter()
+
+    def _stack(self) -> List[Span]:
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def _record(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def span(self, name: str, parent: Optional[Span] = None):
+        """Context manager timing a named region, nested under the current span."""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, parent)
+
+    def current_span(self) -> Optional[Span]:
+        """The innermost open span on this thread."""
+        if not self.enabled:
+            return None
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def attach(self, span: Optional[Span]):
+        """Nest spans opened on this thread (e.g. a pool worker) under span."""
+        if span is None or not self.enabled:
+            yield
+            return
+        stack = self._stack()
+        stack.append(span)
+        try:
+            yield
+        finally:
+            stack.remove(span)
+
+    def to_dict(self) -> Dict:
+        """Recorded spans in start order, ready for a JSON report."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        return {
+            'spans': [span.to_dict() for span in spans],
+            'total_wall_time': sum(span.wall_time for span in spans if span.parent is None)
+        }
+
+    def to_frame(self) -> pd.DataFrame:
+        """Recorded spans as a DataFrame."""
+        return pd.DataFrame(self.to_dict()['spans'])
+
+    def collapsed_stacks(self) -> List[str]:
+        """Spans as 'root;child;leaf self-microseconds' lines for flame graph tools."""
+        with self._lock:
+            spans = list(self.spans)
+        child_time = {}
+        for span in spans:
+            if span.parent is not None:
+                child_time[span.parent.span_id] = child_time.get(span.parent.span_id, 0) + span.wall_time
+
+        stacks = {}
+        for span in spans:
+            key = ';'.join(span.path)
+            self_time = max(span.wall_time - child_time.get(span.span_id, 0), 0)
+            stacks[key] = stacks.get(key, 0) + self_time
+        return [f"{key} {int(seconds * 1e6)}" for key, seconds in stacks.items()]
+
+    def format_summary(self, width: int = 30) -> str:
+        """
+        Flame-style text summary: one line per span in call order, indented
+        by depth, with a bar proportional to its share of total wall time.
+        """
+        profile = self.to_dict()
+        spans = profile['spans']
+        if not spans:
+            return "No spans recorded"
+
+        children = {}
+        for span in spans:
+            children.setdefault(span['parent_id'], []).append(span)
+        total = profile['total_wall_time'] or 1.0
+        label_width = max(2 * span['depth'] + len(span['name']) for span in spans)
+
+        lines = [f"{'span':<{label_width}}  {'':<{width}}  {'wall s':>8}  {'cpu s':>8}  "
+                 f"{'peak MiB':>9}  {'rows':>8}"]
+
+        def add(span):
+            bar = '#' * max(1, round(width * span['wall_time'] / total))
+            memory = (f"{span['peak_memory_bytes'] / 2 ** 20:9.2f}"
+                      if span['peak_memory_bytes'] is not None else f"{'-':>9}")
+            rows = f"{span['rows']:8d}" if span['rows'] is not None else f"{'-':>8}"
+            label = '  ' * span['depth'] + span['name']
+            lines.append(f"{label:<{label_width}}  {bar:<{width}}  {span['wall_time']:8.3f}  "
+                         f"{span['cpu_time']:8.3f}  {memory}  {rows}")
+            for child in children.get(span['span_id'], []):
+                add(child)
+
+        for root in children.get(None, []):
+            add(root)
+        return '\n'.join(lines)
+
+def profiled(name: Optional[str] = None):
+    """
+    Record calls to a method of an object with a `profiler` attribute as
+    spans, with the row count of the returned frames. name defaults to the
+    method name and may use str.format fields named after the method's
+    parameters, e.g. 'query: {query_name}'. While the profiler is disabled
+    the method is called directly.
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+        signature = inspect.signature(func) if '{' in span_name else None
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            profiler = self.profiler
+            if not profiler.enabled:
+                return func(self, *args, **kwargs)
+            if signature is not None:
+                label = span_name.format(**signature.bind(self, *args, **kwargs).arguments)
+            else:
+                label = span_name
+            with profiler.span(label) as span:
+                result = func(self, *args, **kwargs)
+                span.rows = count_rows(result)
+            return result
+        return wrapper
+    return decorator
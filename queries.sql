@@ -61,24 +61,6 @@ AND m2.measurement_date = (SELECT MAX(measurement_date) FROM measurements)
 GROUP BY p.training_status, p.group_assignment
 ORDER BY strength_gain_percentage DESC;
 
--- Training Compliance Impact
-SELECT 
-    p.training_status,
-    CASE 
-        WHEN m2.performance_score - m1.performance_score > 1.5 THEN TRUE 
-        ELSE FALSE 
-    END as high_compliance,
-    COUNT(DISTINCT p.participant_id) as participant_count,
-    ROUND(AVG((m2.strength_1rm_kg - m1.strength_1rm_kg) / m1.strength_1rm_kg * 100), 2) as strength_gain_percentage,
-    ROUND(AVG((m2.lean_mass_kg - m1.lean_mass_kg) / m1.lean_mass_kg * 100), 2) as mass_gain_percentage
-FROM participants p
-JOIN measurements m1 ON p.participant_id = m1.participant_id
-JOIN measurements m2 ON p.participant_id = m2.participant_id
-WHERE m1.measurement_date = (SELECT MIN(measurement_date) FROM measurements)
-AND m2.measurement_date = (SELECT MAX(measurement_date) FROM measurements)
-GROUP BY p.training_status, high_compliance
-ORDER BY strength_gain_percentage DESC;
-
 -- Age Group Analysis
 SELECT 
     CASE 
@@ -0,0 +1,235 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+import logging
+from datetime import datetime, date
+from pathlib import Path
+from typing import Any, Dict, Tuple
+import numpy as np
+import pandas as pd
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Bumped when the on-disk entry layout changes, invalidating older entries
+CACHE_FORMAT_VERSION = 1
+
+# Temporary entry directories older than this (seconds) belong to crashed writers
+STALE_TEMP_AGE = 3600
+
+class UncacheableResult(TypeError):
+    """Raised for results that cannot be stored, which are then returned uncached."""
+
+class ResultCache:
+    def __init__(self, cache_dir: str = "results/cache", max_bytes: int = 256 * 2 ** 20):
+        """
+        On-disk cache of analysis results shared by every process pointed at
+        cache_dir. Each entry is a directory named after its key holding a
+        JSON manifest of the result's structure and one Parquet file per
+        DataFrame or Series in it.
+
+        Entries are written to a temporary directory and renamed into place,
+        so concurrent readers see either a whole entry or none, and a
+        concurrent writer of the same key simply loses the race. Reads touch
+        the manifest, and after each write the least recently used entries
+        are evicted until the cache fits in max_bytes.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        logger.info(f"Result cache at {self.cache_dir}")
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """SHA-256 of the JSON encoding of the key parts."""
+        encoded = json.dumps([CACHE_FORMAT_VERSION, *parts], sort_keys=True, default=repr)
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
+    def _encode(self, value: Any, frames: Dict[str, Any]):
+        """JSON-ready structure of value, moving frames and series into frames."""
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            name = f"frame_{len(frames)}.parquet"
+            frames[name] = value
+            return {'__series__' if isinstance(value, pd.Series) else '__frame__': name}
+        if isinstance(value, dict):
+            if not all(isinstance(key, str) for key in value):
+                raise UncacheableResult("Only string dictionary keys can be cached")
+            return {'__dict__': {key: self._encode(item, frames) for key, item in value.items()}}
+        if isinstance(value, (list, tuple)):
+            return {'__list__' if isinstance(value, list) else '__tuple__':
+                    [self._encode(item, frames) for item in value]}
+        if isinstance(value, np.generic):
+            return value.item()
+        if isinstance(value, (datetime, date)):
+            return {'__date__' if type(value) is date else '__datetime__': value.isoformat()}
+        if value is None or isinstance(value, (str, int, float, bool)):
+            return value
+        raise UncacheableResult(f"Cannot cache values of type {type(value).__name__}")
+
+    def _decode(self, value: Any, entry: Path):
+        """Inverse of _encode, reading frames from the entry directory."""
+        if not isinstance(value, dict):
+            return value
+        if '__frame__' in value:
+            return pd.read_parquet(entry / value['__frame__'])
+        if '__series__' in value:
+            return pd.read_parquet(entry / value['__series__']).iloc[:, 0]
+        if '__dict__' in value:
+            return {key: self._decode(item, entry) for key, item in value['__dict__'].items()}
+        if '__list__' in value:
+            return [self._decode(item, entry) for item in value['__list__']]
+        if '__tuple__' in value:
+            return tuple(self._decode(item, entry) for item in value['__tuple__'])
+        if '__date__' in value:
+            return date.fromisoformat(value['__date__'])
+        return datetime.fromisoformat(value['__datetime__'])
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """(True, result) for a cached key, else (False, None)."""
+        entry = self.cache_dir / key
+        try:
+            manifest_path = entry / 'manifest.json'
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            result = self._decode(manifest['result'], entry)
+            os.utime(manifest_path)
+        except (OSError, ValueError, KeyError):
+            # Missing, or evicted by another process while being read
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, result
+
+    def put(self, key: str, result: Any, label: str = '') -> bool:
+        """Store result under key. Returns False if it cannot be cached."""
+        frames = {}
+        try:
+            manifest = {'label': label, 'created': time.time(), 'result': self._encode(result, frames)}
+        except UncacheableResult as e:
+            logger.warning(f"Result of {label or key} not cached: {e}")
+            return False
+
+        temp = self.cache_dir / f".tmp-{uuid.uuid4().hex}"
+        try:
+            temp.mkdir()
+            for name, frame in frames.items():
+                frame = frame.to_frame() if isinstance(frame, pd.Series) else frame
+                frame.to_parquet(temp / name)
+            with open(temp / 'manifest.json', 'w') as f:
+                json.dump(manifest, f)
+            os.rename(temp, self.cache_dir / key)
+        except OSError as e:
+            shutil.rmtree(temp, ignore_errors=True)
+            if not (self.cache_dir / key).exists():
+                logger.warning(f"Result of {label or key} not cached: {e}")
+                return False
+            # Another process stored the same key first
+        except Exception as e:
+            shutil.rmtree(temp, ignore_errors=True)
+            logger.warning(f"Result of {label or key} not cached: {e}")
+            return False
+        self.evict()
+        return True
+
+    def _remove(self, entry: Path):
+        """Remove an entry without readers ever seeing it half-deleted."""
+        doomed = self.cache_dir / f".evict-{uuid.uuid4().hex}"
+        try:
+            os.rename(entry, doomed)
+        except OSError:
+            return  # Already removed by another process
+        shutil.rmtree(doomed, ignore_errors=True)
+
+    def entries(self) -> pd.DataFrame:
+        """Cached entries with their size in bytes and last access time."""
+        rows = []
+        now = time.time()
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.startswith('.'):
+                if entry.name.startswith('.tmp-') and now - entry.stat().st_mtime > STALE_TEMP_AGE:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                continue
+            try:
+                files = list(os.scandir(entry.path))
+                rows.append({
+                    'key': entry.name,
+                    'bytes': sum(file.stat().st_size for file in files),
+                    'last_access': os.stat(os.path.join(entry.path, 'manifest.json')).st_mtime
+                })
+            except OSError:
+                continue
+        return pd.DataFrame(rows, columns=['key', 'bytes', 'last_access'])
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits. Returns the number removed."""
+        entries = self.entries().sort_values('last_access')
+        excess = entries['bytes'].sum() - self.max_bytes
+        removed = 0
+        for key, size in zip(entries['key'], entries['bytes']):
+            if excess <= 0:
+                break
+            self._remove(self.cache_dir / key)
+            excess -= size
+            removed += 1
+        if removed:
+            logger.info(f"Evicted {removed} cached results")
+        return removed
+
+    def clear(self):
+        """Remove every cached entry."""
+        for key in self.entries()['key']:
+            self._remove(self.cache_dir / key)
+
+def cached_result(func):
+    """
+    Cache a method's results in the object's `result_cache` (a ResultCache,
+    or None to disable caching). The key hashes the method, its arguments,
+    the object's cache_context(), the source of the method's module and the
+    content version of its database, so any write through the database
+    invalidates earlier results. Calls given a snapshot bypass the cache.
+    """
+    signature = inspect.signature(func)
+    module = sys.modules.get(func.__module__)
+    try:
+        source = inspect.getsource(module) if module is not None else func.__qualname__
+    except (OSError, TypeError):
+        source = func.__qualname__
+    source_hash = hashlib.sha256(source.encode()).hexdigest()
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        cache = self.result_cache
+        if cache is None:
+            return func(self, *args, **kwargs)
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+        arguments.pop('self')
+        if arguments.pop('snapshot', None) is not None:
+            return func(self, *args, **kwargs)
+
+        version = self.db.get_content_version()
+        key = cache.make_key(func.__qualname__, source_hash, arguments, self.cache_context(), version)
+        found, result = cache.get(key)
+        if found:
+            logger.info(f"Loaded cached result of {func.__qualname__}")
+            return result
+
+        result = func(self, *args, **kwargs)
+        # Results computed while the data changed are not attributable to either version
+        if self.db.get_content_version() == version:
+            cache.put(key, result, label=func.__qualname__)
+        return result
+    return wrapper
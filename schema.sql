@@ -1,7 +1,12 @@
 -- Drop tables if they exist
+DROP TABLE IF EXISTS content_version;
+DROP TABLE IF EXISTS measurement_cube;
+DROP TABLE IF EXISTS running_statistics;
+DROP TABLE IF EXISTS participant_analysis_cache;
 DROP TABLE IF EXISTS measurements;
 DROP TABLE IF EXISTS participant_training;
 DROP TABLE IF EXISTS training_programs;
+DROP TABLE IF EXISTS dosing_schedule;
 DROP TABLE IF EXISTS dosing_protocols;
 DROP TABLE IF EXISTS participants;
 
@@ -30,6 +35,16 @@ CREATE TABLE dosing_protocols (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Phases of each participant dosing protocol, taken in phase_order, each
+-- lasting its dosing_protocols.duration_days at daily_dose_g
+CREATE TABLE dosing_schedule (
+    dosing_protocol TEXT NOT NULL CHECK(dosing_protocol IN ('loading', 'maintenance')),
+    phase_order INTEGER NOT NULL,
+    protocol_id INTEGER NOT NULL,
+    PRIMARY KEY (dosing_protocol, phase_order),
+    FOREIGN KEY (protocol_id) REFERENCES dosing_protocols(protocol_id)
+);
+
 -- Training programs based on research protocols
 CREATE TABLE training_programs (
     program_id INTEGER PRIMARY KEY,
@@ -63,16 +78,109 @@ CREATE TABLE measurements (
     creatine_kinase_level FLOAT,
     performance_score FLOAT,
     fatigue_level INTEGER CHECK(fatigue_level BETWEEN 1 AND 10),
+    -- Days and whole weeks since the participant's first measurement, filled at ingest
+    study_day INTEGER,
+    study_week INTEGER,
+    -- Outlier screening bitmask (1 trajectory, 2 group-week, 4 jump), 0 for clean or unscreened rows
+    outlier_flags INTEGER NOT NULL DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (participant_id) REFERENCES participants(participant_id)
 );
 
+-- Per-participant analysis results, keyed by the measurement watermark they were computed at
+CREATE TABLE participant_analysis_cache (
+    participant_id INTEGER PRIMARY KEY,
+    max_measurement_id INTEGER NOT NULL,
+    measurement_count INTEGER NOT NULL,
+    strength_1rm_kg_rate FLOAT,
+    strength_1rm_kg_r2 FLOAT,
+    lean_mass_kg_rate FLOAT,
+    lean_mass_kg_r2 FLOAT,
+    performance_score_rate FLOAT,
+    performance_score_r2 FLOAT,
+    avg_fatigue_recovery FLOAT,
+    avg_performance_recovery FLOAT,
+    avg_ck_change FLOAT,
+    fatigue_recovery_per_day FLOAT,
+    performance_recovery_per_day FLOAT,
+    ck_change_per_day FLOAT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (participant_id) REFERENCES participants(participant_id)
+);
+
+-- Running per-cell statistics (Welford count/mean/M2) maintained at ingest time.
+-- Kept next to measurement_cube, which is keyed by calendar date and has no
+-- min/max: study weeks count from each participant's own baseline
+CREATE TABLE running_statistics (
+    group_assignment TEXT NOT NULL,
+    training_status TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    study_week INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    mean FLOAT NOT NULL,
+    m2 FLOAT NOT NULL,
+    min_value FLOAT,
+    max_value FLOAT,
+    PRIMARY KEY (group_assignment, training_status, metric, study_week)
+);
+
+-- Aggregate cube: per-metric count, sum and sum of squares for every combination
+-- of participant attributes and measurement date, maintained at ingest time
+CREATE TABLE measurement_cube (
+    group_assignment TEXT NOT NULL,
+    training_status TEXT NOT NULL,
+    population_category TEXT NOT NULL,
+    dosing_protocol TEXT NOT NULL,
+    age_group TEXT NOT NULL,
+    measurement_date DATE NOT NULL,
+    -- Distinct participants measured on the date (additive across attribute cells only)
+    participant_count INTEGER NOT NULL,
+    strength_1rm_kg_count INTEGER NOT NULL,
+    strength_1rm_kg_sum FLOAT NOT NULL,
+    strength_1rm_kg_sumsq FLOAT NOT NULL,
+    lean_mass_kg_count INTEGER NOT NULL,
+    lean_mass_kg_sum FLOAT NOT NULL,
+    lean_mass_kg_sumsq FLOAT NOT NULL,
+    muscle_thickness_mm_count INTEGER NOT NULL,
+    muscle_thickness_mm_sum FLOAT NOT NULL,
+    muscle_thickness_mm_sumsq FLOAT NOT NULL,
+    creatine_kinase_level_count INTEGER NOT NULL,
+    creatine_kinase_level_sum FLOAT NOT NULL,
+    creatine_kinase_level_sumsq FLOAT NOT NULL,
+    performance_score_count INTEGER NOT NULL,
+    performance_score_sum FLOAT NOT NULL,
+    performance_score_sumsq FLOAT NOT NULL,
+    fatigue_level_count INTEGER NOT NULL,
+    fatigue_level_sum FLOAT NOT NULL,
+    fatigue_level_sumsq FLOAT NOT NULL,
+    PRIMARY KEY (group_assignment, training_status, population_category, dosing_protocol,
+                 age_group, measurement_date)
+);
+
+-- Version of the study data, bumped by every write to participants, measurements,
+-- training assignments or outlier flags. The random database ID tells apart
+-- databases that reach the same version number
+CREATE TABLE content_version (
+    database_id TEXT NOT NULL,
+    version INTEGER NOT NULL
+);
+
+INSERT INTO content_version (database_id, version) VALUES (lower(hex(randomblob(16))), 0);
+
 -- Insert initial dosing protocols
 INSERT INTO dosing_protocols (protocol_name, daily_dose_g, duration_days, description) VALUES
 ('Loading Phase', 20, 7, 'Initial loading phase: 20g/day for 7 days'),
 ('Maintenance Phase', 5, 49, 'Maintenance phase: 5g/day for 49 days'),
 ('Direct Maintenance', 3, 56, 'Direct maintenance without loading: 3g/day for 56 days');
 
+-- Loading is followed by maintenance, the maintenance protocol starts without loading
+INSERT INTO dosing_schedule (dosing_protocol, phase_order, protocol_id)
+SELECT 'loading', 1, protocol_id FROM dosing_protocols WHERE protocol_name = 'Loading Phase'
+UNION ALL
+SELECT 'loading', 2, protocol_id FROM dosing_protocols WHERE protocol_name = 'Maintenance Phase'
+UNION ALL
+SELECT 'maintenance', 1, protocol_id FROM dosing_protocols WHERE protocol_name = 'Direct Maintenance';
+
 -- Insert initial training programs
 INSERT INTO training_programs (program_name, frequency_per_week, intensity_percentage, exercise_type, description) VALUES
 ('Resistance Training', 3, 75, 'resistance', 'Whole-body resistance training 3x per week'),
@@ -83,4 +191,8 @@ INSERT INTO training_programs (program_name, frequency_per_week, intensity_perce
 CREATE INDEX idx_participant_group ON participants(group_assignment);
 CREATE INDEX idx_participant_status ON participants(training_status);
 CREATE INDEX idx_measurements_date ON measurements(measurement_date);
-CREATE INDEX idx_participant_training ON participant_training(participant_id, program_id);
\ No newline at end of file
+CREATE INDEX idx_measurements_participant ON measurements(participant_id, measurement_id);
+CREATE INDEX idx_measurements_study_week ON measurements(study_week);
+CREATE INDEX idx_measurements_outlier ON measurements(outlier_flags);
+CREATE INDEX idx_participant_training ON participant_training(participant_id, program_id);
+CREATE INDEX idx_participant_training_period ON participant_training(participant_id, start_date);
\ No newline at end of file
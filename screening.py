@@ -0,0 +1,190 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Optional
+import logging
+from .database import CreatineDatabase
+from .profiling import profiled
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Metrics screened by default: those prone to data-entry errors that feed effect sizes
+SCREENING_METRICS = ['strength_1rm_kg', 'lean_mass_kg', 'creatine_kinase_level', 'performance_score']
+
+# Bits of measurements.outlier_flags, one per check
+OUTLIER_CHECKS = {
+    'trajectory': 1,
+    'group_week': 2,
+    'jump': 4
+}
+
+# Modified z-score constants (Iglewicz & Hoaglin): 0.6745 scales the MAD to
+# the standard deviation of a normal sample, 1.253314 the mean absolute
+# deviation, used when more than half the values tie and the MAD is zero
+MAD_SCALE = 0.6745
+MEAN_AD_SCALE = 1.253314
+
+def robust_z_scores(values: pd.DataFrame, keys, min_count: int = 1,
+                    pooled_floor: bool = False) -> pd.DataFrame:
+    """
+    Modified z-scores of every column within the groups given by keys:
+    0.6745 * (x - median) / MAD. Groups with fewer than min_count values
+    in a column get NaN; constant groups get 0. With pooled_floor=True the
+    scale of each group is at least the median scale over all rows, which
+    keeps small groups with a chance-tight MAD from flagging ordinary values.
+    """
+    grouped = values.groupby(keys, sort=False)
+    median = grouped.transform('median')
+    deviation = values - median
+    absolute = deviation.abs().groupby(keys, sort=False)
+    mad = absolute.transform('median')
+    mean_ad = absolute.transform('mean')
+
+    scale = (mad / MAD_SCALE).where(mad > 0, MEAN_AD_SCALE * mean_ad)
+    if pooled_floor:
+        scale = scale.clip(lower=scale.median(), axis=1)
+    z = (deviation / scale.where(scale > 0)).where(scale > 0, 0.0).where(values.notnull())
+    return z.where(grouped.transform('count') >= min_count)
+
+class OutlierScreening:
+    def __init__(self, db: CreatineDatabase, threshold: float = 3.5,
+                 metrics: Optional[List[str]] = None, min_group_size: int = 5):
+        """
+        Robust outlier screening of the measurement table. Each metric is
+        checked three ways, all from medians and median absolute deviations
+        so the outliers being hunted do not mask themselves:
+
+          trajectory - modified z-score within the participant's visits
+          group_week - modified z-score within the group x study-week cell
+          jump       - departure from the line between the neighbouring
+                       visits, scaled by the spread of such departures over
+                       all visits; only the visit with the largest departure
+                       among its neighbours is flagged, so one spike does
+                       not also flag the visits around it
+
+        A check flags a measurement when its |z| exceeds threshold for any
+        metric. Trajectories need three visits and group-week cells
+        min_group_size measurements to be scored.
+        """
+        self.db = db
+        self.profiler = db.profiler
+        self.threshold = threshold
+        self.metrics = metrics or SCREENING_METRICS
+        self.min_group_size = min_group_size
+        logger.info("Outlier screening initialized")
+
+    def _jump_z_scores(self, data: pd.DataFrame, trajectory_z: pd.DataFrame) -> pd.DataFrame:
+        """
+        Robust z-scores of each visit's departure from its neighbours' line
+        (interior visits only), kept where the visit is the one to blame: its
+        departure is a local maximum and no neighbouring first or last visit
+        is itself a trajectory outlier.
+        """
+        participant = data['participant_id'].to_numpy()
+        day = data['study_day'].to_numpy(dtype=float)
+        has_previous = np.r_[False, participant[1:] == participant[:-1]]
+        has_next = np.r_[participant[:-1] == participant[1:], False]
+        interior = has_previous & has_next
+
+        previous_day, next_day = np.roll(day, 1), np.roll(day, -1)
+        span = next_day - previous_day
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weight = np.where(span > 0, (day - previous_day) / span, 0.5)
+
+        values = data[self.metrics]
+        expected = values.shift(1) + (values.shift(-1) - values.shift(1)).mul(weight, axis=0)
+        jumps = values - expected
+        jumps.loc[~interior] = np.nan
+        z = robust_z_scores(jumps, np.zeros(len(data), dtype=int), min_count=self.min_group_size)
+
+        # Keep only local maxima of |jump| so a spike's neighbours are not flagged
+        magnitude = jumps.abs().fillna(0).to_numpy()
+        previous_magnitude = np.vstack([np.zeros((1, magnitude.shape[1])), magnitude[:-1]])
+        next_magnitude = np.vstack([magnitude[1:], np.zeros((1, magnitude.shape[1]))])
+        previous_magnitude[~has_previous] = 0
+        next_magnitude[~has_next] = 0
+        local_max = (magnitude >= previous_magnitude) & (magnitude >= next_magnitude)
+
+        # A spike on a first or last visit bends the line its neighbour is judged by
+        edge_outlier = (trajectory_z.abs() > self.threshold).to_numpy() & ~interior[:, None]
+        beside_edge_outlier = (
+            (np.roll(edge_outlier, 1, axis=0) & has_previous[:, None]) |
+            (np.roll(edge_outlier, -1, axis=0) & has_next[:, None])
+        )
+        return z.where(local_max & ~beside_edge_outlier)
+
+    @profiled()
+    def screen(self, data: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """
+        Score and flag every measurement in one vectorized pass. data, as
+        returned by the database's get_screening_data, is read if not given.
+        Returns one row per measurement with {metric}_{check}_z scores and
+        the outlier_flags bitmask (see OUTLIER_CHECKS).
+        """
+        try:
+            if data is None:
+                data = self.db.get_screening_data(self.metrics)
+            data = data.sort_values(['participant_id', 'study_day', 'measurement_id'],
+                                    kind='mergesort').reset_index(drop=True)
+            values = data[self.metrics].astype(float)
+
+            cells = data.groupby(['group_assignment', 'study_week'], sort=False, dropna=False).ngroup()
+            trajectory_z = robust_z_scores(values, data['participant_id'].to_numpy(), min_count=3,
+                                           pooled_floor=True)
+            scores = {
+                'trajectory': trajectory_z,
+                'group_week': robust_z_scores(values, cells.to_numpy(), min_count=self.min_group_size,
+                                              pooled_floor=True),
+                'jump': self._jump_z_scores(data.assign(**values), trajectory_z)
+            }
+
+            result = data[['measurement_id', 'participant_id', 'group_assignment', 'study_week']].copy()
+            flags = np.zeros(len(data), dtype=int)
+            for check, z in scores.items():
+                flagged = (z.abs() > self.threshold).any(axis=1).to_numpy()
+                flags |= np.where(flagged, OUTLIER_CHECKS[check], 0)
+                for metric in self.metrics:
+                    result[f'{metric}_{check}_z'] = z[metric]
+            result['outlier_flags'] = flags
+
+            logger.info(f"Screened {len(result)} measurements, "
+                        f"{int((flags > 0).sum())} flagged")
+            return result
+        except Exception as e:
+            logger.error(f"Error screening measurements: {e}")
+            raise
+
+    def summarize(self, screened: pd.DataFrame) -> pd.DataFrame:
+        """Flagged measurement counts per metric and check."""
+        rows = []
+        for metric in self.metrics:
+            for check in OUTLIER_CHECKS:
+                rows.append({
+                    'metric': metric,
+                    'check': check,
+                    'flagged': int((screened[f'{metric}_{check}_z'].abs() > self.threshold).sum())
+                })
+        return pd.DataFrame(rows)
+
+    @profiled()
+    def run(self) -> Dict[str, pd.DataFrame]:
+        """
+        Screen all measurements and store the flags in measurements.outlier_flags,
+        replacing earlier flags. Measurements added later stay unflagged until
+        the next run. Returns the scored measurements and a per-check summary.
+        """
+        try:
+            screened = self.screen()
+            flagged = self.db.save_outlier_flags(screened)
+            logger.info(f"Outlier screening stored flags for {flagged} measurements")
+            return {
+                'screened': screened,
+                'summary': self.summarize(screened)
+            }
+        except Exception as e:
+            logger.error(f"Error running outlier screening: {e}")
+            raise
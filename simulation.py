@@ -0,0 +1,214 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Optional
+from scipy import stats
+from concurrent.futures import ProcessPoolExecutor
+import logging
+from .database import CreatineDatabase
+from .analysis import CreatineAnalysis, RATE_METRICS
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+ARMS = ['creatine', 'placebo']
+
+def _simulate_sample_size(sample_size: int, parameters: Dict, replicates: int,
+                          alpha: float, batch_size: int, seed: np.random.SeedSequence) -> List[Dict]:
+    """
+    Simulate `replicates` two-arm cohorts of `sample_size` participants per arm
+    and evaluate the effect-size and progression-rate estimators on each.
+
+    Every participant follows the arm's visit schedule with a random intercept,
+    a random slope and independent residual noise. Replicates are drawn in
+    batches of `batch_size` as (batch, participants, visits) arrays.
+    """
+    rng = np.random.default_rng(seed)
+    z_critical = stats.norm.ppf(1 - alpha / 2)
+    results = []
+
+    for metric, arms in parameters.items():
+        effect_sizes, rate_differences = [], []
+        effect_detected = rate_detected = 0
+
+        for start in range(0, replicates, batch_size):
+            batch = min(batch_size, replicates - start)
+            cohorts = {}
+            for arm in ARMS:
+                arm_params = arms[arm]
+                intercepts = rng.normal(arm_params['intercept_mean'], arm_params['intercept_std'],
+                                        (batch, sample_size, 1))
+                slopes = rng.normal(arm_params['slope_mean'], arm_params['slope_std'],
+                                    (batch, sample_size, 1))
+                schedule = arm_params['schedule']
+                noise = rng.normal(0.0, arm_params['resid_std'], (batch, sample_size, len(schedule)))
+                cohorts[arm] = intercepts + slopes * schedule + noise
+
+            # Cohen's d over all measurements, as in calculate_effect_sizes. Its
+            # standard error comes from the participant means, since a
+            # participant's visits are not independent: with equal visits per
+            # participant the mean over measurements is the mean of those means.
+            values = {arm: cohort.reshape(batch, -1) for arm, cohort in cohorts.items()}
+            pooled_std = np.sqrt((values['creatine'].var(axis=1) + values['placebo'].var(axis=1)) / 2)
+            d = (values['creatine'].mean(axis=1) - values['placebo'].mean(axis=1)) / pooled_std
+            participant_means = {arm: cohort.mean(axis=2) for arm, cohort in cohorts.items()}
+            difference_se = np.sqrt(sum(means.var(axis=1, ddof=1) for means in participant_means.values())
+                                    / sample_size)
+            d_se = np.sqrt((difference_se / pooled_std) ** 2 + d ** 2 / (4 * sample_size))
+            effect_sizes.append(d)
+            effect_detected += int((np.abs(d) / d_se > z_critical).sum())
+
+            # Per-participant least-squares slopes on each arm's own schedule,
+            # compared with Welch's t-test
+            centered = {arm: arms[arm]['schedule'] - arms[arm]['schedule'].mean() for arm in ARMS}
+            if all((offsets ** 2).sum() > 0 for offsets in centered.values()):
+                rates = {arm: cohort @ centered[arm] / (centered[arm] ** 2).sum()
+                         for arm, cohort in cohorts.items()}
+                test = stats.ttest_ind(rates['creatine'], rates['placebo'], axis=1, equal_var=False)
+                rate_differences.append(rates['creatine'].mean(axis=1) - rates['placebo'].mean(axis=1))
+                rate_detected += int((test.pvalue < alpha).sum())
+
+        results.append({
+            'metric': metric,
+            'estimator': 'effect_size',
+            'sample_size': sample_size,
+            'replicates': replicates,
+            'power': effect_detected / replicates,
+            'mean_estimate': float(np.concatenate(effect_sizes).mean())
+        })
+        if rate_differences:
+            results.append({
+                'metric': metric,
+                'estimator': 'progression_rate',
+                'sample_size': sample_size,
+                'replicates': replicates,
+                'power': rate_detected / replicates,
+                'mean_estimate': float(np.concatenate(rate_differences).mean())
+            })
+    return results
+
+class PowerSimulation:
+    def __init__(self, db: CreatineDatabase, seed: Optional[int] = None):
+        """Initialize power simulation with database connection."""
+        self.db = db
+        self.seed = seed
+        logger.info("Power simulation module initialized")
+
+    def load_parameters(self, metrics: Optional[List[str]] = None) -> Dict:
+        """
+        Estimate per-arm generating parameters from the database moments:
+        measurement level mean and variance, progression slope mean and
+        variance, residual variance and the typical visit schedule. Intercept
+        moments are matched so simulated measurements reproduce the observed
+        level mean and variance.
+        """
+        try:
+            metrics = metrics or RATE_METRICS
+            levels = CreatineAnalysis(self.db).calculate_group_moments(['group_assignment'], metrics)
+            levels = levels.set_index('group_assignment')
+            rates = self.db.get_rate_moments(['group_assignment'], metrics)
+            rates = rates.set_index(['metric', 'group_assignment'])
+
+            parameters = {}
+            for metric in metrics:
+                parameters[metric] = {}
+                for arm in ARMS:
+                    if arm not in levels.index or (metric, arm) not in rates.index:
+                        raise ValueError(f"No {arm} data available for {metric}")
+                    rate = rates.loc[(metric, arm)]
+                    count = rate['participant_count']
+                    if count < 2:
+                        raise ValueError(f"Need at least two {arm} participants with progression data")
+
+                    centered_mean = rate['rate_sum'] / count
+                    slope_mean = rate['rate_shift'] + centered_mean
+                    slope_var = max((rate['rate_sumsq'] - count * centered_mean ** 2) / (count - 1), 0.0)
+                    resid_var = (max(rate['resid_var_sum'] / rate['resid_var_count'], 0.0)
+                                 if rate['resid_var_count'] else 0.0)
+                    visits = max(int(round(rate['visit_sum'] / count)), 2)
+                    schedule = np.linspace(0.0, rate['follow_up_sum'] / count, visits)
+
+                    level_mean = levels.loc[arm, f'{metric}_mean']
+                    level_var = levels.loc[arm, f'{metric}_var']
+                    intercept_var = (level_var - slope_var * (schedule ** 2).mean()
+                                     - slope_mean ** 2 * schedule.var() - resid_var)
+
+                    parameters[metric][arm] = {
+                        'intercept_mean': level_mean - slope_mean * schedule.mean(),
+                        'intercept_std': np.sqrt(max(intercept_var, 0.0)),
+                        'slope_mean': slope_mean,
+                        'slope_std': np.sqrt(slope_var),
+                        'resid_std': np.sqrt(resid_var),
+                        'schedule': schedule
+                    }
+
+            logger.info("Simulation parameters loaded successfully")
+            return parameters
+        except Exception as e:
+            logger.error(f"Error loading simulation parameters: {e}")
+            raise
+
+    def simulate_power(self, sample_sizes: List[int], metrics: Optional[List[str]] = None,
+                       replicates: int = 10000, alpha: float = 0.05, batch_size: int = 1000,
+                       max_workers: Optional[int] = None,
+                       parameters: Optional[Dict] = None) -> pd.DataFrame:
+        """
+        Estimate power to detect the creatine vs placebo difference for each
+        per-arm sample size. Sample sizes run in parallel on a process pool.
+
+        Power is the share of replicates in which the effect size (Cohen's d,
+        normal approximation to its standard error, estimated from the
+        participant means) or the difference in mean progression rates
+        (Welch's t-test) is significant at alpha.
+        """
+        try:
+            parameters = parameters or self.load_parameters(metrics)
+            seeds = np.random.SeedSequence(self.seed).spawn(len(sample_sizes))
+            tasks = [(int(n), parameters, replicates, alpha, batch_size, seed)
+                     for n, seed in zip(sample_sizes, seeds)]
+
+            if max_workers == 1:
+                results = [_simulate_sample_size(*task) for task in tasks]
+            else:
+                with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    results = list(executor.map(_simulate_sample_size, *zip(*tasks)))
+
+            power_table = pd.DataFrame([row for rows in results for row in rows])
+            power_table = power_table.sort_values(['metric', 'estimator', 'sample_size'])
+
+            logger.info(f"Simulated power for {len(sample_sizes)} sample sizes")
+            return power_table.reset_index(drop=True)
+        except Exception as e:
+            logger.error(f"Error simulating power: {e}")
+            raise
+
+    def minimum_sample_size(self, power_table: pd.DataFrame,
+                            target_power: float = 0.8) -> pd.DataFrame:
+        """Smallest simulated per-arm sample size reaching the target power."""
+        try:
+            reached = power_table[power_table['power'] >= target_power]
+            minimum = reached.groupby(['metric', 'estimator'])['sample_size'].min()
+            all_pairs = power_table[['metric', 'estimator']].drop_duplicates()
+            return all_pairs.merge(minimum.reset_index(), how='left').reset_index(drop=True)
+        except Exception as e:
+            logger.error(f"Error finding minimum sample size: {e}")
+            raise
+
+if __name__ == "__main__":
+    # Example usage
+    db = CreatineDatabase()
+    simulation = PowerSimulation(db, seed=42)
+
+    try:
+        power_table = simulation.simulate_power([10, 20, 40, 80, 160])
+        print("\nPower by Sample Size (per arm)")
+        print("==============================")
+        print(power_table.pivot_table(index='sample_size', columns=['metric', 'estimator'],
+                                      values='power'))
+        print("\nMinimum Sample Size for 80% Power")
+        print(simulation.minimum_sample_size(power_table))
+    finally:
+        db.close()
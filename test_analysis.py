@@ -3,8 +3,10 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import os
+import tracemalloc
 from src.database import CreatineDatabase
 from src.analysis import CreatineAnalysis
+from src import profiling
 
 @pytest.fixture
 def test_db():
@@ -70,6 +72,21 @@ def analysis(test_db):
     """Create analysis instance with test database."""
     return CreatineAnalysis(test_db)
 
+@pytest.fixture
+def study_db(make_study_db):
+    """Create a temporary test database with a creatine and a placebo arm."""
+    participants = [
+        ('creatine', 'trained', 25, 'young trained', 5.0, 0.5),
+        ('creatine', 'untrained', 55, 'older untrained', 2.5, 0.25),
+        ('placebo', 'trained', 27, 'young trained', 3.0, 0.3),
+        ('placebo', 'untrained', 52, 'older untrained', 2.0, 0.2)
+    ]
+    return make_study_db([{'group_assignment': group, 'training_status': status, 'age': age,
+                           'population_category': category, 'strength_step': strength_step,
+                           'mass_step': mass_step}
+                          for group, status, age, category, strength_step, mass_step in participants],
+                         weeks=5)
+
 def test_calculate_effect_sizes(analysis):
     """Test effect size calculations."""
     results = analysis.calculate_effect_sizes()
@@ -162,6 +179,306 @@ def test_generate_summary_report(analysis):
     for section in expected_sections:
         assert section in report
 
+def test_concurrent_summary_report(study_db):
+    """Test that the concurrent report matches the sequential one."""
+    analysis = CreatineAnalysis(study_db)
+    sequential = analysis.generate_summary_report()
+    concurrent = analysis.generate_summary_report(concurrent=True, max_workers=3)
+    
+    assert set(concurrent) == set(sequential) | {'section_timings'}
+    timings = concurrent['section_timings']
+    for section in sequential:
+        assert timings[section] >= 0
+    assert timings['total'] >= max(timings[section] for section in sequential)
+    
+    pd.testing.assert_frame_equal(
+        concurrent['progression_rates']['individual_rates'],
+        sequential['progression_rates']['individual_rates']
+    )
+    pd.testing.assert_frame_equal(concurrent['age_effects'], sequential['age_effects'])
+
+def test_incremental_participant_cache(study_db):
+    """Test that only participants with new measurements are recomputed."""
+    cached = CreatineAnalysis(study_db, use_participant_cache=True)
+    uncached = CreatineAnalysis(study_db)
+    
+    assert cached.refresh_participant_cache() == 4
+    assert cached.refresh_participant_cache() == 0
+    
+    pid = int(study_db.get_participant_data()['participant_id'].iloc[0])
+    study_db.add_measurement({
+        'participant_id': pid,
+        'measurement_date': datetime(2024, 2, 12).date(),
+        'strength_1rm_kg': 130.0,
+        'lean_mass_kg': 68.0,
+        'muscle_thickness_mm': 36.5,
+        'creatine_kinase_level': 210.0,
+        'performance_score': 9.8,
+        'fatigue_level': 2
+    })
+    assert cached.refresh_participant_cache() == 1
+    
+    expected = uncached.analyze_progression_rates()
+    result = cached.analyze_progression_rates()
+    pd.testing.assert_frame_equal(result['individual_rates'], expected['individual_rates'],
+                                  check_dtype=False)
+    pd.testing.assert_frame_equal(result['summary_statistics'], expected['summary_statistics'])
+    
+    recovery = cached.analyze_fatigue_and_recovery()['recovery_patterns']
+    pd.testing.assert_frame_equal(
+        recovery, uncached.analyze_fatigue_and_recovery()['recovery_patterns'], check_dtype=False
+    )
+
+def test_recovery_per_day_and_distributions(study_db):
+    """Test time-normalized recovery, CK deltas and per-group distributions."""
+    results = CreatineAnalysis(study_db).analyze_fatigue_and_recovery()
+    
+    recovery_df = results['recovery_patterns']
+    assert len(recovery_df) == 4
+    # CK rises 10 per weekly visit for every participant
+    assert np.allclose(recovery_df['avg_ck_change'], 10.0)
+    assert np.allclose(recovery_df['ck_change_per_day'], 10.0 / 7)
+    assert np.allclose(recovery_df['fatigue_recovery_per_day'] * 7, recovery_df['avg_fatigue_recovery'])
+    
+    distributions = results['recovery_distributions']
+    assert set(distributions['group_assignment']) == {'creatine', 'placebo'}
+    ck = distributions[distributions['metric'] == 'avg_ck_change']
+    assert list(ck['count']) == [2, 2]
+
+def test_pushdown_matches_in_memory_analysis(study_db):
+    """Test that SQL push-down statistics reproduce the pandas results."""
+    in_memory = CreatineAnalysis(study_db)
+    pushdown = CreatineAnalysis(study_db, pushdown=True)
+    
+    expected = in_memory.calculate_effect_sizes()['effect_sizes']
+    result = pushdown.calculate_effect_sizes()['effect_sizes']
+    for metric in expected:
+        assert np.allclose(result[metric]['effect_size'], expected[metric]['effect_size'])
+    
+    expected = in_memory.analyze_progression_rates()['summary_statistics']
+    result = pushdown.analyze_progression_rates()['summary_statistics']
+    assert list(result.columns) == list(expected.columns)
+    assert np.allclose(result.iloc[:, 2:].astype(float), expected.iloc[:, 2:].astype(float),
+                       equal_nan=True)
+    
+    stratified = pushdown.calculate_stratified_effect_sizes(['training_status'])
+    assert set(stratified['training_status']) == {'trained', 'untrained'}
+    assert (stratified['n_creatine'] == 5).all()
+
+def test_profiled_summary_report(study_db):
+    """Test that profiling records nested section and query spans only when enabled."""
+    analysis = CreatineAnalysis(study_db)
+    profiler = study_db.profiler
+    analysis.generate_summary_report()
+    assert profiler.spans == []
+
+    profiler.enable()
+    try:
+        analysis.generate_summary_report(concurrent=True, max_workers=3)
+    finally:
+        profiler.disable()
+
+    spans = profiler.to_frame().set_index('name')
+    root = spans.loc['generate_summary_report']
+    assert root['depth'] == 0
+    assert root['peak_memory_bytes'] > 0
+    for method in ['get_snapshot', 'analyze_progression_rates', 'analyze_fatigue_and_recovery']:
+        assert spans.loc[method, 'parent_id'] == root['span_id']
+    assert spans.loc['query: progress_data', 'rows'] == 20
+    assert spans.loc['analyze_age_effects', 'rows'] == len(analysis.analyze_age_effects())
+    assert 'analyze_dosing_protocols' in profiler.format_summary()
+    assert any(line.startswith('generate_summary_report;get_snapshot;query: progress_data ')
+               for line in profiler.collapsed_stacks())
+
+def test_profiler_without_peak_reset(monkeypatch):
+    """Test that spans record time but no peak memory where tracemalloc.reset_peak is missing."""
+    monkeypatch.setattr(profiling, 'PEAK_RESET_SUPPORTED', False)
+    profiler = profiling.Profiler(enabled=True)
+    try:
+        assert not tracemalloc.is_tracing()
+        with profiler.span('outer'):
+            with profiler.span('inner'):
+                pass
+    finally:
+        profiler.disable()
+
+    spans = profiler.to_frame().set_index('name')
+    assert spans['peak_memory_bytes'].isna().all()
+    assert (spans['wall_time'] >= 0).all()
+
+def test_rolling_metrics(study_db):
+    """Test rolling means, slopes and deltas on the study-week axis."""
+    rolling = CreatineAnalysis(study_db).calculate_rolling_metrics(window_weeks=2)
+    
+    assert len(rolling) == 20
+    first = rolling[rolling['participant_id'] == rolling['participant_id'].min()]
+    # Strength rises 5 kg per weekly visit for the first participant
+    assert first['study_week'].tolist() == [0, 1, 2, 3, 4]
+    assert first['strength_1rm_kg_rolling_mean'].tolist() == [100.0, 102.5, 107.5, 112.5, 117.5]
+    assert np.isnan(first['strength_1rm_kg_rolling_slope'].iloc[0])
+    assert np.allclose(first['strength_1rm_kg_rolling_slope'].iloc[1:], 5.0)
+    assert first['strength_1rm_kg_delta'].isna().tolist() == [True, True, False, False, False]
+    assert np.allclose(first['strength_1rm_kg_delta'].iloc[2:], 10.0)
+
+def test_training_compliance_interval_join(study_db):
+    """Test joining measurements to active program assignments and compliance bands."""
+    participant_ids = study_db.get_participant_data()['participant_id'].tolist()
+    study_db.add_training_assignments([
+        {'participant_id': participant_ids[0], 'program_id': 1, 'start_date': '2024-01-01',
+         'end_date': '2024-01-15', 'compliance_percentage': 90.0},
+        {'participant_id': participant_ids[0], 'program_id': 2, 'start_date': '2024-01-22',
+         'end_date': None, 'compliance_percentage': 40.0},
+        {'participant_id': participant_ids[1], 'program_id': 1, 'start_date': '2024-01-01',
+         'end_date': '2024-01-29', 'compliance_percentage': 65.0},
+        {'participant_id': participant_ids[2], 'program_id': 1, 'start_date': '2024-01-08',
+         'end_date': '2024-01-29', 'compliance_percentage': 85.0},
+        {'participant_id': participant_ids[3], 'program_id': 1, 'start_date': '2024-01-01',
+         'end_date': '2024-01-08', 'compliance_percentage': 30.0},
+        {'participant_id': participant_ids[3], 'program_id': 3, 'start_date': '2024-01-29',
+         'end_date': None, 'compliance_percentage': 95.0}
+    ])
+    analysis = CreatineAnalysis(study_db)
+    
+    joined = analysis._join_active_training(study_db.get_progress_data(),
+                                            study_db.get_training_assignments())
+    assert len(joined) == 20
+    # Week 0 of the third participant precedes their program; the fourth has a gap
+    assert joined.groupby('participant_id')['assignment_id'].count().tolist() == [5, 5, 4, 3]
+    assert joined.loc[joined['participant_id'] == participant_ids[0], 'program_id'].tolist() == [1, 1, 1, 2, 2]
+    
+    results = analysis.analyze_training_compliance()
+    # The single-visit assignment of the fourth participant has no gain
+    assert len(results['assignment_gains']) == 5
+    bands = results['compliance_bands'].set_index(['group_assignment', 'compliance_band'])
+    assert np.isclose(bands.loc[('creatine', 'High (80%+)'), 'strength_gain_percentage'], 10.0)
+    assert np.isclose(bands.loc[('creatine', 'Low (<50%)'), 'strength_gain_percentage'], 5 / 115 * 100)
+    assert np.isclose(bands.loc[('placebo', 'High (80%+)'), 'strength_gain_percentage'], 9 / 103 * 100)
+    assert np.isclose(bands.loc[('placebo', 'Low (<50%)'), 'mass_gain_percentage'], 0.2 / 65 * 100)
+    assert bands['participant_count'].sum() == 5
+
+    # The report's training impact carries the same bands, also from a snapshot
+    report = analysis.generate_summary_report(concurrent=True)
+    pd.testing.assert_frame_equal(report['training_impact']['compliance_analysis'],
+                                  results['compliance_bands'])
+
+def test_mixed_progression_model(study_db):
+    """Test the group × time interaction and warm-started refits."""
+    analysis = CreatineAnalysis(study_db)
+    results = analysis.fit_mixed_progression_model(['strength_1rm_kg'])
+
+    interaction = results['group_time_interaction'].iloc[0]
+    # Creatine participants gain 3.75 kg/week on average, placebo 2.5 kg/week
+    assert interaction['term'] == 'creatine:time'
+    assert np.isclose(interaction['estimate'], 1.25, atol=1e-3)
+    # Age band and training status are collinear here, so one of them is dropped
+    terms = set(results['fixed_effects']['term'])
+    assert {'intercept', 'time', 'creatine', 'creatine:time'} <= terms
+    assert len(terms) == 5
+
+    refit = analysis.fit_mixed_progression_model(['strength_1rm_kg'])
+    assert refit['fit_statistics']['warm_started'].iloc[0]
+
+def test_mixed_model_matches_statsmodels(tmp_path):
+    """Test the sparse ECM fit against statsmodels MixedLM maximum likelihood."""
+    smf = pytest.importorskip('statsmodels.formula.api')
+    rng = np.random.default_rng(3)
+    participants, visits = 60, 6
+    pid = np.repeat(np.arange(participants), visits)
+    day = np.tile(np.arange(visits) * 7, participants) + rng.integers(0, 3, participants * visits)
+    creatine = (pid % 2 == 0)
+    untrained = rng.random(participants)[pid] < 0.5
+    weeks = day / 7
+    strength = (100 + rng.normal(0, 6, participants)[pid] + 2 * untrained
+                + (2 + rng.normal(0, 0.5, participants)[pid] + 1.5 * creatine) * weeks
+                + rng.normal(0, 2, participants * visits))
+    progress_data = pd.DataFrame({
+        'participant_id': pid,
+        'study_day': day,
+        'group_assignment': np.where(creatine, 'creatine', 'placebo'),
+        'training_status': np.where(untrained, 'untrained', 'trained'),
+        'age': 25,
+        'strength_1rm_kg': strength
+    })
+
+    db = CreatineDatabase(str(tmp_path / "unused_test.db"))
+    try:
+        results = CreatineAnalysis(db).fit_mixed_progression_model(
+            ['strength_1rm_kg'], snapshot={'progress_data': progress_data}
+        )
+    finally:
+        db.close()
+    fixed = results['fixed_effects'].set_index('term')
+
+    data = progress_data.assign(t=weeks, cr=creatine.astype(float), un=untrained.astype(float))
+    reference = smf.mixedlm('strength_1rm_kg ~ t + cr + cr:t + un', data, groups=data['participant_id'],
+                            re_formula='~t').fit(reml=False, method='lbfgs')
+    assert np.allclose(fixed['estimate'], reference.fe_params, rtol=1e-4)
+    assert np.allclose(fixed['std_error'], reference.bse_fe, rtol=1e-3)
+    assert np.isclose(results['fit_statistics']['log_likelihood'].iloc[0], reference.llf, atol=1e-4)
+
+def dose_response_visit(participant, week, rng):
+    """Strength and lean mass gains of 0.5 and 0.1 % a week plus an Emax curve of the cumulative dose."""
+    day = 7 * week
+    if participant['group_assignment'] == 'placebo':
+        dose = 0.0
+    elif participant['dosing_protocol'] == 'loading':
+        dose = 20 * min(day, 7) + 5 * max(day - 7, 0)
+    else:
+        dose = 3.0 * day
+    gain = 0.5 * week + 10 * dose / (80 + dose) + rng.normal(0, 0.3)
+    return {
+        'strength_1rm_kg': participant['baseline'] * (1 + gain / 100),
+        'lean_mass_kg': 50.0 * (1 + (0.1 * week + 2 * dose / (80 + dose)) / 100)
+    }
+
+def test_dose_response_recovers_emax_curve(make_study_db):
+    """Test cumulative doses per protocol and the batched Emax fit against scipy."""
+    optimize = pytest.importorskip('scipy.optimize')
+    rng = np.random.default_rng(9)
+    participants = [{
+        'group_assignment': ['creatine', 'creatine', 'placebo'][index % 3],
+        'dosing_protocol': 'loading' if index % 2 == 0 else 'maintenance',
+        'training_status': 'trained' if index < 18 else 'untrained',
+        'population_category': 'young trained' if index < 18 else 'young untrained',
+        'baseline': 80.0 + rng.normal(0, 5)
+    } for index in range(36)]
+    db = make_study_db(participants, weeks=8, visit=dose_response_visit, seed=9)
+
+    analysis = CreatineAnalysis(db)
+    results = analysis.analyze_dose_response(strata=[], n_bootstrap=300)
+    doses = results['cumulative_doses'].set_index('participant_id')
+    assert set(doses.loc[doses['group_assignment'] == 'placebo', 'cumulative_dose_g']) == {0}
+    loading = doses[(doses['group_assignment'] == 'creatine') & (doses['dosing_protocol'] == 'loading')]
+    assert (loading['cumulative_dose_g'] == 20 * 7 + 5 * 42).all()
+    maintenance = doses[(doses['group_assignment'] == 'creatine') & (doses['dosing_protocol'] == 'maintenance')]
+    assert (maintenance['cumulative_dose_g'] == 3 * 49).all()
+
+    strength = results['dose_response'].set_index('metric').loc['strength_1rm_kg']
+    assert strength['emax_ci_lower'] < 10 < strength['emax_ci_upper']
+    assert strength['ed50_g_ci_lower'] < 80 < strength['ed50_g_ci_upper']
+    assert not strength['ed50_at_bound']
+
+    # The grid estimate is within one grid step of the continuous least-squares fit
+    data = db.get_progress_data().merge(
+        doses[['dosing_protocol']].reset_index(), on='participant_id'
+    )
+    data['dose'] = analysis._cumulative_doses(data, db.get_dosing_phases())
+    data['gain'] = (data['strength_1rm_kg'] /
+                    data.groupby('participant_id')['strength_1rm_kg'].transform('first') - 1) * 100
+    data = data[data['study_day'] > 0]
+    params, _ = optimize.curve_fit(
+        lambda x, e0, slope, emax, ed50: e0 + slope * x[0] + emax * x[1] / (ed50 + x[1]),
+        np.vstack([data['study_day'] / 7, data['dose']]), data['gain'], p0=[0, 0.5, 5, 50]
+    )
+    assert np.isclose(strength['ed50_g'], params[3], rtol=0.08)
+    assert np.isclose(strength['emax'], params[2], rtol=0.05)
+
+    by_status = analysis.analyze_dose_response(n_bootstrap=50)['dose_response']
+    assert len(by_status) == 4
+    assert set(by_status['training_status']) == {'trained', 'untrained'}
+    with pytest.raises(ValueError):
+        analysis.analyze_dose_response(strata=['shoe_size'])
+
 def test_invalid_data_handling(test_db):
     """Test handling of invalid or missing data."""
     # Create analysis instance with empty database
@@ -0,0 +1,107 @@
+import pytest
+import pandas as pd
+import numpy as np
+from datetime import datetime, timedelta
+from pathlib import Path
+from src.database import CreatineDatabase
+from src.batch import BatchAnalysis
+
+@pytest.fixture
+def site_dir(tmp_path):
+    """Create two site databases with different creatine effects and one corrupt file."""
+    start = datetime(2024, 1, 1).date()
+    for site, creatine_step in (('site_a', 5.0), ('site_b', 4.0)):
+        db = CreatineDatabase(str(tmp_path / f'{site}.db'))
+        db.init_database()
+        for group, step in (('creatine', creatine_step), ('placebo', 2.0), ('placebo', 2.5)):
+            pid = db.add_participant({
+                'age': 26,
+                'gender': 'male',
+                'weight_kg': 78.0,
+                'height_cm': 178.0,
+                'training_experience_years': 2.0,
+                'training_status': 'trained',
+                'group_assignment': group,
+                'dosing_protocol': 'loading',
+                'population_category': 'young trained'
+            })
+            db.add_measurements([{
+                'participant_id': pid,
+                'measurement_date': start + timedelta(weeks=week),
+                'strength_1rm_kg': 100.0 + week * step,
+                'lean_mass_kg': 65.0 + week * step / 10,
+                'muscle_thickness_mm': 35.0 + week * 0.2,
+                'creatine_kinase_level': 150.0 + week * 10,
+                'performance_score': 8.5 + week * 0.2,
+                'fatigue_level': 3
+            } for week in range(4)])
+        db.close()
+    (tmp_path / 'site_c.db').write_text('not a database')
+    return tmp_path
+
+def test_resolve_database_paths(site_dir):
+    """Test glob expansion with duplicate and literal paths."""
+    paths = BatchAnalysis.resolve_database_paths(
+        [str(site_dir / 'site_*.db'), str(site_dir / 'site_a.db'), 'missing.db']
+    )
+    assert [Path(path).name for path in paths] == ['site_a.db', 'site_b.db', 'site_c.db', 'missing.db']
+
+def test_batch_run_isolates_failures(site_dir):
+    """Test per-site reports, failure isolation and the pooled meta-analysis."""
+    output_dir = site_dir / 'results'
+    batch = BatchAnalysis([str(site_dir / 'site_*.db'), str(site_dir / 'missing.db')], max_workers=2)
+    results = batch.run(str(output_dir))
+
+    sites = results['sites']
+    assert sites['site_a']['status'] == 'completed'
+    assert sites['site_b']['status'] == 'completed'
+    assert sites['site_c']['status'] == 'failed'
+    assert sites['missing']['status'] == 'failed'
+    assert Path(sites['site_a']['report_path']).exists()
+    assert len(list(output_dir.glob('meta_analysis_*.json'))) == 1
+
+    meta = results['meta_analysis'].set_index('metric')
+    site_effects = results['site_effect_sizes']
+    strength = site_effects[site_effects['metric'] == 'strength_1rm_kg']['effect_size']
+    assert meta.loc['strength_1rm_kg', 'sites'] == 2
+    assert strength.min() <= meta.loc['strength_1rm_kg', 'pooled_effect_size'] <= strength.max()
+    assert meta.loc['strength_1rm_kg', 'ci_lower'] < meta.loc['strength_1rm_kg', 'ci_upper']
+    site_a = site_effects[(site_effects['site'] == 'site_a') & (site_effects['metric'] == 'strength_1rm_kg')].iloc[0]
+    assert site_a['n_creatine'] == 4 and site_a['participants_creatine'] == 1
+    assert site_a['n_placebo'] == 8 and site_a['participants_placebo'] == 2
+
+def test_meta_analysis_of_identical_sites():
+    """Test that identical site estimates pool to themselves without heterogeneity."""
+    site_effects = pd.DataFrame({
+        'site': ['a', 'b', 'c'],
+        'metric': 'lean_mass_kg',
+        'n_creatine': 20,
+        'n_placebo': 20,
+        'participants_creatine': 20,
+        'participants_placebo': 20,
+        'effect_size': 0.5
+    })
+    meta = BatchAnalysis([]).meta_analyze(site_effects)
+    assert np.isclose(meta['pooled_effect_size'].iloc[0], 0.5)
+    assert meta['tau2'].iloc[0] == 0
+    assert meta['interpretation'].iloc[0] == 'Medium'
+
+def test_meta_analysis_weights_participants_not_visits():
+    """Test that a site with many visits per participant does not dominate the pooled estimate."""
+    site_effects = pd.DataFrame({
+        'site': ['weekly', 'single'],
+        'metric': 'strength_1rm_kg',
+        'n_creatine': [20 * 30, 20],
+        'n_placebo': [20 * 30, 20],
+        'participants_creatine': [20, 20],
+        'participants_placebo': [20, 20],
+        'effect_size': [0.2, 0.8]
+    })
+    meta = BatchAnalysis([]).meta_analyze(site_effects).iloc[0]
+    # Equal participant counts and similar d give the sites near-equal weight
+    assert abs(meta['fixed_effect_size'] - 0.5) < 0.05
+    assert abs(meta['pooled_effect_size'] - 0.5) < 0.05
+    assert meta['i2'] < 0.75
+
+if __name__ == '__main__':
+    pytest.main([__file__])
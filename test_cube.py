@@ -0,0 +1,96 @@
+import pytest
+import pandas as pd
+import numpy as np
+from src.analysis import CreatineAnalysis
+from src.cube import StudyCube, CUBE_QUERIES
+
+@pytest.fixture
+def cube_db(make_study_db):
+    """Create a database ingested in several batches, with a repeated visit date."""
+    participants = [
+        {'group_assignment': 'creatine', 'training_status': 'trained', 'age': 24,
+         'population_category': 'young trained', 'dosing_protocol': 'loading'},
+        {'group_assignment': 'creatine', 'training_status': 'untrained', 'age': 56,
+         'population_category': 'older untrained', 'dosing_protocol': 'maintenance'},
+        {'group_assignment': 'placebo', 'training_status': 'trained', 'age': 27,
+         'population_category': 'young trained', 'dosing_protocol': 'loading'},
+        {'group_assignment': 'placebo', 'training_status': 'untrained', 'age': 41,
+         'population_category': 'young untrained', 'dosing_protocol': 'maintenance'},
+        {'group_assignment': 'placebo', 'training_status': 'untrained', 'age': 60,
+         'population_category': 'older untrained', 'dosing_protocol': 'loading'}
+    ]
+    # A repeated measurement on an already recorded date, then single-row ingests
+    return make_study_db(participants, weeks=3, by_week=True, seed=11,
+                         noise={'strength_1rm_kg': 2, 'lean_mass_kg': 0.5, 'muscle_thickness_mm': 1,
+                                'creatine_kinase_level': 10},
+                         single_visits=((0, 2), (0, 3), (1, 3), (2, 3)))
+
+def test_cube_answers_named_queries(cube_db):
+    """Test that queries answered from the cube match the SQL named queries."""
+    cube = StudyCube(cube_db)
+    for query_name, spec in CUBE_QUERIES.items():
+        keys = spec['dimensions']
+        expected = cube_db.run_analysis_query(query_name).sort_values(keys).reset_index(drop=True)
+        actual = cube.run_query(query_name).sort_values(keys).reset_index(drop=True)
+        pd.testing.assert_frame_equal(actual[expected.columns], expected, check_dtype=False)
+    cube.close()
+
+def test_incremental_cube_matches_rebuild(cube_db):
+    """Test that the cells merged at ingest equal a rebuild from scratch."""
+    keys = ['group_assignment', 'training_status', 'population_category',
+            'dosing_protocol', 'age_group', 'measurement_date']
+    incremental = cube_db.get_cube_cells().sort_values(keys).reset_index(drop=True)
+    cube_db.rebuild_cube()
+    rebuilt = cube_db.get_cube_cells().sort_values(keys).reset_index(drop=True)
+    pd.testing.assert_frame_equal(incremental, rebuilt)
+    # Five participants were measured on the date with the repeated visit
+    assert incremental.groupby('measurement_date')['participant_count'].sum().max() == 5
+
+def test_cube_slices_and_refresh(cube_db):
+    """Test roll-ups, filters and reloading after participants change."""
+    cube = StudyCube(cube_db)
+    progress = cube_db.get_progress_data()
+    progress['age_group'] = pd.cut(progress['age'], [0, 29, 50, 200],
+                                   labels=['Young (18-29)', 'Middle (30-50)', 'Older (50+)'])
+
+    summary = cube.summarize(['group_assignment'], ['strength_1rm_kg']).set_index('group_assignment')
+    expected = progress.groupby('group_assignment')['strength_1rm_kg'].agg(['count', 'mean', 'std'])
+    assert np.allclose(summary['strength_1rm_kg_mean'], expected['mean'])
+    assert np.allclose(summary['strength_1rm_kg_std'], expected['std'])
+    assert (summary['strength_1rm_kg_count'] == expected['count']).all()
+    assert 'participant_count' not in summary.columns
+
+    # Filtering on an ungrouped dimension rolls up the matching cells only
+    older = cube.summarize([], ['lean_mass_kg'], filters={'age_group': 'Older (50+)'})
+    assert np.isclose(older['lean_mass_kg_mean'].iloc[0],
+                      progress.loc[progress['age_group'] == 'Older (50+)', 'lean_mass_kg'].mean())
+    assert cube.materialize() == 64
+
+    participant_id = int(progress['participant_id'].iloc[0])
+    cube_db.update_participant(participant_id, {'group_assignment': 'placebo'})
+    summary = cube.summarize(['group_assignment'], ['strength_1rm_kg'])
+    assert summary['group_assignment'].tolist() == ['creatine', 'placebo']
+    assert summary['strength_1rm_kg_count'].sum() == len(progress)
+    assert summary['strength_1rm_kg_count'].iloc[0] == (
+        (progress['group_assignment'] == 'creatine') & (progress['participant_id'] != participant_id)
+    ).sum()
+
+    with pytest.raises(ValueError):
+        cube.summarize(['participant_id'])
+    cube.close()
+
+def test_analysis_reads_named_queries_from_cube(cube_db):
+    """Test that the concurrent report with the cube matches the plain report."""
+    plain = CreatineAnalysis(cube_db).analyze_fatigue_and_recovery()['fatigue_analysis']
+    with_cube = CreatineAnalysis(cube_db, use_cube=True)
+    report = with_cube.generate_summary_report(concurrent=True)
+    fatigue = report['fatigue_recovery']['fatigue_analysis']
+    keys = ['group_assignment', 'measurement_date']
+    pd.testing.assert_frame_equal(
+        fatigue.sort_values(keys).reset_index(drop=True)[plain.columns],
+        plain.sort_values(keys).reset_index(drop=True),
+        check_dtype=False
+    )
+
+if __name__ == '__main__':
+    pytest.main([__file__])
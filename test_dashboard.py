@@ -0,0 +1,83 @@
+import pytest
+import pandas as pd
+from datetime import datetime
+
+pytest.importorskip('dash')
+from dash.exceptions import PreventUpdate
+from src.dashboard import CreatineDashboard
+
+@pytest.fixture
+def dashboard(make_study_db):
+    """Create a dashboard over one creatine and one placebo participant."""
+    db = make_study_db([{'group_assignment': 'creatine', 'age': 24},
+                        {'group_assignment': 'placebo', 'age': 61, 'training_status': 'untrained',
+                         'population_category': 'older untrained'}], weeks=3)
+    dashboard = CreatineDashboard(db)
+    yield dashboard
+    dashboard.data.close()
+    dashboard.cube.close()
+
+def test_one_callback_per_panel(dashboard):
+    """Test that each panel has its own callback fed by the metric and the selection store."""
+    callbacks = dashboard.app.callback_map
+    for output in ['age-comparison-chart.figure', 'training-impact-chart.figure', 'summary-stats.children']:
+        inputs = [(item['id'], item['property']) for item in callbacks[output]['inputs']]
+        assert inputs == [('metric-selector', 'value'), ('selection-store', 'data')]
+    inputs = [(item['id'], item['property']) for item in callbacks['progression-chart.figure']['inputs']]
+    assert inputs == [('metric-selector', 'value'), ('selection-store', 'data'),
+                      ('progression-chart', 'relayoutData')]
+    inputs = [item['id'] for item in callbacks['selection-store.data']['inputs']]
+    assert inputs == ['group-selector', 'refresh-interval']
+
+def test_selection_skips_unchanged_data(dashboard):
+    """Test that refreshes without new data prevent updates and panels draw the selected group."""
+    selection = dashboard.selection('creatine')
+    with pytest.raises(PreventUpdate):
+        dashboard.selection('creatine', selection)
+    assert dashboard.selection('placebo', selection)['version'] == selection['version']
+
+    participant_id = int(dashboard.data.progress('creatine')['participant_id'].iloc[0])
+    dashboard.db.add_measurement({
+        'participant_id': participant_id,
+        'measurement_date': datetime(2024, 1, 22).date(),
+        'strength_1rm_kg': 90.0,
+        'lean_mass_kg': 56.0,
+        'muscle_thickness_mm': 30.0,
+        'creatine_kinase_level': 140.0,
+        'performance_score': 7.0,
+        'fatigue_level': 3
+    })
+    assert dashboard.selection('creatine', selection)['version'] != selection['version']
+
+    figure = dashboard.progression_chart('strength_1rm_kg', 'creatine')
+    assert [trace.name for trace in figure.data] == ['creatine']
+    assert len(figure.data[0].y) == 4
+    assert dashboard.age_comparison_chart('lean_mass_kg', 'all').data
+    assert dashboard.training_impact_chart('lean_mass_kg', 'placebo').data
+    assert dashboard.summary_table('strength_1rm_kg', 'placebo') is not None
+
+def test_summary_stats_match_progress_data(dashboard):
+    """Test the cube moments and running-statistics extremes against the raw progress data."""
+    expected = dashboard.data.progress().groupby('group_assignment')['strength_1rm_kg'].agg(
+        ['mean', 'std', 'count', 'min', 'max']
+    ).round(2)
+    stats = dashboard.summary_stats('strength_1rm_kg', 'all')
+    pd.testing.assert_frame_equal(stats, expected, check_dtype=False, check_names=False)
+    assert dashboard.summary_stats('strength_1rm_kg', 'placebo').index.tolist() == ['placebo']
+
+def test_progression_chart_follows_viewport(dashboard):
+    """Test that relayout events become viewports and the chart is drawn with WebGL for them."""
+    assert dashboard.viewport({'autosize': True}) is None
+    assert dashboard.viewport({'xaxis.autorange': True, 'yaxis.autorange': True}) == {'x': None, 'y': None}
+    viewport = dashboard.viewport({'xaxis.range[0]': '2024-01-05', 'xaxis.range[1]': '2024-01-16',
+                                   'yaxis.range': [70, 100]})
+    assert viewport == {'x': ['2024-01-05', '2024-01-16'], 'y': [70, 100]}
+
+    figure = dashboard.progression_chart('strength_1rm_kg', 'all', viewport)
+    assert {trace.type for trace in figure.data} == {'scattergl'}
+    assert sorted(trace.name for trace in figure.data) == ['creatine', 'placebo']
+    assert list(figure.layout.xaxis.range) == viewport['x']
+    assert figure.layout.uirevision == 'strength_1rm_kg:all'
+
+if __name__ == '__main__':
+    pytest.main([__file__])
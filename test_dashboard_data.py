@@ -0,0 +1,112 @@
+import pytest
+import pandas as pd
+import numpy as np
+import sqlite3
+from datetime import datetime
+from src.dashboard_data import DashboardData
+
+@pytest.fixture
+def dashboard_db(make_study_db):
+    """Create a database of young and older creatine and placebo participants."""
+    participants = [{'group_assignment': group, 'age': age, 'population_category': category,
+                     'training_status': 'trained' if category == 'young trained' else 'untrained'}
+                    for group, age, category in [('creatine', 23, 'young trained'),
+                                                 ('creatine', 58, 'older untrained'),
+                                                 ('placebo', 35, 'young untrained'),
+                                                 ('placebo', 62, 'older untrained')]]
+    return make_study_db(participants, weeks=3, seed=13, noise={'strength_1rm_kg': 1})
+
+def test_group_views_match_filtered_progress_data(dashboard_db):
+    """Test that each group's view equals filtering the progress data, with age bands."""
+    data = DashboardData(dashboard_db)
+    try:
+        expected = dashboard_db.get_progress_data()
+        pd.testing.assert_frame_equal(data.progress().drop(columns=['age_group', 'measurement_time']), expected)
+        for group in ('creatine', 'placebo'):
+            pd.testing.assert_frame_equal(
+                data.progress(group).drop(columns=['age_group', 'measurement_time']),
+                expected[expected['group_assignment'] == group].reset_index(drop=True))
+        assert data.progress('creatine')['age_group'].tolist() == ['Young'] * 3 + ['Older'] * 3
+        assert data.progress('placebo')['age_group'].tolist() == ['Middle'] * 3 + ['Older'] * 3
+        assert data.progress('unknown').empty
+        assert list(data.progress('unknown').columns) == list(data.progress().columns)
+    finally:
+        data.close()
+
+def test_views_shared_until_database_changes(dashboard_db):
+    """Test that views are reused across calls and reloaded only after a write."""
+    data = DashboardData(dashboard_db)
+    try:
+        first = data.progress('creatine')
+        assert data.progress('creatine') is first
+        data.progress('placebo')
+        assert data.metrics()['misses'] == 1 and data.metrics()['hits'] == 2
+        assert data.metrics()['rows'] == 12
+
+        participant_id = int(first['participant_id'].iloc[0])
+        dashboard_db.add_measurement({
+            'participant_id': participant_id,
+            'measurement_date': datetime(2024, 1, 22).date(),
+            'strength_1rm_kg': 110.0,
+            'lean_mass_kg': 63.0,
+            'muscle_thickness_mm': 32.0,
+            'creatine_kinase_level': 145.0,
+            'performance_score': 7.5,
+            'fatigue_level': 3
+        })
+        refreshed = data.progress('creatine')
+        assert refreshed is not first and len(refreshed) == len(first) + 1
+        assert data.metrics()['misses'] == 2 and data.metrics()['rows'] == 13
+    finally:
+        data.close()
+
+def test_flagged_outliers_excluded_on_request(dashboard_db):
+    """Test that exclude_outliers leaves flagged measurements out of every view."""
+    conn = sqlite3.connect(dashboard_db.db_path)
+    with conn:
+        conn.execute("UPDATE measurements SET outlier_flags = 1 WHERE measurement_id = "
+                     "(SELECT MIN(measurement_id) FROM measurements)")
+    conn.close()
+    data = DashboardData(dashboard_db)
+    clean = DashboardData(dashboard_db, exclude_outliers=True)
+    try:
+        assert len(data.progress()) == 12
+        pd.testing.assert_frame_equal(clean.progress().drop(columns=['age_group', 'measurement_time']),
+                                      dashboard_db.get_progress_data(exclude_outliers=True))
+        assert len(clean.progress()) == 11
+        assert len(clean.progress('creatine')) + len(clean.progress('placebo')) == 11
+    finally:
+        data.close()
+        clean.close()
+
+def test_trajectories_downsampled_to_viewport(dashboard_db):
+    """Test NaN-separated group lines, viewport clipping and the stable participant subset."""
+    data = DashboardData(dashboard_db)
+    try:
+        full = data.trajectories('all', 'strength_1rm_kg')
+        assert full['envelope'] is None and full['participants'] == full['participants_drawn'] == 4
+        x, y = full['lines']['creatine']
+        assert len(y) == 7 and np.isnan(y[3]) and x[3] == x[2]
+        expected = data.progress('creatine')['strength_1rm_kg'].to_numpy()
+        np.testing.assert_array_equal(np.delete(y, 3), expected)
+
+        # Between two visits the crossing segments are kept, with one point on each side
+        zoomed = data.trajectories('all', 'strength_1rm_kg', x_range=['2024-01-03', '2024-01-05'])
+        assert zoomed['participants'] == 4 and zoomed['points'] == 8
+        assert len(data.trajectories('placebo', 'strength_1rm_kg', x_range=['2024-01-03', '2024-01-05'],
+                                     y_range=[0, 10])['lines']) == 0
+
+        sampled = data.trajectories('all', 'strength_1rm_kg', max_points=6)
+        assert sampled['participants_drawn'] < 4 and sampled['points'] <= 9
+        envelope = sampled['envelope']
+        progress = data.progress()
+        for group, band in envelope.groupby('group_assignment'):
+            values = progress.loc[progress['group_assignment'] == group, 'strength_1rm_kg']
+            assert band['y_min'].min() == values.min() and band['y_max'].max() == values.max()
+        assert data.trajectories('all', 'strength_1rm_kg', max_points=6)['points'] == sampled['points']
+        assert data.trajectories('all', 'strength_1rm_kg', max_points=9)['points'] >= sampled['points']
+    finally:
+        data.close()
+
+if __name__ == '__main__':
+    pytest.main([__file__])
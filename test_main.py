@@ -0,0 +1,64 @@
+import pytest
+import subprocess
+import sys
+import os
+import shutil
+
+HEAVY_MODULES = ['matplotlib', 'seaborn', 'sklearn', 'scipy', 'dash', 'plotly']
+
+def test_database_commands_skip_heavy_imports(tmp_path):
+    """Test that starting the CLI for database commands imports none of the heavy subsystems."""
+    script = (
+        "import sys\n"
+        "from src.main import CreatineStudy\n"
+        "study = CreatineStudy()\n"
+        "study.cleanup()\n"
+        f"print(sorted({{name.split('.')[0] for name in sys.modules}} & {set(HEAVY_MODULES)!r}))\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', script], cwd=tmp_path, capture_output=True, text=True,
+                            env={**os.environ, 'PYTHONPATH': root})
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == '[]'
+
+def test_subsystems_built_on_first_use(tmp_path, monkeypatch):
+    """Test that the analysis is built lazily, once, and honours outlier screening."""
+    monkeypatch.chdir(tmp_path)
+    from src.main import CreatineStudy
+    study = CreatineStudy(use_cache=False)
+    try:
+        assert 'analysis' not in vars(study)
+        study.exclude_outliers = True
+        assert study.analysis is study.analysis
+        assert study.analysis.exclude_outliers and study.analysis.result_cache is None
+        assert study.visualization.exclude_outliers
+    finally:
+        study.cleanup()
+
+def test_profiled_analysis_recomputes_cached_report(tmp_path, monkeypatch):
+    """Test that a profiled run on a warm result cache still records the analysis spans."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    (tmp_path / 'database').mkdir()
+    for name in ('schema.sql', 'queries.sql'):
+        shutil.copy(os.path.join(root, 'database', name), tmp_path / 'database' / name)
+    monkeypatch.chdir(tmp_path)
+    from src.main import CreatineStudy
+    study = CreatineStudy()
+    try:
+        study.initialize_database()
+        study.add_sample_data()
+        study.run_analysis(str(tmp_path / 'results'))
+        hits = study.result_cache.hits
+        study.run_analysis(str(tmp_path / 'results'))
+        assert study.result_cache.hits == hits + 1
+
+        report = study.run_analysis(str(tmp_path / 'results'), profile=True)
+        names = {span['name'] for span in report['profile']['spans']}
+        assert {'generate_summary_report', 'calculate_effect_sizes'} <= names
+        assert study.result_cache.hits == hits + 1
+        assert study.analysis.result_cache is study.result_cache
+    finally:
+        study.cleanup()
+
+if __name__ == '__main__':
+    pytest.main([__file__])
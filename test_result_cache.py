@@ -0,0 +1,101 @@
+import pytest
+import pandas as pd
+import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from src.analysis import CreatineAnalysis
+
+pytest.importorskip('pyarrow')
+from src.result_cache import ResultCache
+
+@pytest.fixture
+def cache_db(make_study_db):
+    """Create a small database of creatine and placebo participants."""
+    participants = [{'group_assignment': 'creatine' if index % 2 == 0 else 'placebo', 'age': 22 + index}
+                    for index in range(6)]
+    return make_study_db(participants, seed=5, noise={'strength_1rm_kg': 1, 'creatine_kinase_level': 5})
+
+def _store(cache_dir, key):
+    """Store a frame under key from a separate process."""
+    return ResultCache(cache_dir).put(key, {'frame': pd.DataFrame({'x': np.arange(1000)})})
+
+def test_round_trip_and_unsupported_results(tmp_path):
+    """Test that nested results come back equal and unsupported ones are skipped."""
+    cache = ResultCache(str(tmp_path))
+    result = {
+        'effects': pd.DataFrame({'group': ['creatine', 'placebo'], 'd': [0.8, np.nan]}),
+        'rates': pd.Series([1.5, 2.5], index=['a', 'b'], name='rate'),
+        'meta': {'n': np.int64(12), 'weeks': (1, 2), 'date': datetime(2024, 1, 1).date(), 'note': None}
+    }
+    assert cache.put('key', result)
+    found, loaded = cache.get('key')
+    assert found and cache.hits == 1
+    pd.testing.assert_frame_equal(loaded['effects'], result['effects'])
+    pd.testing.assert_series_equal(loaded['rates'], result['rates'])
+    assert loaded['meta'] == {'n': 12, 'weeks': (1, 2), 'date': result['meta']['date'], 'note': None}
+
+    assert not cache.put('other', {('tuple', 'key'): 1})
+    assert cache.get('other') == (False, None)
+    assert cache.misses == 1
+
+def test_failed_write_is_not_a_lost_race(tmp_path):
+    """Test that a write failing for any reason other than an existing entry reports False."""
+    cache = ResultCache(str(tmp_path / 'gone'))
+    os.rmdir(tmp_path / 'gone')
+    assert not cache.put('key', {'n': 1})
+    assert not (tmp_path / 'gone').exists()
+
+def test_lru_eviction_and_concurrent_writers(tmp_path):
+    """Test that least recently read entries go first and racing writers leave one entry."""
+    frame = pd.DataFrame({'x': np.arange(1000, dtype=float)})
+    size = ResultCache(str(tmp_path / 'probe')).put('probe', frame) and \
+        sum(f.stat().st_size for f in (tmp_path / 'probe' / 'probe').iterdir())
+
+    cache = ResultCache(str(tmp_path / 'lru'), max_bytes=int(size * 2.5))
+    cache.put('a', frame)
+    cache.put('b', frame)
+    os.utime(tmp_path / 'lru' / 'a' / 'manifest.json', (0, 0))
+    os.utime(tmp_path / 'lru' / 'b' / 'manifest.json', (1, 1))
+    assert cache.get('a')[0]  # Reading a makes b the least recently used
+    cache.put('c', frame)
+    assert sorted(cache.entries()['key']) == ['a', 'c']
+
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        stored = list(executor.map(_store, [str(tmp_path / 'shared')] * 8, ['same'] * 8))
+    assert all(stored)
+    shared = ResultCache(str(tmp_path / 'shared'))
+    assert shared.entries()['key'].tolist() == ['same']
+    assert len(shared.get('same')[1]['frame']) == 1000
+    assert not [name for name in os.listdir(tmp_path / 'shared') if name.startswith('.')]
+
+def test_analysis_results_shared_until_data_changes(cache_db, tmp_path):
+    """Test that a second analysis reuses results until a write bumps the content version."""
+    first = CreatineAnalysis(cache_db, result_cache=ResultCache(str(tmp_path / 'cache')))
+    report = first.generate_summary_report()
+
+    second_cache = ResultCache(str(tmp_path / 'cache'))
+    second = CreatineAnalysis(cache_db, result_cache=second_cache)
+    cached = second.generate_summary_report()
+    assert second_cache.hits == 1
+    pd.testing.assert_frame_equal(cached['effect_sizes']['effect_sizes']['strength_1rm_kg'],
+                                  report['effect_sizes']['effect_sizes']['strength_1rm_kg'])
+    pd.testing.assert_frame_equal(cached['age_effects'], report['age_effects'])
+
+    # Arguments and settings are part of the key
+    second.calculate_rolling_metrics(window_weeks=2)
+    assert second_cache.hits == 1
+    second.pushdown = True
+    second.calculate_effect_sizes()
+    assert second_cache.hits == 1
+
+    version = cache_db.get_content_version()
+    participant_id = int(cache_db.get_participant_data()['participant_id'].iloc[0])
+    cache_db.update_participant(participant_id, {'group_assignment': 'placebo'})
+    assert cache_db.get_content_version() != version
+    effects = second.calculate_effect_sizes()['effect_sizes']['strength_1rm_kg']
+    assert second_cache.hits == 1
+    assert effects['n_creatine'].iloc[0] == 8
+
+if __name__ == '__main__':
+    pytest.main([__file__])
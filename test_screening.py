@@ -0,0 +1,81 @@
+import pytest
+import pandas as pd
+import numpy as np
+from src.analysis import CreatineAnalysis
+from src.screening import OutlierScreening, OUTLIER_CHECKS, robust_z_scores
+
+def screening_visit(participant, week, rng):
+    """Kinase rising by 5 a week and a constant fatigue level."""
+    return {'creatine_kinase_level': 150.0 + week * 5, 'fatigue_level': 3}
+
+@pytest.fixture
+def screening_db(make_study_db):
+    """Create a database of steadily progressing participants with two entry errors."""
+    participants = [{'group_assignment': 'creatine' if index % 2 == 0 else 'placebo', 'baseline': 100.0 + index}
+                    for index in range(12)]
+    return make_study_db(participants, weeks=6, visit=screening_visit, seed=7,
+                         noise={'strength_1rm_kg': 0.5, 'lean_mass_kg': 0.1, 'creatine_kinase_level': 3,
+                                'performance_score': 0.05},
+                         errors={(0, 3): {'strength_1rm_kg': lambda strength: strength * 10},  # Misplaced decimal point
+                                 (1, 5): {'creatine_kinase_level': 15000.0}})  # Wrong unit on a last visit
+
+def test_robust_z_scores():
+    """Test modified z-scores, the tied-values fallback and minimum group sizes."""
+    values = pd.DataFrame({'x': [1.0, 2.0, 3.0, 4.0, 100.0, 5.0, 5.0, 5.0, 6.0, 7.0]})
+    keys = np.repeat([0, 1], 5)
+    z = robust_z_scores(values, keys)['x']
+    assert np.isclose(z.iloc[4], 0.6745 * 97 / 1)
+    assert np.isclose(z.iloc[2], 0)
+    # More than half the second group ties at the median, so its MAD is zero
+    assert np.isclose(z.iloc[9], 2 / (1.253314 * 0.6))
+    assert robust_z_scores(values, keys, min_count=6)['x'].isnull().all()
+
+def test_screen_flags_entry_errors(screening_db):
+    """Test that entry errors are flagged without flagging the visits around them."""
+    screened = OutlierScreening(screening_db).screen()
+    measurements = screening_db.get_measurements().sort_values('measurement_id')
+    flags = screened.set_index('measurement_id')['outlier_flags'].reindex(measurements['measurement_id'])
+
+    errors = measurements['strength_1rm_kg'].gt(500) | measurements['creatine_kinase_level'].gt(1000)
+    assert (flags[errors.values] & OUTLIER_CHECKS['trajectory']).all()
+    assert (flags[errors.values] & OUTLIER_CHECKS['group_week']).all()
+
+    strength_error = measurements.loc[measurements['strength_1rm_kg'].gt(500), 'measurement_id'].iloc[0]
+    assert flags[strength_error] & OUTLIER_CHECKS['jump']
+    # Neighbouring visits of either error are not blamed for the jump
+    neighbours = [strength_error - 1, strength_error + 1,
+                  measurements.loc[measurements['creatine_kinase_level'].gt(1000), 'measurement_id'].iloc[0] - 1]
+    assert not (flags[neighbours] & OUTLIER_CHECKS['jump']).any()
+    assert flags.gt(0).sum() <= 4
+
+def test_run_stores_flags_for_analysis(screening_db):
+    """Test that stored flags are replaced on rerun and filter the analyses."""
+    screening = OutlierScreening(screening_db)
+    results = screening.run()
+    flagged = screening_db.get_outliers()
+    assert len(flagged) == int((results['screened']['outlier_flags'] > 0).sum())
+    assert set(results['summary']['check']) == set(OUTLIER_CHECKS)
+
+    clean = screening_db.get_progress_data(exclude_outliers=True)
+    assert len(clean) == len(screening_db.get_progress_data()) - len(flagged)
+    assert clean['strength_1rm_kg'].max() < 500
+
+    analysis = CreatineAnalysis(screening_db, exclude_outliers=True)
+    pushdown = CreatineAnalysis(screening_db, pushdown=True, exclude_outliers=True)
+    effects = analysis.calculate_effect_sizes()['effect_sizes']['strength_1rm_kg']
+    pushdown_effects = pushdown.calculate_effect_sizes()['effect_sizes']['strength_1rm_kg']
+    assert np.isclose(effects['effect_size'].iloc[0], pushdown_effects['effect_size'].iloc[0])
+    assert effects['n_creatine'].iloc[0] + effects['n_placebo'].iloc[0] == len(clean)
+
+    report = analysis.generate_summary_report(concurrent=True)
+    assert report['effect_sizes']['effect_sizes']['strength_1rm_kg'].equals(effects)
+
+    # Rerunning replaces the stored flags
+    OutlierScreening(screening_db, threshold=1e6).run()
+    assert screening_db.get_outliers().empty
+
+    with pytest.raises(ValueError):
+        CreatineAnalysis(screening_db, use_participant_cache=True, exclude_outliers=True)
+
+if __name__ == '__main__':
+    pytest.main([__file__])
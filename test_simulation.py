@@ -0,0 +1,111 @@
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+import os
+from src.database import CreatineDatabase
+from src.simulation import PowerSimulation
+
+@pytest.fixture
+def test_db():
+    """Create a temporary test database with varied creatine and placebo arms."""
+    db_path = "test_simulation.db"
+    db = CreatineDatabase(db_path)
+    db.init_database()
+
+    start = datetime(2024, 1, 1).date()
+    for i in range(12):
+        group = 'creatine' if i % 2 == 0 else 'placebo'
+        strength_step = (5.0 if group == 'creatine' else 2.0) + (i % 3) * 0.5
+        pid = db.add_participant({
+            'age': 25 + i,
+            'gender': 'male',
+            'weight_kg': 78.0,
+            'height_cm': 178.0,
+            'training_experience_years': 2.0,
+            'training_status': 'trained',
+            'group_assignment': group,
+            'dosing_protocol': 'loading',
+            'population_category': 'young trained'
+        })
+        for week in range(6):
+            db.add_measurement({
+                'participant_id': pid,
+                'measurement_date': start + timedelta(weeks=week),
+                'strength_1rm_kg': 95.0 + i + week * strength_step + (week % 2) * 0.5,
+                'lean_mass_kg': 64.0 + i * 0.2 + week * 0.3 + (week % 2) * 0.1,
+                'muscle_thickness_mm': 35.0 + week * 0.2,
+                'creatine_kinase_level': 150.0 + week * 10,
+                'performance_score': 8.5 + week * 0.2,
+                'fatigue_level': 3
+            })
+
+    yield db
+    db.close()
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+@pytest.fixture
+def simulation(test_db):
+    """Create simulation instance with test database."""
+    return PowerSimulation(test_db, seed=7)
+
+def test_load_parameters(simulation):
+    """Test that generating parameters reflect the observed arms."""
+    parameters = simulation.load_parameters(['strength_1rm_kg'])
+    creatine = parameters['strength_1rm_kg']['creatine']
+    placebo = parameters['strength_1rm_kg']['placebo']
+
+    assert len(creatine['schedule']) == 6
+    assert np.isclose(creatine['schedule'][-1], 35.0)
+    assert creatine['slope_mean'] > placebo['slope_mean'] > 0
+    assert creatine['resid_std'] > 0
+
+def test_simulate_power(simulation):
+    """Test the power table shape and that power grows with sample size."""
+    power_table = simulation.simulate_power([2, 20], metrics=['strength_1rm_kg'],
+                                            replicates=500, max_workers=1)
+
+    assert set(power_table['estimator']) == {'effect_size', 'progression_rate'}
+    assert power_table['power'].between(0, 1).all()
+    rates = power_table[power_table['estimator'] == 'progression_rate']
+    assert rates['power'].is_monotonic_increasing
+    assert rates['power'].iloc[-1] > 0.9
+
+    minimum = simulation.minimum_sample_size(power_table)
+    assert len(minimum) == 2
+
+def test_simulation_is_reproducible(simulation):
+    """Test that a fixed seed reproduces results across worker processes."""
+    parameters = simulation.load_parameters(['lean_mass_kg'])
+    serial = simulation.simulate_power([5, 10], replicates=200, max_workers=1,
+                                       parameters=parameters)
+    parallel = simulation.simulate_power([5, 10], replicates=200, max_workers=2,
+                                         parameters=parameters)
+    assert serial.equals(parallel)
+
+def test_arms_follow_their_own_schedules():
+    """Test per-arm schedules and a nominal false positive rate under clustered visits."""
+    def arm(intercept_mean, slope_mean, follow_up, visits):
+        return {'intercept_mean': intercept_mean, 'intercept_std': 10.0, 'slope_mean': slope_mean,
+                'slope_std': 0.01, 'resid_std': 1.0, 'schedule': np.linspace(0.0, follow_up, visits)}
+
+    simulation = PowerSimulation(None, seed=3)
+    # Both arms average 100 over their own schedules: placebo's intercept is
+    # calibrated for its 12-week follow-up (mean day 42)
+    parameters = {'strength_1rm_kg': {'creatine': arm(100.0, 0.0, 28.0, 5),
+                                      'placebo': arm(100.0 - 0.5 * 42, 0.5, 84.0, 13)}}
+    power_table = simulation.simulate_power([20], replicates=2000, max_workers=1,
+                                            parameters=parameters).set_index('estimator')
+    assert abs(power_table.loc['effect_size', 'mean_estimate']) < 0.05
+    assert power_table.loc['effect_size', 'power'] < 0.1
+    assert abs(power_table.loc['progression_rate', 'mean_estimate'] + 0.5) < 0.005
+
+    # Identical arms with large between-participant spread and many visits
+    parameters = {'strength_1rm_kg': {'creatine': arm(100.0, 0.0, 84.0, 13),
+                                      'placebo': arm(100.0, 0.0, 84.0, 13)}}
+    power_table = simulation.simulate_power([20], replicates=2000, max_workers=1,
+                                            parameters=parameters).set_index('estimator')
+    assert power_table.loc['effect_size', 'power'] < 0.1
+
+if __name__ == '__main__':
+    pytest.main([__file__])
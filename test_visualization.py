@@ -1,11 +1,13 @@
 import pytest
 import matplotlib.pyplot as plt
 import pandas as pd
+import numpy as np
 import os
+import re
 from pathlib import Path
 from datetime import datetime, timedelta
 from src.database import CreatineDatabase
-from src.visualization import CreatineVisualization
+from src.visualization import CreatineVisualization, SUMMARY_PLOTS, PLOT_MANIFEST
 
 @pytest.fixture
 def test_db():
@@ -173,6 +175,217 @@ def test_generate_summary_plots(visualization, test_output_dir):
     for filename in expected_files:
         assert os.path.exists(test_output_dir / filename)
 
+def test_parallel_summary_plots(tmp_path):
+    """Test parallel rendering, timings and skipping plots whose inputs are unchanged."""
+    db_path = str(tmp_path / "plots.db")
+    db = CreatineDatabase(db_path)
+    db.init_database()
+    start = datetime(2024, 1, 1).date()
+    for index, (group, age, category) in enumerate([('creatine', 24, 'young trained'),
+                                                    ('placebo', 26, 'young trained'),
+                                                    ('creatine', 58, 'older untrained'),
+                                                    ('placebo', 61, 'older untrained')]):
+        pid = db.add_participant({
+            'age': age,
+            'gender': 'male',
+            'weight_kg': 80.0,
+            'height_cm': 178.0,
+            'training_experience_years': 1.0,
+            'training_status': 'trained' if age < 30 else 'untrained',
+            'group_assignment': group,
+            'dosing_protocol': 'loading',
+            'population_category': category
+        })
+        db.add_measurements([{
+            'participant_id': pid,
+            'measurement_date': start + timedelta(weeks=week),
+            'strength_1rm_kg': 100.0 + week * (3 + index),
+            'lean_mass_kg': 65.0 + week * 0.2,
+            'muscle_thickness_mm': 35.0,
+            'creatine_kinase_level': 150.0,
+            'performance_score': 8.0 + week * 0.1,
+            'fatigue_level': 3
+        } for week in range(4)])
+
+    try:
+        visualization = CreatineVisualization(db)
+        result = visualization.generate_summary_plots(str(tmp_path / 'parallel'), max_workers=2)
+        serial = visualization.generate_summary_plots(str(tmp_path / 'serial'), max_workers=1)
+        for filename in SUMMARY_PLOTS:
+            assert (tmp_path / 'parallel' / filename).stat().st_size > 0
+            assert (tmp_path / 'serial' / filename).exists()
+            assert result['timings'][filename] > 0 and serial['timings'][filename] > 0
+        assert result['timings']['total'] >= result['timings']['data']
+        assert sorted(os.listdir(tmp_path / 'parallel')) == sorted(list(SUMMARY_PLOTS) + [PLOT_MANIFEST])
+
+        # Unchanged inputs are skipped, a mid-study measurement redraws the progress plots only
+        output_dir = str(tmp_path / 'serial')
+        rerun = visualization.generate_summary_plots(output_dir, max_workers=1)
+        assert rerun['rendered'] == [] and sorted(rerun['skipped']) == sorted(SUMMARY_PLOTS)
+        (tmp_path / 'serial' / 'effect_sizes.png').unlink()
+        assert visualization.generate_summary_plots(output_dir, max_workers=1)['rendered'] == ['effect_sizes.png']
+
+        db.add_measurement({
+            'participant_id': pid,
+            'measurement_date': start + timedelta(weeks=2),
+            'strength_1rm_kg': 140.0,
+            'lean_mass_kg': 66.0,
+            'muscle_thickness_mm': 35.0,
+            'creatine_kinase_level': 150.0,
+            'performance_score': 8.5,
+            'fatigue_level': 3
+        })
+        changed = visualization.generate_summary_plots(output_dir, max_workers=1)
+        progress_plots = [filename for filename, (_, source) in SUMMARY_PLOTS.items()
+                          if source == 'progress_data']
+        assert sorted(changed['rendered']) == sorted(progress_plots)
+        assert changed['skipped'] == ['training_compliance.png']
+        forced = visualization.generate_summary_plots(output_dir, max_workers=1, force=True)
+        assert sorted(forced['rendered']) == sorted(SUMMARY_PLOTS)
+
+        # Another profile's format is written alongside, keeping the PNG entries
+        pdfs = visualization.generate_summary_plots(output_dir, max_workers=1, profile='publication')
+        assert sorted(pdfs['rendered']) == sorted(str(Path(f).with_suffix('.pdf')) for f in SUMMARY_PLOTS)
+        assert visualization.generate_summary_plots(output_dir, max_workers=1)['rendered'] == []
+    finally:
+        db.close()
+
+def test_progression_plots_from_aggregates():
+    """Test the grouped means and t intervals and the batched trajectory overlay."""
+    from matplotlib.collections import LineCollection
+    rng = np.random.default_rng(4)
+    participants, visits = 40, 5
+    data = pd.DataFrame({
+        'participant_id': np.repeat(np.arange(participants), visits),
+        'group_assignment': np.repeat(np.where(np.arange(participants) % 2, 'placebo', 'creatine'), visits),
+        'age': np.repeat(np.where(np.arange(participants) < 20, 24, 60), visits),
+        'measurement_date': np.tile([f'2024-01-{day:02d}' for day in (1, 8, 15, 22, 29)], participants),
+        'strength_1rm_kg': rng.normal(100, 10, participants * visits),
+        'lean_mass_kg': rng.normal(60, 3, participants * visits)
+    })
+    visualization = CreatineVisualization(None)
+
+    summary = visualization.progression_summary(data, 'strength_1rm_kg')
+    assert len(summary) == 4 * visits
+    cell = data[(data['group_assignment'] == 'creatine') & (data['age'] < 30)
+                & (data['measurement_date'] == '2024-01-08')]['strength_1rm_kg']
+    row = summary[(summary['group_assignment'] == 'creatine') & (summary['age_band'] == 'Young')].iloc[1]
+    half_width = 2.262157 * cell.std() / np.sqrt(len(cell))  # t(0.975, 9)
+    assert row['count'] == len(cell) and np.isclose(row['mean'], cell.mean())
+    assert np.isclose(row['ci_upper'] - row['mean'], half_width, rtol=1e-5)
+
+    fig = visualization.plot_strength_progression(data=data)
+    ax = fig.axes[0]
+    assert len(ax.lines) == 4
+    assert not [c for c in ax.collections if isinstance(c, LineCollection)]
+    plt.close(fig)
+
+    fig = visualization.plot_mass_changes(data=data, show_individuals=True)
+    trajectories = [c for c in fig.axes[0].collections if isinstance(c, LineCollection)]
+    assert len(trajectories) == 1 and len(trajectories[0].get_segments()) == participants
+    assert len(fig.axes[0].lines) == 4
+    plt.close(fig)
+
+def test_participant_panels(tmp_path):
+    """Test that panels are paged into a multi-page PDF or PNG tiles, one collection per page."""
+    rng = np.random.default_rng(6)
+    participants, visits = 30, 4
+    data = pd.DataFrame({
+        'participant_id': np.repeat(np.arange(participants)[::-1], visits),
+        'group_assignment': np.repeat(np.where(np.arange(participants) % 2, 'placebo', 'creatine'), visits),
+        'age': np.repeat(np.where(np.arange(participants) < 15, 24, 60), visits),
+        'study_day': np.tile([0, 7, 14, 21], participants),
+        'strength_1rm_kg': rng.normal(100, 10, participants * visits)
+    })
+    visualization = CreatineVisualization(None)
+
+    result = visualization.plot_participant_panels(str(tmp_path / 'panels.pdf'), data=data, rows=2, cols=4)
+    assert result['pages'] == 4 and result['participants'] == participants
+    with open(tmp_path / 'panels.pdf', 'rb') as f:
+        assert len(re.findall(rb'/Type\s*/Page\b', f.read())) == 4
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+    result = visualization.plot_participant_panels(str(tmp_path / 'tiles'), data=data, rows=2, cols=4, dpi=50)
+    assert sorted(os.listdir(tmp_path / 'tiles')) == [f'page_{n:04d}.png' for n in range(1, 5)]
+
+    page = data[data['participant_id'] < 8].sort_values(['participant_id', 'study_day'])
+    fig = visualization._draw_panel_page(page, list(range(8)), 'strength_1rm_kg',
+                                         {'day_min': 0, 'day_max': 21, 'value_min': 70, 'value_max': 130}, 2, 4)
+    ax = fig.axes[0]
+    trajectories, frames = [c for c in ax.collections if type(c).__name__ == 'LineCollection'][::-1]
+    assert len(trajectories.get_segments()) == 8 and len(frames.get_segments()) == 8
+    # Participant 5 sits in the second row, second column
+    segment = trajectories.get_segments()[5]
+    assert (segment[:, 0] > 1).all() and (segment[:, 0] < 2).all() and (segment[:, 1] < 1).all()
+
+def test_render_profiles(tmp_path):
+    """Test that render profiles set the output format, resolution and font embedding."""
+    from PIL import Image
+    rng = np.random.default_rng(9)
+    data = pd.DataFrame({
+        'participant_id': np.repeat(np.arange(8), 3),
+        'group_assignment': np.repeat(np.where(np.arange(8) % 2, 'placebo', 'creatine'), 3),
+        'age': np.repeat(np.where(np.arange(8) < 4, 24, 60), 3),
+        'measurement_date': np.tile(['2024-01-01', '2024-01-08', '2024-01-15'], 8),
+        'strength_1rm_kg': rng.normal(100, 10, 24),
+        'lean_mass_kg': rng.normal(60, 3, 24)
+    })
+
+    draft = CreatineVisualization(None, profile='draft')
+    assert draft.output_name('mass_changes.png') == 'mass_changes.png'
+    draft.plot_mass_changes(str(tmp_path / 'draft.png'), data=data)
+    # 72 dpi and no tight bounding box: exactly the 12 x 6 inch figure
+    with Image.open(tmp_path / 'draft.png') as image:
+        assert image.size == (864, 432)
+
+    publication = CreatineVisualization(None, profile='publication')
+    assert publication.output_name('mass_changes.png') == 'mass_changes.pdf'
+    publication.plot_mass_changes(str(tmp_path / 'publication.pdf'), data=data)
+    assert b'/FontFile2' in (tmp_path / 'publication.pdf').read_bytes()
+    assert CreatineVisualization(None, profile='publication', format='svg').output_name('a.png') == 'a.svg'
+
+    web = CreatineVisualization(None, profile='web')
+    web.plot_mass_changes(str(tmp_path / web.output_name('web.png')), data=data)
+    with Image.open(tmp_path / 'web.webp') as image:
+        assert image.format == 'WEBP'
+
+    # Profiles are part of the plot hash, so switching profile re-renders
+    hashes = {CreatineVisualization(None, profile=name).plot_hash('plot_mass_changes', data)
+              for name in ('draft', 'standard', 'publication', 'web')}
+    assert len(hashes) == 4
+    with pytest.raises(ValueError):
+        CreatineVisualization(None, profile='poster')
+
+def test_concurrent_rendering_to_bytes():
+    """Test that threads render identical bytes without changing global rcParams."""
+    import matplotlib
+    from concurrent.futures import ThreadPoolExecutor
+    rng = np.random.default_rng(8)
+    data = pd.DataFrame({
+        'participant_id': np.repeat(np.arange(12), 3),
+        'group_assignment': np.repeat(np.where(np.arange(12) % 2, 'placebo', 'creatine'), 3),
+        'age': np.repeat(np.where(np.arange(12) < 6, 25, 55), 3),
+        'measurement_date': np.tile(['2024-01-01', '2024-01-08', '2024-01-15'], 12),
+        'strength_1rm_kg': rng.normal(100, 5, 36),
+        'lean_mass_kg': rng.normal(60, 2, 36),
+        'performance_score': rng.normal(8, 0.5, 36)
+    })
+    title_size = matplotlib.rcParams['axes.titlesize']
+    visualization = CreatineVisualization(None)
+
+    expected = {plot: visualization.render(plot, data=data)
+                for plot in ('strength_progression', 'mass_changes', 'effect_sizes', 'age_comparison')}
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        rendered = list(executor.map(lambda plot: (plot, visualization.render(plot, data=data)),
+                                     list(expected) * 3))
+    assert all(content == expected[plot] for plot, content in rendered)
+    assert expected['strength_progression'].startswith(b'\x89PNG')
+    assert b'<svg' in visualization.render('plot_mass_changes', format='svg', data=data)
+    assert matplotlib.rcParams['axes.titlesize'] == title_size
+    assert not plt.get_fignums()
+    with pytest.raises(ValueError):
+        visualization.render('histogram', data=data)
+
 def test_plot_style_consistency(visualization):
     """Test consistency of plot styling."""
     fig1 = visualization.plot_strength_progression()
@@ -1,19 +1,134 @@
-import matplotlib.pyplot as plt
 import seaborn as sns
 from typing import Dict, Optional, List, Tuple
 import pandas as pd
 import numpy as np
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import functools
+import hashlib
+import io
+import json
+import os
+import threading
+import time
 import logging
-from .database import CreatineDatabase
+import matplotlib
+import matplotlib.dates as mdates
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from matplotlib.text import Text
+from scipy import stats
+from .analysis import CreatineAnalysis, COMPLIANCE_BANDS
+from .database import CreatineDatabase, TRAINING_ASSIGNMENTS_QUERY
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Summary plot files mapped to the method drawing them and the data it reads:
+# 'progress_data', 'compliance_bands' (CreatineAnalysis.analyze_training_compliance)
+# or a named query
+SUMMARY_PLOTS = {
+    'strength_progression.png': ('plot_strength_progression', 'progress_data'),
+    'mass_changes.png': ('plot_mass_changes', 'progress_data'),
+    'effect_sizes.png': ('plot_effect_sizes', 'progress_data'),
+    'age_comparison.png': ('plot_age_comparison', 'progress_data'),
+    'training_compliance.png': ('plot_training_compliance', 'compliance_bands')
+}
+
+# Manifest in the output directory recording the input hash of each plot file
+PLOT_MANIFEST = 'plot_manifest.json'
+
+# Style of every figure: the seaborn style sheet with the study's sizes, in
+# rcParams keys but passed explicitly to figures, axes and artists instead of
+# through the global rcParams (missing keys take matplotlib's defaults)
+PLOT_STYLE = {
+    **matplotlib.style.library.get('seaborn-v0_8', {}),
+    'figure.figsize': [12, 6],
+    'figure.dpi': 100,
+    'axes.titlesize': 14,
+    'axes.labelsize': 12
+}
+
+# Named render profiles for saved plots: the output format, savefig settings
+# overriding each plot's own (dpi, bbox_inches), Pillow encoder options per
+# raster format and extra rcParams. 'standard' keeps each plot's settings.
+RENDER_PROFILES = {
+    'draft': {
+        'format': 'png',
+        'save': {'dpi': 72, 'bbox_inches': None},
+        'pil_kwargs': {'png': {'compress_level': 1}},
+        'rc': {}
+    },
+    'standard': {
+        'format': 'png',
+        'save': {},
+        'pil_kwargs': {},
+        'rc': {}
+    },
+    'publication': {
+        'format': 'pdf',
+        'save': {'dpi': 600, 'bbox_inches': 'tight'},
+        'pil_kwargs': {},
+        # TrueType fonts embedded in PDF/PS, text drawn as paths in SVG. The
+        # writers read these from the global rcParams, so selecting the
+        # profile sets them there once.
+        'rc': {'pdf.fonttype': 42, 'ps.fonttype': 42, 'svg.fonttype': 'path'}
+    },
+    'web': {
+        'format': 'webp',
+        'save': {'dpi': 96, 'bbox_inches': 'tight'},
+        'pil_kwargs': {'webp': {'quality': 85}, 'png': {'compress_level': 6}},
+        'rc': {}
+    }
+}
+
+# Size of one participant panel in inches and its inner margin as a fraction
+# of the panel; the top PANEL_LABEL fraction holds the participant label
+PANEL_SIZE = (1.0, 0.75)
+PANEL_PAD = 0.06
+PANEL_LABEL = 0.22
+
+# Drawing code changes re-render every plot
+SOURCE_HASH = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+
+def _render_plot(method: str, data: pd.DataFrame, save_path: str, show_individuals: bool,
+                 profile: str, format: Optional[str]) -> float:
+    """
+    Draw one summary plot from prefetched data in a worker process and
+    return its render time in seconds.
+    """
+    start = time.perf_counter()
+    visualization = CreatineVisualization(None, show_individuals, profile=profile, format=format)
+    getattr(visualization, method)(save_path, data=data)
+    return time.perf_counter() - start
+
+def _styled(method):
+    """Give the figure a plotting method returns its instance's text style (see _finish_figure)."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        return self._finish_figure(result) if isinstance(result, Figure) else result
+    return wrapper
+
 class CreatineVisualization:
-    def __init__(self, db: CreatineDatabase):
+    def __init__(self, db: CreatineDatabase, show_individuals: bool = False,
+                 profile: str = 'standard', format: Optional[str] = None,
+                 exclude_outliers: bool = False):
+        """
+        Initialize plotting on a database. With show_individuals=True the
+        progression plots also draw every participant's trajectory. profile
+        names the RENDER_PROFILES entry used to save plots, and format
+        overrides its output format (e.g. 'svg' for publication). With
+        exclude_outliers=True plots read from the database leave out
+        measurements flagged by outlier screening.
+        """
         self.db = db
-        self.setup_plot_style()
+        self.show_individuals = show_individuals
+        self.exclude_outliers = exclude_outliers
+        self.set_render_profile(profile, format)
         # Define consistent colors
         self.colors = {
             'young_creatine': '#4169E1',  # Blue
@@ -23,14 +138,127 @@ class CreatineVisualization:
         logger.info("Visualization module initialized")
 
     def setup_plot_style(self):
+        """Set this instance's style, applied to every figure it draws."""
+        self.style = {**PLOT_STYLE, **self.render_profile['rc']}
+        matplotlib.rcParams.update(self.render_profile['rc'])
+
+    def _rc(self, key: str):
+        """A style setting of this instance, else matplotlib's default."""
+        return self.style[key] if key in self.style else matplotlib.rcParamsDefault[key]
+
+    def set_render_profile(self, profile: str = 'standard', format: Optional[str] = None):
+        """Select the render profile and output format used to save plots."""
+        if profile not in RENDER_PROFILES:
+            raise ValueError(f"Unknown render profile: {profile}")
+        self.profile = profile
+        self.render_profile = dict(RENDER_PROFILES[profile], format=format or RENDER_PROFILES[profile]['format'])
+        self.setup_plot_style()
+
+    def output_name(self, filename: str) -> str:
+        """filename with the suffix of the render profile's output format."""
+        return str(Path(filename).with_suffix(f".{self.render_profile['format']}"))
+
+    def _figure(self, figsize: Tuple[float, float]) -> Figure:
+        """A figure in the instance's style on its own Agg canvas, unknown to pyplot."""
+        fig = Figure(figsize=figsize, dpi=self._rc('figure.dpi'), facecolor=self._rc('figure.facecolor'))
+        FigureCanvasAgg(fig)
+        return fig
+
+    def _new_figure(self, nrows: int = 1, ncols: int = 1, figsize: Tuple[float, float] = (12, 6)):
+        """A figure (see _figure) and its axes, styled before anything is drawn."""
+        fig = self._figure(figsize)
+        axes = fig.subplots(nrows, ncols)
+        for ax in np.atleast_1d(axes).ravel():
+            self._style_axes(ax)
+        return fig, axes
+
+    def _style_axes(self, ax):
+        """Apply the instance's background, frame, grid, tick and color cycle style to axes."""
+        ax.set_facecolor(self._rc('axes.facecolor'))
+        ax.set_axisbelow(self._rc('axes.axisbelow'))
+        ax.set_prop_cycle(self._rc('axes.prop_cycle'))
+        for spine in ax.spines.values():
+            spine.set(edgecolor=self._rc('axes.edgecolor'), linewidth=self._rc('axes.linewidth'))
+        if self._rc('axes.grid'):
+            ax.grid(True, color=self._rc('grid.color'), linestyle=self._rc('grid.linestyle'),
+                    linewidth=self._rc('grid.linewidth'))
+        for axis in ('x', 'y'):
+            ax.tick_params(axis=axis, which='major', colors=self._rc(f'{axis}tick.color'),
+                           labelsize=self._rc(f'{axis}tick.labelsize'),
+                           direction=self._rc(f'{axis}tick.direction'),
+                           pad=self._rc(f'{axis}tick.major.pad'),
+                           length=self._rc(f'{axis}tick.major.size'),
+                           width=self._rc(f'{axis}tick.major.width'))
+            ax.tick_params(axis=axis, which='minor', length=self._rc(f'{axis}tick.minor.size'),
+                           width=self._rc(f'{axis}tick.minor.width'))
+
+    def _line_style(self) -> Dict:
+        """Line2D settings of the instance's style."""
+        return {'linewidth': self._rc('lines.linewidth'), 'markersize': self._rc('lines.markersize'),
+                'markeredgewidth': self._rc('lines.markeredgewidth'),
+                'solid_capstyle': self._rc('lines.solid_capstyle')}
+
+    def _finish_figure(self, fig: Figure) -> Figure:
+        """
+        Apply the instance's text style to a drawn figure: font family, title,
+        axis label and legend fonts, which matplotlib and seaborn take from
+        the global rcParams when they create them. Idempotent.
+        """
+        family = self._rc('font.sans-serif') if 'sans-serif' in self._rc('font.family') else self._rc('font.family')
+        for text in fig.findobj(Text):
+            text.set_fontfamily(family)
+        for ax in fig.axes:
+            ax.title.set(fontsize=self._rc('axes.titlesize'), color=self._rc('text.color'))
+            for label in (ax.xaxis.label, ax.yaxis.label):
+                label.set(fontsize=self._rc('axes.labelsize'), color=self._rc('axes.labelcolor'))
+            legend = ax.get_legend()
+            if legend is not None:
+                legend.set_frame_on(self._rc('legend.frameon'))
+                for text in legend.get_texts():
+                    text.set(fontsize=self._rc('legend.fontsize'), color=self._rc('text.color'))
+        return fig
+
+    def figure_to_bytes(self, fig: Figure, format: str = 'png', **kwargs) -> bytes:
+        """Render a figure in memory, e.g. format='png' or 'svg'."""
+        buffer = io.BytesIO()
+        self._finish_figure(fig).savefig(buffer, format=format, **kwargs)
+        return buffer.getvalue()
+
+    def render(self, plot: str, format: str = 'png', data: Optional[pd.DataFrame] = None,
+               dpi: Optional[float] = None, **options) -> bytes:
+        """
+        Draw a plot (a method name such as 'strength_progression' or
+        'plot_strength_progression') and return it as PNG or SVG bytes
+        without touching disk. options are passed to the plot method.
+        """
+        method = plot if plot.startswith('plot_') else f'plot_{plot}'
+        if method not in {name for name, _ in SUMMARY_PLOTS.values()}:
+            raise ValueError(f"Unknown plot: {plot}")
+        fig = getattr(self, method)(data=data, **options)
+        return self.figure_to_bytes(fig, format=format, bbox_inches='tight', dpi=dpi)
+
+    def _save_figure(self, fig: Figure, save_path: str, **kwargs):
+        """Save a figure atomically: write a temporary file, then rename it into place."""
+        content = self.figure_to_bytes(fig, format=Path(save_path).suffix.lstrip('.') or 'png', **kwargs)
+        temp_path = f"{save_path}.{os.getpid()}.{threading.get_ident()}.tmp"
         try:
-            plt.style.use('seaborn-v0_8')
-        except:
-            plt.style.use('default')
-        plt.rcParams['figure.figsize'] = [12, 6]
-        plt.rcParams['figure.dpi'] = 100
-        plt.rcParams['axes.titlesize'] = 14
-        plt.rcParams['axes.labelsize'] = 12
+            with open(temp_path, 'wb') as f:
+                f.write(content)
+            os.replace(temp_path, save_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _save_plot(self, fig: Figure, save_path: str, **defaults):
+        """
+        Save a plot with its own savefig settings overridden by the render
+        profile's, plus the profile's encoder options for the file's format.
+        """
+        kwargs = {**defaults, **self.render_profile['save']}
+        pil_kwargs = self.render_profile['pil_kwargs'].get(Path(save_path).suffix.lstrip('.').lower())
+        if pil_kwargs:
+            kwargs['pil_kwargs'] = pil_kwargs
+        self._save_figure(fig, save_path, **kwargs)
 
     def set_axis_limits(self, ax, data, y_column):
         """Set consistent axis limits with some padding"""
@@ -39,99 +267,122 @@ class CreatineVisualization:
         padding = (y_max - y_min) * 0.1  # 10% padding
         ax.set_ylim(y_min - padding, y_max + padding)
 
-    def plot_strength_progression(self, save_path: Optional[str] = None):
-        try:
-            data = self.db.get_progress_data()
-            data = data.rename(columns={
-                'measurement_date': 'Measurement Date',
-                'strength_1rm_kg': 'Maximum Strength (kg)',
-                'age_group': 'Age Group'
-            })
-            data['Age Group'] = np.where(data['age'] < 30, 'Young', 'Older')
-            
-            fig, ax = plt.subplots(figsize=(12, 6))
-            
-            for group in ['creatine', 'placebo']:
-                for age in ['Young', 'Older']:
-                    mask = (data['group_assignment'] == group) & (data['Age Group'] == age)
-                    if age == 'Older' and group == 'creatine':
-                        color = self.colors['older_creatine']
-                    elif group == 'creatine':
-                        color = self.colors['young_creatine']
-                    else:
-                        color = self.colors['placebo']
-                    
-                    sns.lineplot(
-                        data=data[mask],
-                        x='Measurement Date',
-                        y='Maximum Strength (kg)',
-                        label=f'{group.capitalize()} ({age})',
-                        color=color,
-                        marker='o',
-                        ax=ax
-                    )
+    def _progression_color(self, group: str, age_band: str) -> str:
+        """Line color of a group and age band."""
+        if group == 'creatine':
+            return self.colors['older_creatine' if age_band == 'Older' else 'young_creatine']
+        return self.colors['placebo']
 
-            ax.set_title('Maximum Strength Progression Over Time')
-            ax.set_xlabel('Measurement Date')
-            ax.set_ylabel('Maximum Strength (kg)')
-            plt.xticks(rotation=45)
-            self.set_axis_limits(ax, data, 'Maximum Strength (kg)')
-            
+    def progression_summary(self, data: pd.DataFrame, metric: str) -> pd.DataFrame:
+        """
+        Mean of a metric per group, age band (Young under 30, else Older) and
+        measurement date in one grouped pass, with the count, sample std and
+        a t-based 95% confidence interval of the mean (NaN for single values).
+        """
+        observed = data.loc[data[metric].notnull(), ['group_assignment', 'age', 'measurement_date', metric]]
+        summary = observed.assign(
+            age_band=np.where(observed['age'] < 30, 'Young', 'Older'),
+            measurement_date=pd.to_datetime(observed['measurement_date'])
+        ).groupby(['group_assignment', 'age_band', 'measurement_date'], sort=True)[metric].agg(
+            ['count', 'mean', 'std']
+        ).reset_index()
+        half_width = (stats.t.ppf(0.975, summary['count'] - 1) * summary['std']
+                      / np.sqrt(summary['count'])).where(summary['count'] > 1)
+        summary['ci_lower'] = summary['mean'] - half_width
+        summary['ci_upper'] = summary['mean'] + half_width
+        return summary
+
+    def _draw_trajectories(self, ax, data: pd.DataFrame, metric: str):
+        """Draw every participant's trajectory as one batched LineCollection."""
+        rows = data.loc[data[metric].notnull(), ['participant_id', 'group_assignment', 'age',
+                                                 'measurement_date', metric]]
+        rows = rows.assign(x=mdates.date2num(pd.to_datetime(rows['measurement_date']))).sort_values(
+            ['participant_id', 'x'], kind='mergesort'
+        )
+        if rows.empty:
+            return
+        points = rows[['x', metric]].to_numpy(dtype=float)
+        starts = np.flatnonzero(rows['participant_id'].ne(rows['participant_id'].shift()).to_numpy())
+        first = rows.iloc[starts]
+        colors = [self._progression_color(group, 'Young' if age < 30 else 'Older')
+                  for group, age in zip(first['group_assignment'], first['age'])]
+        ax.add_collection(LineCollection(np.split(points, starts[1:]), colors=colors,
+                                         linewidths=0.5, alpha=0.15, zorder=1))
+        ax.autoscale_view()
+
+    def _plot_progression(self, data: pd.DataFrame, metric: str, label: str, title: str,
+                          show_individuals: Optional[bool] = None) -> Figure:
+        """
+        Group means over time with their confidence bands, from
+        progression_summary, so the number of drawn artists does not grow
+        with the cohort; individual trajectories are overlaid when requested.
+        """
+        show_individuals = self.show_individuals if show_individuals is None else show_individuals
+        summary = self.progression_summary(data, metric)
+
+        fig, ax = self._new_figure(figsize=(12, 6))
+        if show_individuals:
+            self._draw_trajectories(ax, data, metric)
+        for group in ['creatine', 'placebo']:
+            for age_band in ['Young', 'Older']:
+                cell = summary[(summary['group_assignment'] == group) & (summary['age_band'] == age_band)]
+                if cell.empty:
+                    continue
+                color = self._progression_color(group, age_band)
+                ax.plot(cell['measurement_date'], cell['mean'], marker='o', color=color,
+                        label=f'{group.capitalize()} ({age_band})', zorder=3, **self._line_style())
+                ax.fill_between(cell['measurement_date'], cell['ci_lower'], cell['ci_upper'],
+                                color=color, alpha=0.2, linewidth=0, zorder=2)
+
+        ax.set_title(title)
+        ax.set_xlabel('Measurement Date')
+        ax.set_ylabel(label)
+        ax.tick_params(axis='x', labelrotation=45)
+        if ax.get_legend_handles_labels()[0]:
+            ax.legend()
+        limits = pd.DataFrame({label: pd.concat(
+            [summary['mean'], summary['ci_lower'], summary['ci_upper']]
+            + ([data[metric]] if show_individuals else [])
+        )}).dropna()
+        if not limits.empty:
+            self.set_axis_limits(ax, limits, label)
+        return fig
+
+    @_styled
+    def plot_strength_progression(self, save_path: Optional[str] = None,
+                                  data: Optional[pd.DataFrame] = None,
+                                  show_individuals: Optional[bool] = None):
+        try:
+            data = self.db.get_progress_data(exclude_outliers=self.exclude_outliers) if data is None else data
+            fig = self._plot_progression(data, 'strength_1rm_kg', 'Maximum Strength (kg)',
+                                         'Maximum Strength Progression Over Time', show_individuals)
             if save_path:
-                plt.savefig(save_path, bbox_inches='tight', dpi=300)
+                self._save_plot(fig, save_path, bbox_inches='tight', dpi=300)
             return fig
         except Exception as e:
             logger.error(f"Error plotting strength progression: {e}")
             raise
 
-    def plot_mass_changes(self, save_path: Optional[str] = None):
+    @_styled
+    def plot_mass_changes(self, save_path: Optional[str] = None,
+                          data: Optional[pd.DataFrame] = None,
+                          show_individuals: Optional[bool] = None):
         try:
-            data = self.db.get_progress_data()
-            data = data.rename(columns={
-                'measurement_date': 'Measurement Date',
-                'lean_mass_kg': 'Lean Mass (kg)',
-                'age_group': 'Age Group'
-            })
-            data['Age Group'] = np.where(data['age'] < 30, 'Young', 'Older')
-            
-            fig, ax = plt.subplots(figsize=(12, 6))
-            
-            for group in ['creatine', 'placebo']:
-                for age in ['Young', 'Older']:
-                    mask = (data['group_assignment'] == group) & (data['Age Group'] == age)
-                    if age == 'Older' and group == 'creatine':
-                        color = self.colors['older_creatine']
-                    elif group == 'creatine':
-                        color = self.colors['young_creatine']
-                    else:
-                        color = self.colors['placebo']
-                    
-                    sns.lineplot(
-                        data=data[mask],
-                        x='Measurement Date',
-                        y='Lean Mass (kg)',
-                        label=f'{group.capitalize()} ({age})',
-                        color=color,
-                        marker='o',
-                        ax=ax
-                    )
-
-            ax.set_title('Lean Mass Changes Over Time')
-            ax.set_xlabel('Measurement Date')
-            ax.set_ylabel('Lean Mass (kg)')
-            plt.xticks(rotation=45)
-            self.set_axis_limits(ax, data, 'Lean Mass (kg)')
-            
+            data = self.db.get_progress_data(exclude_outliers=self.exclude_outliers) if data is None else data
+            fig = self._plot_progression(data, 'lean_mass_kg', 'Lean Mass (kg)',
+                                         'Lean Mass Changes Over Time', show_individuals)
             if save_path:
-                plt.savefig(save_path, bbox_inches='tight', dpi=300)
+                self._save_plot(fig, save_path, bbox_inches='tight', dpi=300)
             return fig
         except Exception as e:
             logger.error(f"Error plotting mass changes: {e}")
             raise
 
-    def plot_effect_sizes(self, save_path: Optional[str] = None):
+    @_styled
+    def plot_effect_sizes(self, save_path: Optional[str] = None,
+                          data: Optional[pd.DataFrame] = None):
         try:
-            progress_data = self.db.get_progress_data()
+            progress_data = self.db.get_progress_data(exclude_outliers=self.exclude_outliers) if data is None else data
             metrics = ['strength_1rm_kg', 'lean_mass_kg', 'performance_score']
             
             effect_sizes = []
@@ -155,31 +406,38 @@ class CreatineVisualization:
             
             effect_df = pd.DataFrame(effect_sizes)
             
-            fig, ax = plt.subplots(figsize=(10, 6))
-            sns.barplot(data=effect_df, x='Metric', y='Effect Size', ax=ax)
+            fig, ax = self._new_figure(figsize=(10, 6))
+            sns.barplot(data=effect_df, x='Metric', y='Effect Size', ax=ax,
+                        linewidth=self._rc('patch.linewidth'),
+                        err_kws={'linewidth': 1.5 * self._rc('lines.linewidth')})
             
             ax.set_title('Effect Sizes (Cohen\'s d)')
             ax.set_xlabel('Metric Type')
             ax.set_ylabel('Effect Size (d)')
-            plt.xticks(rotation=45)
+            ax.tick_params(axis='x', labelrotation=45)
             
             # Set fixed y-axis limits for effect sizes
             ax.set_ylim(-0.2, 1.2)  # Typical range for effect sizes
             
-            ax.axhline(y=0.2, color='gray', linestyle='--', alpha=0.5)
-            ax.axhline(y=0.5, color='gray', linestyle='--', alpha=0.5)
-            ax.axhline(y=0.8, color='gray', linestyle='--', alpha=0.5)
+            ax.axhline(y=0.2, color='gray', linestyle='--', alpha=0.5,
+                       linewidth=self._rc('lines.linewidth'))
+            ax.axhline(y=0.5, color='gray', linestyle='--', alpha=0.5,
+                       linewidth=self._rc('lines.linewidth'))
+            ax.axhline(y=0.8, color='gray', linestyle='--', alpha=0.5,
+                       linewidth=self._rc('lines.linewidth'))
             
             if save_path:
-                plt.savefig(save_path, bbox_inches='tight')
+                self._save_plot(fig, save_path, bbox_inches='tight')
             return fig
         except Exception as e:
             logger.error(f"Error plotting effect sizes: {e}")
             raise
 
-    def plot_age_comparison(self, save_path: Optional[str] = None):
+    @_styled
+    def plot_age_comparison(self, save_path: Optional[str] = None,
+                            data: Optional[pd.DataFrame] = None):
         try:
-            data = self.db.get_progress_data()
+            data = self.db.get_progress_data(exclude_outliers=self.exclude_outliers) if data is None else data
             data = data.rename(columns={
                 'strength_1rm_kg': 'Maximum Strength (kg)',
                 'lean_mass_kg': 'Lean Mass (kg)',
@@ -188,7 +446,7 @@ class CreatineVisualization:
             })
             data['Age Group'] = np.where(data['age'] < 30, 'Young', 'Older')
         
-            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
+            fig, (ax1, ax2) = self._new_figure(1, 2, figsize=(15, 6))
         
             # Use consistent colors
             young_palette = {
@@ -244,87 +502,293 @@ class CreatineVisualization:
             ax2.set_ylabel('Lean Mass (kg)')
             self.set_axis_limits(ax2, data, 'Lean Mass (kg)')
         
-            plt.tight_layout()
+            fig.set_layout_engine('tight')
         
             if save_path:
-                plt.savefig(save_path, bbox_inches='tight')
+                self._save_plot(fig, save_path, bbox_inches='tight')
             return fig
         except Exception as e:
             logger.error(f"Error plotting age comparison: {e}")
             raise
 
-    def plot_training_compliance(self, save_path: Optional[str] = None):
+    @_styled
+    def plot_training_compliance(self, save_path: Optional[str] = None,
+                                 data: Optional[pd.DataFrame] = None):
         try:
-            compliance_data = self.db.run_analysis_query("Training Compliance Impact")
-            compliance_data = compliance_data.rename(columns={
-                'training_status': 'Training Status',
+            if data is None:
+                analysis = CreatineAnalysis(self.db, exclude_outliers=self.exclude_outliers)
+                data = analysis.analyze_training_compliance()['compliance_bands']
+            compliance_data = data.rename(columns={
+                'compliance_band': 'Compliance Band',
                 'strength_gain_percentage': 'Strength Gain (%)',
                 'mass_gain_percentage': 'Mass Gain (%)',
-                'high_compliance': 'High Compliance'
+                'group_assignment': 'Group'
             })
             
-            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
+            fig, (ax1, ax2) = self._new_figure(1, 2, figsize=(15, 6))
             
-            # Plot strength gains
-            sns.barplot(
-                data=compliance_data,
-                x='Training Status',
-                y='Strength Gain (%)',
-                hue='High Compliance',
-                ax=ax1
-            )
-            ax1.set_title('Strength Gains by Training Status')
-            ax1.set_xlabel('Training Status')
-            ax1.set_ylabel('Strength Gain (%)')
-            plt.setp(ax1.xaxis.get_majorticklabels(), rotation=45)
-            self.set_axis_limits(ax1, compliance_data, 'Strength Gain (%)')
-            
-            # Plot mass gains
-            sns.barplot(
-                data=compliance_data,
-                x='Training Status',
-                y='Mass Gain (%)',
-                hue='High Compliance',
-                ax=ax2
-            )
-            ax2.set_title('Mass Gains by Training Status')
-            ax2.set_xlabel('Training Status')
-            ax2.set_ylabel('Mass Gain (%)')
-            plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45)
-            self.set_axis_limits(ax2, compliance_data, 'Mass Gain (%)')
+            for ax, metric, title in ((ax1, 'Strength Gain (%)', 'Strength Gains by Training Compliance'),
+                                      (ax2, 'Mass Gain (%)', 'Mass Gains by Training Compliance')):
+                if not compliance_data.empty:
+                    sns.barplot(
+                        data=compliance_data,
+                        x='Compliance Band',
+                        y=metric,
+                        hue='Group',
+                        order=COMPLIANCE_BANDS,
+                        linewidth=self._rc('patch.linewidth'),
+                        err_kws={'linewidth': 1.5 * self._rc('lines.linewidth')},
+                        ax=ax
+                    )
+                    self.set_axis_limits(ax, compliance_data, metric)
+                ax.set_title(title)
+                ax.set_xlabel('Compliance Band')
+                ax.set_ylabel(metric)
+                ax.tick_params(axis='x', labelrotation=45)
             
-            plt.tight_layout()
+            fig.set_layout_engine('tight')
             
             if save_path:
-                plt.savefig(save_path, bbox_inches='tight')
+                self._save_plot(fig, save_path, bbox_inches='tight')
             return fig
         except Exception as e:
             logger.error(f"Error plotting training compliance: {e}")
             raise
 
-    def generate_summary_plots(self, output_dir: str = 'plots'):
+    def _draw_panel_page(self, page_data: pd.DataFrame, participant_ids: List[int], metric: str,
+                         extent: Dict[str, float], rows: int, cols: int) -> Figure:
+        """
+        One page of participant panels on a single full-figure axes: each
+        participant's (study_day, metric) points are mapped into their own
+        cell, so the page's trajectories, points and frames are three
+        batched collections whatever the number of panels. page_data must be
+        sorted by participant and study day.
+        """
+        fig = self._figure((cols * PANEL_SIZE[0], rows * PANEL_SIZE[1]))
+        ax = fig.add_axes([0, 0, 1, 1])
+        ax.set_axis_off()
+        ax.set_xlim(0, cols)
+        ax.set_ylim(0, rows)
+
+        slots = np.arange(len(participant_ids))
+        slot_cols, slot_rows = slots % cols, rows - 1 - slots // cols
+        frames = [[(c + PANEL_PAD / 2, r + PANEL_PAD / 2), (c + 1 - PANEL_PAD / 2, r + PANEL_PAD / 2),
+                   (c + 1 - PANEL_PAD / 2, r + 1 - PANEL_PAD / 2), (c + PANEL_PAD / 2, r + 1 - PANEL_PAD / 2),
+                   (c + PANEL_PAD / 2, r + PANEL_PAD / 2)]
+                  for c, r in zip(slot_cols, slot_rows)]
+        ax.add_collection(LineCollection(frames, colors='#BBBBBB', linewidths=0.3))
+        for participant_id, c, r in zip(participant_ids, slot_cols, slot_rows):
+            ax.text(c + PANEL_PAD, r + 1 - PANEL_PAD, f"#{participant_id}", fontsize=4,
+                    va='top', ha='left', color='#555555')
+
+        rows_data = page_data.loc[page_data[metric].notnull() & page_data['study_day'].notnull()]
+        if not rows_data.empty:
+            slot = rows_data['participant_id'].map(dict(zip(participant_ids, slots))).to_numpy()
+            day_span = (extent['day_max'] - extent['day_min']) or 1
+            value_span = (extent['value_max'] - extent['value_min']) or 1
+            width, height = 1 - 2 * PANEL_PAD, 1 - 2 * PANEL_PAD - PANEL_LABEL
+            x = slot % cols + PANEL_PAD + (rows_data['study_day'].to_numpy() - extent['day_min']) / day_span * width
+            y = (rows - 1 - slot // cols + PANEL_PAD
+                 + (rows_data[metric].to_numpy() - extent['value_min']) / value_span * height)
+
+            starts = np.flatnonzero(np.r_[True, slot[1:] != slot[:-1]])
+            first = rows_data.iloc[starts]
+            colors = [self._progression_color(group, 'Young' if age < 30 else 'Older')
+                      for group, age in zip(first['group_assignment'], first['age'])]
+            points = np.column_stack([x, y])
+            ax.add_collection(LineCollection(np.split(points, starts[1:]), colors=colors, linewidths=0.6))
+            ax.scatter(x, y, s=0.8, c=np.repeat(colors, np.diff(np.r_[starts, len(slot)])), linewidths=0)
+        return self._finish_figure(fig)
+
+    @_styled
+    def plot_participant_panels(self, output_path: str, metric: str = 'strength_1rm_kg',
+                                data: Optional[pd.DataFrame] = None, rows: int = 12, cols: int = 16,
+                                dpi: float = 200) -> Dict:
+        """
+        Small multiples of every participant's trajectory of a metric,
+        rows x cols panels per page on one study-day and metric scale.
+        output_path ending in .pdf receives a multi-page PDF, otherwise it is
+        a directory receiving page_0001.png, page_0002.png, ... Pages are
+        drawn and written one at a time, reading each page's participants
+        sorted by participant and date (from data if given, else from the
+        database), so memory depends on the page size only. Files are
+        replaced atomically. Returns the page count, participant count,
+        written paths and total seconds.
+        """
         try:
+            start = time.perf_counter()
+            if data is not None:
+                data = data.sort_values(['participant_id', 'study_day'], kind='mergesort')
+                participant_ids = data['participant_id'].unique().tolist()
+                observed = data.loc[data[metric].notnull()]
+                extent = {'day_min': observed['study_day'].min(), 'day_max': observed['study_day'].max(),
+                          'value_min': observed[metric].min(), 'value_max': observed[metric].max()}
+            else:
+                participant_ids = sorted(self.db.get_measurement_watermarks()['participant_id'].tolist())
+                extent = self.db.get_progress_extent(metric, exclude_outliers=self.exclude_outliers)
+
+            per_page = rows * cols
+            pages = [participant_ids[offset:offset + per_page]
+                     for offset in range(0, len(participant_ids), per_page)]
+
+            def page_figures():
+                for page_ids in pages:
+                    if data is not None:
+                        page_data = data[data['participant_id'].isin(page_ids)]
+                    else:
+                        page_data = self.db.get_progress_data(participant_ids=page_ids,
+                                                              exclude_outliers=self.exclude_outliers)
+                    yield self._draw_panel_page(page_data, page_ids, metric, extent, rows, cols)
+
+            if str(output_path).lower().endswith('.pdf'):
+                Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+                temp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                try:
+                    with PdfPages(temp_path) as pdf:
+                        for fig in page_figures():
+                            pdf.savefig(fig, dpi=dpi)
+                    os.replace(temp_path, output_path)
+                finally:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                paths = [str(output_path)]
+            else:
+                Path(output_path).mkdir(parents=True, exist_ok=True)
+                paths = []
+                for number, fig in enumerate(page_figures(), start=1):
+                    paths.append(str(Path(output_path) / f"page_{number:04d}.png"))
+                    self._save_figure(fig, paths[-1], dpi=dpi)
+
+            seconds = time.perf_counter() - start
+            logger.info(f"Rendered {len(participant_ids)} participant panels on {len(pages)} pages "
+                        f"in {seconds:.2f}s")
+            return {'pages': len(pages), 'participants': len(participant_ids),
+                    'paths': paths, 'seconds': seconds}
+        except Exception as e:
+            logger.error(f"Error plotting participant panels: {e}")
+            raise
+
+    def plot_hash(self, method: str, data: pd.DataFrame) -> str:
+        """
+        Content hash of a plot: its method, the drawing code, colors, style
+        settings, library versions and the values of its input data.
+        """
+        settings = {
+            'method': method,
+            'source': SOURCE_HASH,
+            'colors': self.colors,
+            'show_individuals': self.show_individuals,
+            'profile': {name: str(value) for name, value in sorted(self.render_profile.items())},
+            'style': {name: str(value) for name, value in sorted(self.style.items())},
+            'versions': [matplotlib.__version__, sns.__version__],
+            'columns': [f'{column}:{dtype}' for column, dtype in data.dtypes.items()]
+        }
+        digest = hashlib.sha256(json.dumps(settings, sort_keys=True).encode())
+        digest.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _load_manifest(output_dir: str) -> Dict[str, str]:
+        """Plot hashes recorded by the last run in output_dir (empty if none)."""
+        try:
+            with open(Path(output_dir) / PLOT_MANIFEST) as f:
+                return json.load(f)['plots']
+        except (OSError, ValueError, KeyError):
+            return {}
+
+    @staticmethod
+    def _save_manifest(output_dir: str, hashes: Dict[str, str]):
+        """Write the plot hashes atomically."""
+        manifest_path = Path(output_dir) / PLOT_MANIFEST
+        temp_path = f"{manifest_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({'plots': hashes}, f, indent=2, sort_keys=True)
+        os.replace(temp_path, manifest_path)
+
+    def generate_summary_plots(self, output_dir: str = 'plots', max_workers: Optional[int] = None,
+                               force: bool = False, profile: Optional[str] = None,
+                               format: Optional[str] = None) -> Dict:
+        """
+        Render the plots in SUMMARY_PLOTS into output_dir, saved with the
+        given render profile and format (default: the instance's), each file
+        named with the format's suffix. The data is read
+        once as a consistent snapshot and hashed per plot (see plot_hash);
+        plots whose hash matches the manifest from the last run and whose
+        file exists are skipped unless force is set. The rest are drawn each
+        in its own worker process with the Agg backend (max_workers=1 draws
+        them in this process) and replaced atomically.
+
+        Returns the rendered and skipped file names, and the wall times in
+        seconds of the data fetch, of each rendered plot and of the run.
+        """
+        try:
+            if profile is not None or format is not None:
+                renderer = copy.copy(self)
+                renderer.set_render_profile(profile or self.profile, format)
+                return renderer.generate_summary_plots(output_dir, max_workers, force)
+
+            start = time.perf_counter()
             Path(output_dir).mkdir(parents=True, exist_ok=True)
-            
-            plots = {
-                'strength_progression.png': self.plot_strength_progression,
-                'mass_changes.png': self.plot_mass_changes,
-                'effect_sizes.png': self.plot_effect_sizes,
-                'age_comparison.png': self.plot_age_comparison,
-                'training_compliance.png': self.plot_training_compliance
+
+            query_names = sorted({source for _, source in SUMMARY_PLOTS.values()
+                                  if source not in ('progress_data', 'compliance_bands')})
+            snapshot = self.db.get_snapshot(
+                query_names, extra_queries={'training_assignments': TRAINING_ASSIGNMENTS_QUERY},
+                exclude_outliers=self.exclude_outliers
+            )
+            analysis = CreatineAnalysis(self.db, exclude_outliers=self.exclude_outliers)
+            snapshot['compliance_bands'] = analysis.analyze_training_compliance(
+                snapshot=snapshot
+            )['compliance_bands']
+            timings = {'data': time.perf_counter() - start}
+
+            previous = self._load_manifest(output_dir)
+            plots = {self.output_name(filename): (method, source)
+                     for filename, (method, source) in SUMMARY_PLOTS.items()}
+            hashes = {filename: self.plot_hash(method, snapshot[source])
+                      for filename, (method, source) in plots.items()}
+            skipped = [filename for filename in plots
+                       if not force and previous.get(filename) == hashes[filename]
+                       and (Path(output_dir) / filename).exists()]
+            jobs = {
+                filename: (method, snapshot[source], str(Path(output_dir) / filename),
+                           self.show_individuals, self.profile, self.render_profile['format'])
+                for filename, (method, source) in plots.items()
+                if filename not in skipped
             }
-            
-            for filename, plot_func in plots.items():
-                save_path = str(Path(output_dir) / filename)
-                plot_func(save_path)
-                plt.close()
-            
-            logger.info(f"Generated all summary plots in {output_dir}")
+
+            # Record every plot finished so far, even if a later one fails. Files
+            # of other profiles' formats keep their entries.
+            manifest = {filename: digest for filename, digest in previous.items() if filename not in plots}
+            manifest.update({filename: previous[filename] for filename in skipped})
+            try:
+                if max_workers == 1:
+                    for filename, (method, data, save_path, *_) in jobs.items():
+                        plot_start = time.perf_counter()
+                        getattr(self, method)(save_path, data=data)
+                        timings[filename] = time.perf_counter() - plot_start
+                        manifest[filename] = hashes[filename]
+                elif jobs:
+                    workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+                    with ProcessPoolExecutor(max_workers=workers) as executor:
+                        futures = {filename: executor.submit(_render_plot, *job)
+                                   for filename, job in jobs.items()}
+                        for filename, future in futures.items():
+                            timings[filename] = future.result()
+                            manifest[filename] = hashes[filename]
+            finally:
+                self._save_manifest(output_dir, manifest)
+
+            timings['total'] = time.perf_counter() - start
+            logger.info(f"Rendered {len(jobs)} summary plots ({self.profile} profile) and skipped "
+                        f"{len(skipped)} unchanged in {output_dir} in {timings['total']:.2f}s")
+            for name, seconds in timings.items():
+                logger.info(f"  {name}: {seconds:.2f}s")
+            return {'rendered': list(jobs), 'skipped': skipped, 'timings': timings}
         except Exception as e:
             logger.error(f"Error generating summary plots: {e}")
             raise
 
-
 if __name__ == '__main__':
     # Create database and visualization instances
     db = CreatineDatabase()